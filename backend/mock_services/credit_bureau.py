@@ -1,5 +1,6 @@
 import sqlite3
 import os
+import json
 from flask import Flask, request, jsonify
 app = Flask(__name__)
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'mock_bank.db')
@@ -19,4 +20,18 @@ def get_score():
         return jsonify({"credit_score": row['credit_score']}), 200
     return jsonify({"error": "User not found"}), 404
 
+@app.route('/get-scores', methods=['POST'])
+def get_scores():
+    # Bulk lookup for batch underwriting: {"pans": [...]} -> scores of the known ones
+    pans = (request.json or {}).get('pans') or []
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT pan, credit_score FROM customers WHERE pan IN (SELECT value FROM json_each(?))",
+                   (json.dumps(pans),))
+    scores = dict(cursor.fetchall())
+    conn.close()
+    
+    return jsonify({"credit_scores": scores}), 200
+
 if __name__ == '__main__': app.run(port=5002)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import sqlite3
 import os
+import json
 from flask import Flask, request, jsonify
 app = Flask(__name__)
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'mock_bank.db')
@@ -28,6 +29,27 @@ def get_limit():
         print(f"Error in get-limit: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/get-limits', methods=['POST'])
+def get_limits():
+    # Bulk lookup for batch underwriting: {"pans": [...]} -> limits of the known ones
+    try:
+        pans = (request.json or {}).get('pans') or []
+        
+        if not os.path.exists(DB_PATH):
+            return jsonify({"error": "Database not found"}), 500
+        
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute("SELECT pan, pre_approved_limit FROM customers WHERE pan IN (SELECT value FROM json_each(?))",
+                       (json.dumps(pans),))
+        limits = dict(cursor.fetchall())
+        conn.close()
+        
+        return jsonify({"pre_approved_limits": limits}), 200
+    except Exception as e:
+        print(f"Error in get-limits: {e}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == '__main__': 
     print(f"Starting Offer Mart on port 5003, DB at: {DB_PATH}")
     app.run(port=5003)
\ No newline at end of file
@@ -0,0 +1,388 @@
+"""
+Batch underwriting for campaign lists.
+
+Applies the underwriting_agent_tool rules (tools.evaluate_underwriting) to
+whole tables of (pan, amount, monthly_salary) rows, for pre-qualified
+offers. Input is read in chunks of BATCH_CHUNK_ROWS. Each chunk:
+    1. validates rows the way UnderwritingInput does
+    2. loads credit scores and pre-approved limits with one bulk request per
+       service (POST /get-scores, /get-limits)
+    3. takes every decision with NumPy masks over the whole chunk
+    4. is written out as CSV or JSON Lines
+Output is streamed chunk by chunk, so lists of any length run in bounded
+memory.
+
+Every JSON Lines record is {"pan": ..., **result}, where result is exactly
+what the tool returns for that row, down to the reason strings. PANs the
+bureau or offer mart does not know get the tool's ERROR results ("Unable
+to fetch credit score..."). Rows its input schema would reject get
+status ERROR with an "Invalid input: ..." error instead of failing the
+batch. CSV output has one column per result field, empty where the field
+does not apply.
+
+    cd backend/orchestrator
+    python -m agents.batch_underwriting campaign.csv -o results.jsonl
+    python -m agents.batch_underwriting campaign.jsonl --format csv > results.csv
+
+The same engine serves POST /underwriting/batch (app.py).
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from agents.tools import CREDIT_URL, OFFER_URL, call_api_with_retry
+
+logger = logging.getLogger(__name__)
+
+BATCH_CHUNK_ROWS = int(os.getenv("BATCH_CHUNK_ROWS", "10000"))
+FORMATS = ("jsonl", "csv")
+MEDIA_TYPES = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+
+# Constants of the per-call rules (tools.evaluate_underwriting)
+MIN_CREDIT_SCORE = 700
+LOAN_DURATION_MONTHS = 24
+BASE_RATE = 10.5
+SALARIED_RATE = 12.0
+MIN_AMOUNT = 10_000
+MAX_AMOUNT = 10_000_000
+
+# Keys of each outcome's result, in the order the tool returns them
+OUTCOME_FIELDS = {
+    "INVALID": ("status", "error"),
+    "NO_SCORE": ("status", "error"),
+    "NO_LIMIT": ("status", "error"),
+    "LOW_SCORE": ("status", "reason", "credit_score", "suggestion"),
+    "WITHIN_LIMIT": ("status", "amount", "interest_rate", "credit_score", "pre_approved_limit", "reason"),
+    "NEED_SALARY": ("status", "message", "amount", "credit_score", "pre_approved_limit"),
+    "SALARY_SHORT": ("status", "reason", "monthly_salary", "loan_duration_months", "total_salary",
+                     "required_amount", "max_loan_amount", "suggestion"),
+    "EMI_OK": ("status", "amount", "interest_rate", "credit_score", "monthly_emi", "monthly_salary",
+               "loan_duration_months", "reason"),
+    "EMI_HIGH": ("status", "reason", "estimated_emi", "monthly_salary", "max_loan_amount", "suggestion"),
+    "OVER_LIMIT": ("status", "reason", "credit_score", "pre_approved_limit", "max_eligible", "suggestion"),
+}
+OUTCOME_STATUS = {
+    "INVALID": "ERROR", "NO_SCORE": "ERROR", "NO_LIMIT": "ERROR",
+    "LOW_SCORE": "REJECTED", "WITHIN_LIMIT": "APPROVED", "NEED_SALARY": "NEED_SALARY",
+    "SALARY_SHORT": "REJECTED", "EMI_OK": "APPROVED", "EMI_HIGH": "REJECTED", "OVER_LIMIT": "REJECTED",
+}
+RESULT_COLUMNS = (
+    "pan", "status", "amount", "interest_rate", "credit_score", "pre_approved_limit", "monthly_emi",
+    "estimated_emi", "monthly_salary", "loan_duration_months", "total_salary", "required_amount",
+    "max_loan_amount", "max_eligible", "reason", "message", "suggestion", "error",
+)
+
+
+# ================= INPUT =================
+def read_applications(source, fmt="csv", chunk_rows=None):
+    """Chunks (DataFrames) of applications from a path or file object"""
+    chunk_rows = chunk_rows or BATCH_CHUNK_ROWS
+    if fmt == "csv":
+        return pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+    if fmt == "jsonl":
+        return pd.read_json(source, lines=True, chunksize=chunk_rows, dtype=False)
+    raise ValueError(f"Unsupported input format: {fmt}")
+
+
+def record_chunks(applications, chunk_rows=None):
+    """Chunks (DataFrames) of a list of application dicts"""
+    chunk_rows = chunk_rows or BATCH_CHUNK_ROWS
+    for start in range(0, len(applications), chunk_rows):
+        yield pd.DataFrame(applications[start:start + chunk_rows])
+
+
+def _whole_numbers(column):
+    """Numeric values of a column, NaN where a value is missing or not a whole number"""
+    values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(np.isfinite(values) & (values == np.floor(values)), values, np.nan)
+
+
+def validate_applications(chunk):
+    """(pan, amount, monthly_salary, error) arrays; error is None for valid rows"""
+    missing = {"pan", "amount"} - set(chunk.columns)
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(sorted(missing))}")
+    n = len(chunk)
+    pan = chunk["pan"].fillna("").astype(str).str.strip().str.upper().to_numpy(dtype=object)
+    amount = _whole_numbers(chunk["amount"])
+    if "monthly_salary" in chunk.columns:
+        raw_salary = chunk["monthly_salary"].replace("", np.nan)
+        salary = np.where(raw_salary.isna().to_numpy(), 0.0, _whole_numbers(raw_salary))
+    else:
+        salary = np.zeros(n)
+
+    # First failing check wins, as in UnderwritingInput (pan, amount, salary)
+    checks = [
+        (pd.Series(pan).str.len().to_numpy() != 10, "Invalid input: PAN must be exactly 10 characters"),
+        (np.isnan(amount), "Invalid input: amount must be a whole number of rupees"),
+        (amount < MIN_AMOUNT, f"Invalid input: Minimum loan amount is ₹{MIN_AMOUNT:,}"),
+        (amount > MAX_AMOUNT, f"Invalid input: Maximum loan amount is ₹{MAX_AMOUNT:,}"),
+        (np.isnan(salary) | (salary < 0), "Invalid input: monthly_salary must be a whole number, 0 if unknown"),
+    ]
+    error = np.select([mask for mask, _ in checks], [message for _, message in checks], default="")
+    error = np.where(error == "", None, error).astype(object)
+    valid = error == None  # noqa: E711 (element-wise)
+    amount = np.where(valid, amount, 0).astype(np.int64)
+    salary = np.where(valid, salary, 0).astype(np.int64)
+    return pan, amount, salary, error
+
+
+# ================= BUREAU DATA =================
+def load_bureau_data(pans):
+    """(credit_scores, pre_approved_limits) dicts for the known PANs, one bulk request each"""
+    pans = sorted(set(pans))
+    if not pans:
+        return {}, {}
+    logger.info(f"Bulk bureau lookup for {len(pans)} PANs")
+    scores = call_api_with_retry(f"{CREDIT_URL}/get-scores", {"pans": pans}, timeout=60)
+    limits = call_api_with_retry(f"{OFFER_URL}/get-limits", {"pans": pans}, timeout=60)
+    return scores.get("credit_scores", {}), limits.get("pre_approved_limits", {})
+
+
+def _lookup(pan, table):
+    """Values of table for each PAN as float64, NaN when unknown"""
+    values = pd.Series(pan).map(table)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+# ================= DECISIONS =================
+def _format(template, mask, *columns):
+    """template.format(*row values) for the rows in mask, None elsewhere"""
+    out = np.full(len(mask), None, dtype=object)
+    rows = np.flatnonzero(mask)
+    if len(rows):
+        out[rows] = [template.format(*values) for values in zip(*(c[rows].tolist() for c in columns))]
+    return out
+
+
+def evaluate_batch(pan, amount, monthly_salary, credit_score, pre_approved_limit, error=None):
+    """Underwriting results for whole columns at once.
+
+    Args:
+        pan: array of PANs
+        amount, monthly_salary: int64 arrays
+        credit_score, pre_approved_limit: float64 arrays, NaN where the
+            bureau does not know the PAN
+        error: validation errors (None for valid rows), see validate_applications
+
+    Returns:
+        DataFrame with an "outcome" column and one column per RESULT_COLUMNS
+    """
+    n = len(amount)
+    error = np.full(n, None, dtype=object) if error is None else error
+    invalid = error != None  # noqa: E711 (element-wise)
+    no_score = ~invalid & np.isnan(credit_score)
+    no_limit = ~invalid & ~no_score & np.isnan(pre_approved_limit)
+    ok = ~(invalid | no_score | no_limit)
+    score = np.where(ok, credit_score, 0).astype(np.int64)
+    limit = np.where(ok, pre_approved_limit, 0).astype(np.int64)
+    salary = monthly_salary
+
+    # Same rules and arithmetic, in the same order, as evaluate_underwriting
+    low_score = ok & (score < MIN_CREDIT_SCORE)
+    scored = ok & ~low_score
+    within = scored & (amount <= limit)
+    tier2 = scored & ~within & (amount <= 2 * limit)
+    over = scored & ~within & ~tier2
+    need_salary = tier2 & (salary == 0)
+    total_salary = salary * LOAN_DURATION_MONTHS
+    required = amount * 2
+    salary_short = tier2 & ~need_salary & (total_salary < required)
+    estimated_emi = (amount / LOAN_DURATION_MONTHS) * 1.1
+    max_allowed_emi = 0.5 * salary
+    affordable = tier2 & ~need_salary & ~salary_short
+    emi_ok = affordable & (estimated_emi <= max_allowed_emi)
+    emi_high = affordable & ~emi_ok
+
+    masks = {"INVALID": invalid, "NO_SCORE": no_score, "NO_LIMIT": no_limit, "LOW_SCORE": low_score,
+             "WITHIN_LIMIT": within, "NEED_SALARY": need_salary, "SALARY_SHORT": salary_short,
+             "EMI_OK": emi_ok, "EMI_HIGH": emi_high, "OVER_LIMIT": over}
+    outcome = np.select(list(masks.values()), list(masks), default="")
+
+    # Python's round() (exact decimal rounding) for the two EMI outcomes
+    # only; np.round can differ from it in the last digit
+    rounded_emi = np.full(n, np.nan)
+    emi_rows = np.flatnonzero(emi_ok | emi_high)
+    rounded_emi[emi_rows] = [round(v, 2) for v in estimated_emi[emi_rows].tolist()]
+    max_by_salary = (total_salary / 2).astype(np.int64)
+    max_by_emi = (max_allowed_emi * LOAN_DURATION_MONTHS / 1.1).astype(np.int64)
+    max_eligible = 2 * limit
+
+    def ints(values, mask):
+        return pd.arrays.IntegerArray(np.where(mask, values, 0).astype(np.int64), ~mask)
+
+    def floats(values, mask):
+        return pd.arrays.FloatingArray(np.where(mask, values, 0.0).astype(np.float64), ~mask)
+
+    def text(*parts):
+        out = np.full(n, None, dtype=object)
+        for values in parts:
+            out = np.where(values != None, values, out)  # noqa: E711 (element-wise)
+        return out
+
+    def constant(value, mask):
+        return np.where(mask, value, None).astype(object)
+
+    return pd.DataFrame({
+        "outcome": outcome,
+        "pan": pan,
+        "status": pd.Series(outcome).map(OUTCOME_STATUS).to_numpy(dtype=object),
+        "amount": ints(amount, within | need_salary | emi_ok),
+        "interest_rate": floats(np.where(within, BASE_RATE, SALARIED_RATE), within | emi_ok),
+        "credit_score": ints(score, low_score | within | need_salary | emi_ok | over),
+        "pre_approved_limit": ints(limit, within | need_salary | over),
+        "monthly_emi": floats(rounded_emi, emi_ok),
+        "estimated_emi": floats(rounded_emi, emi_high),
+        "monthly_salary": ints(salary, salary_short | emi_ok | emi_high),
+        "loan_duration_months": ints(np.full(n, LOAN_DURATION_MONTHS), salary_short | emi_ok),
+        "total_salary": ints(total_salary, salary_short),
+        "required_amount": ints(required, salary_short),
+        "max_loan_amount": ints(np.where(salary_short, max_by_salary, max_by_emi), salary_short | emi_high),
+        "max_eligible": ints(max_eligible, over),
+        "reason": text(
+            _format("Credit score ({}) is below minimum requirement of 700", low_score, score),
+            constant("Amount within pre-approved limit", within),
+            _format("Total salary over 24 months (₹{:,}) is less than 2x the loan amount (₹{:,})",
+                    salary_short, total_salary, required),
+            constant("Salary verification successful - Meets 2x loan requirement and EMI within affordability",
+                     emi_ok),
+            _format("EMI (₹{}) exceeds 50% of salary (₹{})", emi_high, rounded_emi, salary),
+            _format("Requested amount (₹{}) exceeds maximum eligible amount of ₹{}", over, amount, max_eligible),
+        ),
+        "message": constant("Please provide your monthly salary to proceed with evaluation", need_salary),
+        "suggestion": text(
+            constant("Please improve your credit score and reapply after 3 months", low_score),
+            _format("Maximum eligible loan based on your salary: ₹{:,}", salary_short, max_by_salary),
+            _format("Maximum eligible amount based on EMI: ₹{:,}", emi_high, max_by_emi),
+            _format("Please apply for an amount up to ₹{}", over, max_eligible),
+        ),
+        "error": text(
+            error,
+            constant("Unable to fetch credit score. Please try again later.", no_score),
+            constant("Unable to fetch pre-approved limit. Please try again later.", no_limit),
+        ),
+    })
+
+
+def underwrite_chunk(chunk, bureau=load_bureau_data):
+    """Results for one chunk of applications"""
+    pan, amount, salary, error = validate_applications(chunk)
+    scores, limits = bureau(pan[error == None].tolist())  # noqa: E711 (element-wise)
+    return evaluate_batch(pan, amount, salary, _lookup(pan, scores), _lookup(pan, limits), error)
+
+
+# ================= OUTPUT =================
+def _text_values(column, encode):
+    """Text of each value of a result column (no missing values): ints as
+    digits, floats as repr() (what json.dumps writes), strings through encode()"""
+    if isinstance(column.dtype, pd.Int64Dtype):
+        return column.to_numpy(dtype=np.int64).astype(str).astype(object)
+    if isinstance(column.dtype, pd.Float64Dtype):
+        return np.array([repr(v) for v in column.to_numpy(dtype=np.float64).tolist()], dtype=object)
+    # Encode each distinct string once (most reasons are shared)
+    codes, uniques = pd.factorize(column)
+    return np.array([encode(u) for u in uniques], dtype=object)[codes]
+
+
+def _json_field(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _csv_field(value):
+    if any(c in value for c in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _assemble(results, line_for_outcome):
+    """One text line per result row, in input order. Rows are grouped by
+    outcome, whose fields are fixed, so lines are built column by column."""
+    lines = np.empty(len(results), dtype=object)
+    for outcome, group in results.groupby("outcome", sort=False):
+        lines[results.index.get_indexer(group.index)] = line_for_outcome(outcome, group)
+    return "\n".join(lines) + "\n" if len(lines) else ""
+
+
+def to_jsonl(results):
+    """JSON Lines text: {"pan": ..., **tool result} per row, in json.dumps's default layout"""
+    def line_for_outcome(outcome, group):
+        line = np.full(len(group), "{", dtype=object)
+        for i, field in enumerate(("pan",) + OUTCOME_FIELDS[outcome]):
+            line = line + f'{", " if i else ""}"{field}": ' + _text_values(group[field], _json_field)
+        return line + "}"
+    return _assemble(results, line_for_outcome)
+
+
+def to_csv(results, header=True):
+    """CSV text with one column per RESULT_COLUMNS, empty where a field does not apply"""
+    def line_for_outcome(outcome, group):
+        present = {"pan", *OUTCOME_FIELDS[outcome]}
+        line, separators = np.full(len(group), "", dtype=object), ""
+        for i, field in enumerate(RESULT_COLUMNS):
+            separators += "," if i else ""
+            if field in present:
+                line = line + separators + _text_values(group[field], _csv_field)
+                separators = ""
+        return line + separators
+    return (",".join(RESULT_COLUMNS) + "\n" if header else "") + _assemble(results, line_for_outcome)
+
+
+def underwrite_stream(chunks, fmt="jsonl", bureau=load_bureau_data, stats=None):
+    """Underwrite application chunks, yielding the output text chunk by chunk.
+
+    stats, if given, is updated with "rows" and per-status "statuses" counts.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt} (use {' or '.join(FORMATS)})")
+    first = True
+    for chunk in chunks:
+        results = underwrite_chunk(chunk.reset_index(drop=True), bureau)
+        if stats is not None:
+            stats["rows"] = stats.get("rows", 0) + len(results)
+            stats.setdefault("statuses", Counter()).update(results["status"].tolist())
+        yield to_jsonl(results) if fmt == "jsonl" else to_csv(results, header=first)
+        first = False
+
+
+# ================= CLI =================
+def _input_format(path):
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("input", help="CSV or JSON Lines file with pan, amount[, monthly_salary]; - for CSV on stdin")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=FORMATS, help="output format (default: from --output, else jsonl)")
+    parser.add_argument("--chunk-rows", type=int, default=BATCH_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or (_input_format(args.output) if args.output else "jsonl")
+    source = sys.stdin if args.input == "-" else args.input
+    chunks = read_applications(source, "csv" if args.input == "-" else _input_format(args.input), args.chunk_rows)
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+
+    stats = {}
+    started = time.perf_counter()
+    try:
+        for text in underwrite_stream(chunks, fmt, stats=stats):
+            out.write(text)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    rows = stats.get("rows", 0)
+    print(f"✅ Underwrote {rows:,} rows in {elapsed:.1f} s ({rows / max(elapsed, 1e-9):,.0f} rows/sec): "
+          + ", ".join(f"{status} {count:,}" for status, count in sorted(stats.get("statuses", {}).items())),
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
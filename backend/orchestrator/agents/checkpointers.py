@@ -0,0 +1,478 @@
+"""
+Checkpointer selection and a durable SQLite checkpointer.
+
+CHECKPOINTER=memory keeps sessions in process in a BoundedMemorySaver:
+MemorySaver with an idle TTL (SESSION_TTL_SECONDS), a global byte budget
+with least-recently-used eviction (SESSION_MAX_MB) and optional pruning to
+the latest checkpoint per thread (SESSION_KEEP_LATEST), so memory no
+longer grows with total traffic. CHECKPOINTER=sqlite stores sessions in
+CHECKPOINT_DB, so they survive restarts and are shared by every worker
+process on the host.
+
+SQLiteSaver:
+- WAL journal: readers in other workers are never blocked by a writer
+- one connection per thread, reused for the life of the process
+- batched writes: put()/put_writes() only queue rows; the queue is
+  committed in one transaction by a background flusher every
+  CHECKPOINT_FLUSH_MS, or when flush() is called (the run_agent
+  functions flush at the end of each turn, before replying). Reads flush
+  first, so a process always sees its own writes. CHECKPOINT_FLUSH_MS=0
+  writes every call through immediately.
+- (thread_id, checkpoint_ns, checkpoint_id) is the primary key of both
+  tables, so loading a thread's latest state is one index seek
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECKPOINTER = os.getenv("CHECKPOINTER", "memory").lower()
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", os.path.join(BASE_DIR, "checkpoints.db"))
+CHECKPOINT_FLUSH_MS = float(os.getenv("CHECKPOINT_FLUSH_MS", "200"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(2 * 3600)))
+SESSION_MAX_MB = float(os.getenv("SESSION_MAX_MB", "256"))
+SESSION_KEEP_LATEST = os.getenv("SESSION_KEEP_LATEST", "false").lower() == "true"
+
+# Rough per-entry cost of the dicts/tuples around each serialized payload
+ENTRY_OVERHEAD_BYTES = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+INSERT_CHECKPOINT = "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+# Special writes (errors, interrupts: negative idx) replace; regular ones are written once
+UPSERT_WRITE = "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+INSERT_WRITE = "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+class SQLiteSaver(BaseCheckpointSaver):
+    """LangGraph checkpointer on a local SQLite file with batched writes"""
+
+    def __init__(self, path=CHECKPOINT_DB, flush_interval_ms=CHECKPOINT_FLUSH_MS, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.flush_interval = flush_interval_ms / 1000
+        self._local = threading.local()
+        self._pending = []  # (sql, params) in arrival order
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stats = {"flushes": 0, "rows_written": 0, "flush_ms": 0.0}
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+        if self.flush_interval > 0:
+            self._flusher = threading.Thread(target=self._run_flusher, name="checkpoint-flusher", daemon=True)
+            self._flusher.start()
+
+    # ---------- connections and batching ----------
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit: transactions are opened explicitly in flush()
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")  # durable with WAL, fsync only at checkpoints
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _enqueue(self, ops):
+        with self._pending_lock:
+            self._pending.extend(ops)
+        if self.flush_interval <= 0:
+            self.flush()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Checkpoint flush failed: {e}")
+
+    def flush(self):
+        """Commit all queued checkpoint rows in one transaction"""
+        with self._write_lock:
+            with self._pending_lock:
+                ops, self._pending = self._pending, []
+            if not ops:
+                return
+            started = time.perf_counter()
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in ops:
+                    conn.execute(sql, params)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                with self._pending_lock:
+                    self._pending[:0] = ops  # retried on the next flush
+                raise
+            self._stats["flushes"] += 1
+            self._stats["rows_written"] += len(ops)
+            self._stats["flush_ms"] += (time.perf_counter() - started) * 1000
+
+    def _read(self, sql, params):
+        if self._pending:
+            self.flush()
+        return self._conn().execute(sql, params).fetchall()
+
+    def stats(self):
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {"path": self.path, "pending_rows": pending, **self._stats,
+                "flush_ms": round(self._stats["flush_ms"], 1)}
+
+    # ---------- reads ----------
+    def _tuple(self, thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata):
+        writes = self._read(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        )
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                  "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, channel, t, v in writes],
+        )
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        if checkpoint_id := get_checkpoint_id(config):
+            rows = self._read(
+                "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+        else:
+            rows = self._read(
+                "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            )
+        return self._tuple(*rows[0]) if rows else None
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        sql = "SELECT * FROM checkpoints"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY checkpoint_id DESC"
+
+        for row in self._read(sql, params):
+            if limit is not None and limit <= 0:
+                break
+            item = self._tuple(*row)
+            if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield item
+
+    # ---------- writes ----------
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        self._enqueue([(INSERT_CHECKPOINT, (
+            thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+            type_, serialized, metadata_type, serialized_metadata,
+        ))])
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        sql = UPSERT_WRITE if all(channel in WRITES_IDX_MAP for channel, _ in writes) else INSERT_WRITE
+        ops = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            ops.append((sql, (thread_id, checkpoint_ns, checkpoint_id, task_id,
+                              WRITES_IDX_MAP.get(channel, idx), channel, type_, serialized, task_path)))
+        self._enqueue(ops)
+
+    def delete_thread(self, thread_id):
+        self._enqueue([
+            ("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,)),
+            ("DELETE FROM writes WHERE thread_id = ?", (thread_id,)),
+        ])
+        self.flush()
+
+    def get_next_version(self, current, channel):
+        current_v = 0 if current is None else current if isinstance(current, int) else int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ---------- async (asgi.py): queueing never blocks; reads and write-through commits go to a thread ----------
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        if self.flush_interval <= 0:  # put() commits before returning
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        if self.flush_interval <= 0:
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+class BoundedMemorySaver(MemorySaver):
+    """MemorySaver with an idle TTL, a byte budget (LRU) and optional pruning.
+
+    Sizes are the serialized checkpoint, metadata, channel blobs and pending
+    writes held per thread plus ENTRY_OVERHEAD_BYTES per entry, so
+    bytes_held tracks (not exactly equals) the process memory they use.
+    Expired threads are dropped on the next write or on access; a thread
+    that is being written is never evicted by its own write.
+    """
+
+    def __init__(self, ttl_seconds=SESSION_TTL_SECONDS, max_bytes=SESSION_MAX_MB * 1024 * 1024,
+                 keep_latest=SESSION_KEEP_LATEST, serde=None):
+        super().__init__(serde=serde)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.keep_latest = keep_latest
+        self._lock = threading.RLock()
+        self._threads = OrderedDict()  # thread_id -> last access, least recent first
+        self._bytes = {}  # thread_id -> bytes held
+        self._write_keys = {}  # thread_id -> keys into self.writes
+        self._blob_keys = {}  # thread_id -> keys into self.blobs
+        self.bytes_held = 0
+        self._evictions = {"ttl": 0, "lru": 0}
+        self._pruned_checkpoints = 0
+
+    # ---------- accounting ----------
+    @staticmethod
+    def _size(typed):
+        return len(typed[0]) + len(typed[1]) + ENTRY_OVERHEAD_BYTES
+
+    def _add_bytes(self, thread_id, delta):
+        self._bytes[thread_id] = self._bytes.get(thread_id, 0) + delta
+        self.bytes_held += delta
+
+    def _touch(self, thread_id):
+        self._threads[thread_id] = time.monotonic()
+        self._threads.move_to_end(thread_id)
+
+    def _expired(self, thread_id):
+        last = self._threads.get(thread_id)
+        return last is not None and self.ttl_seconds > 0 and time.monotonic() - last > self.ttl_seconds
+
+    def _live(self, thread_id):
+        """Touch and report a thread that still has storage; expire it if idle.
+        Unknown threads get no entry (storage is a defaultdict)."""
+        if self._expired(thread_id):
+            self._drop(thread_id)
+            self._evictions["ttl"] += 1
+        if thread_id not in self.storage:
+            return False
+        self._touch(thread_id)
+        return True
+
+    def _drop(self, thread_id):
+        self.storage.pop(thread_id, None)
+        for key in self._write_keys.pop(thread_id, ()):
+            self.writes.pop(key, None)
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        self.bytes_held -= self._bytes.pop(thread_id, 0)
+        self._threads.pop(thread_id, None)
+
+    def _enforce(self, active_thread):
+        """Drop idle threads, then least recently used ones while over budget"""
+        now = time.monotonic()
+        while self._threads and self.ttl_seconds > 0:
+            thread_id, last = next(iter(self._threads.items()))
+            if now - last <= self.ttl_seconds or thread_id == active_thread:
+                break
+            self._drop(thread_id)
+            self._evictions["ttl"] += 1
+        while self.bytes_held > self.max_bytes and len(self._threads) > 1:
+            thread_id = next(iter(self._threads))
+            if thread_id == active_thread:
+                break
+            self._drop(thread_id)
+            self._evictions["lru"] += 1
+            logger.info(f"Session store over budget, evicted least recent session {thread_id}")
+
+    def _prune(self, thread_id, checkpoint_ns, checkpoint):
+        """Keep only the latest checkpoint of (thread_id, checkpoint_ns)"""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        for checkpoint_id in [cid for cid in checkpoints if cid != checkpoint["id"]]:
+            saved, metadata, _ = checkpoints.pop(checkpoint_id)
+            self._add_bytes(thread_id, -(self._size(saved) + self._size(metadata)))
+            self._pruned_checkpoints += 1
+        for key in [k for k in self._write_keys.get(thread_id, ()) if k[1] == checkpoint_ns and k[2] != checkpoint["id"]]:
+            for _, _, value, _ in self.writes.pop(key, {}).values():
+                self._add_bytes(thread_id, -self._size(value))
+            self._write_keys[thread_id].discard(key)
+        versions = checkpoint["channel_versions"]
+        for key in [k for k in self._blob_keys.get(thread_id, ()) if k[1] == checkpoint_ns and versions.get(k[2]) != k[3]]:
+            self._add_bytes(thread_id, -self._size(self.blobs.pop(key)))
+            self._blob_keys[thread_id].discard(key)
+
+    # ---------- checkpointer interface ----------
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            if not self._live(thread_id):
+                return None
+            return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        with self._lock:
+            if config and not self._live(config["configurable"]["thread_id"]):
+                return iter([])
+            return iter(list(super().list(config, filter=filter, before=before, limit=limit)))
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            saved, saved_metadata, _ = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            added = self._size(saved) + self._size(saved_metadata)
+            blob_keys = self._blob_keys.setdefault(thread_id, set())
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel, version)
+                if key not in blob_keys:
+                    blob_keys.add(key)
+                    added += self._size(self.blobs[key])
+            self._add_bytes(thread_id, added)
+            if self.keep_latest:
+                self._prune(thread_id, checkpoint_ns, checkpoint)
+            self._touch(thread_id)
+            self._enforce(thread_id)
+            return result
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        outer_key = (thread_id, config["configurable"].get("checkpoint_ns", ""),
+                     config["configurable"]["checkpoint_id"])
+        with self._lock:
+            before = sum(self._size(value) for _, _, value, _ in self.writes.get(outer_key, {}).values())
+            super().put_writes(config, writes, task_id, task_path)
+            after = sum(self._size(value) for _, _, value, _ in self.writes.get(outer_key, {}).values())
+            self._write_keys.setdefault(thread_id, set()).add(outer_key)
+            self._add_bytes(thread_id, after - before)
+            self._touch(thread_id)
+            self._enforce(thread_id)
+
+    def delete_thread(self, thread_id):
+        with self._lock:
+            self._drop(thread_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "live_sessions": len(self._threads),
+                "bytes_held": self.bytes_held,
+                "max_bytes": int(self.max_bytes),
+                "ttl_seconds": self.ttl_seconds,
+                "keep_latest": self.keep_latest,
+                "evictions": dict(self._evictions),
+                "pruned_checkpoints": self._pruned_checkpoints,
+            }
+
+
+@lru_cache(maxsize=None)
+def _sqlite_saver(path):
+    return SQLiteSaver(path)
+
+
+def get_checkpointer(kind=None):
+    """Checkpointer for build_graph (CHECKPOINTER=memory|sqlite)"""
+    kind = (kind or CHECKPOINTER).lower()
+    if kind == "memory":
+        return BoundedMemorySaver()
+    if kind == "sqlite":
+        logger.info(f"Checkpoints stored in {CHECKPOINT_DB}")
+        # One saver (and flusher) per file, shared by every graph in the process
+        return _sqlite_saver(CHECKPOINT_DB)
+    raise ValueError(f"Unknown CHECKPOINTER '{kind}' (available: memory, sqlite)")
+
+
+def checkpointer_stats(checkpointer):
+    """Session counts and storage for /sessions/stats"""
+    stats = getattr(checkpointer, "stats", None)
+    return {"type": type(checkpointer).__name__, **(stats() if stats is not None else {})}
+
+
+def flush_checkpoints(checkpointer):
+    """Make queued checkpoints durable (no-op for MemorySaver)"""
+    flush = getattr(checkpointer, "flush", None)
+    if flush is not None:
+        flush()
@@ -0,0 +1,255 @@
+"""
+Token-budgeted conversation context for agent prompts.
+
+Agents used to send [SystemMessage] + the whole history on every LLM call,
+so prompts grew with every turn (and every verbose ToolMessage). Here the
+history is split into turns (a HumanMessage plus the AI/tool messages that
+answer it): the last CONTEXT_KEEP_TURNS turns are sent verbatim and older
+turns are folded into a rolling summary kept in the graph state
+(context_summary, summarized_through), so each turn is summarized once.
+
+A hard budget of CONTEXT_MAX_TOKENS per call is enforced on top: the oldest
+kept turns are folded into the summary first, then ToolMessages in the
+window are cut down, then the summary itself. The newest user message is
+never trimmed. Tool results from earlier turns whose outcome is already
+in the state are stubbed out of the window (see tool_payloads).
+
+Summaries are extractive by default (no extra LLM call); set
+CONTEXT_SUMMARIZER=llm to have the model rewrite the summary instead.
+"""
+import os
+import json
+import logging
+from functools import lru_cache
+
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
+from langgraph.constants import TAG_NOSTREAM
+
+from agents.tool_payloads import stub_consumed_tool_results
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_WINDOWING = os.getenv("CONTEXT_WINDOWING", "true").lower() == "true"
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "4"))
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "6000"))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "400"))
+CONTEXT_SUMMARIZER = os.getenv("CONTEXT_SUMMARIZER", "extractive").lower()
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators, per OpenAI's chat format
+SUMMARY_LINE_CHARS = 160
+SUMMARY_HEADER = "Summary of the earlier conversation (older messages are not shown):\n"
+
+SUMMARY_PROMPT = """You maintain a running summary of a loan application chat between a customer and a loan advisor.
+Update the summary with the new messages below. Keep every fact that matters for the application:
+amounts, tenure, salary, PAN, verification and underwriting results, offers made and what the customer asked for.
+Write plain sentences, at most {max_words} words. Reply with the summary only.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}"""
+
+
+# ================= TOKEN COUNTING =================
+@lru_cache(maxsize=1)
+def _encoding():
+    """tiktoken encoding for gpt-4o models, or None to fall back to estimates"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(os.getenv("CONTEXT_TOKENIZER", "o200k_base"))
+    except Exception as e:  # not installed, or the BPE file cannot be downloaded
+        logger.warning(f"tiktoken unavailable ({type(e).__name__}), estimating tokens from length")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(message) -> int:
+    """Tokens a message costs in a chat completion request"""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_tokens(content)
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(tool_call["name"]) + count_tokens(json.dumps(tool_call["args"]))
+    return tokens
+
+
+def count_message_tokens(messages) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+# ================= TURNS =================
+def split_turns(messages):
+    """Group messages into turns, each starting at a HumanMessage"""
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+def _unsummarized_start(messages, summarized_through):
+    """Index of the first message not yet covered by the summary"""
+    if not summarized_through:
+        return 0
+    for i, message in enumerate(messages):
+        if message.id == summarized_through:
+            return i + 1
+    return 0  # summarized messages were pruned from the history
+
+
+# ================= SUMMARIES =================
+def _clip(text, limit=SUMMARY_LINE_CHARS):
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _summary_line(message):
+    if isinstance(message, HumanMessage):
+        return f"Customer: {_clip(message.content)}"
+    if isinstance(message, ToolMessage):
+        try:
+            result = json.loads(message.content)
+        except (TypeError, ValueError):
+            return f"Tool result: {_clip(message.content)}"
+        if isinstance(result, dict):
+            # Scalar fields carry the decision (status, rate, limit); drop nested lists
+            result = {k: v for k, v in result.items() if isinstance(v, (str, int, float, bool))}
+        return f"Tool result: {_clip(json.dumps(result, ensure_ascii=False))}"
+    if isinstance(message, AIMessage):
+        parts = []
+        if message.content:
+            parts.append(f"Advisor: {_clip(message.content)}")
+        for tool_call in message.tool_calls or []:
+            parts.append(f"Advisor called {tool_call['name']}({_clip(json.dumps(tool_call['args']), 80)})")
+        return "\n".join(parts) or None
+    return None
+
+
+def trim_summary(summary: str, max_tokens: int) -> str:
+    """Drop the oldest summary lines until it fits in max_tokens"""
+    if not summary or count_tokens(summary) <= max_tokens:
+        return summary
+    lines = summary.split("\n")
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    summary = "\n".join(lines)
+    if count_tokens(summary) > max_tokens:
+        summary = summary[:max_tokens * 4]
+    return summary
+
+
+def extractive_summary(summary, messages, max_tokens=CONTEXT_SUMMARY_TOKENS):
+    """Append one short line per message to the summary, keeping the newest lines"""
+    lines = [summary] if summary else []
+    lines += [line for line in map(_summary_line, messages) if line]
+    return trim_summary("\n".join(lines), max_tokens)
+
+
+def llm_summary(llm, summary, messages, max_tokens=CONTEXT_SUMMARY_TOKENS):
+    """Have the LLM fold messages into the summary; extractive on failure"""
+    transcript = "\n".join(line for line in map(_summary_line, messages) if line)
+    prompt = SUMMARY_PROMPT.format(
+        max_words=max(50, max_tokens * 3 // 4),
+        summary=summary or "(none yet)",
+        messages=transcript,
+    )
+    try:
+        # Internal call: keep its tokens out of streamed replies
+        result = llm.invoke([HumanMessage(content=prompt)], config={"tags": [TAG_NOSTREAM]})
+        return trim_summary(str(result.content).strip(), max_tokens)
+    except Exception as e:
+        logger.error(f"Summary LLM call failed, using extractive summary: {e}")
+        return extractive_summary(summary, messages, max_tokens)
+
+
+# ================= CONTEXT WINDOW =================
+def _truncate_tool_messages(window, excess):
+    """Shorten ToolMessages (oldest first) until excess tokens are removed"""
+    window = list(window)
+    for i, message in enumerate(window):
+        if excess <= 0:
+            break
+        if not isinstance(message, ToolMessage):
+            continue
+        tokens = count_tokens(message.content)
+        keep = max(0, tokens - excess)
+        if keep >= tokens:
+            continue
+        clipped = message.content[:keep * 4] + f"\n…[truncated {tokens - keep} tokens]"
+        window[i] = message.model_copy(update={"content": clipped})
+        excess -= tokens - count_tokens(clipped)
+    return window, excess
+
+
+def build_context(state, system_tokens=0, llm=None):
+    """Choose the messages to send after the system prompt.
+
+    Args:
+        state: graph state with "messages" and optionally "context_summary"
+            and "summarized_through"
+        system_tokens: tokens already used by the system prompt(s)
+        llm: chat model used when CONTEXT_SUMMARIZER=llm
+
+    Returns:
+        tuple: (messages to send, state updates for the summary fields; empty
+        when nothing new was folded)
+    """
+    messages = state["messages"]
+    if not CONTEXT_WINDOWING:
+        return stub_consumed_tool_results(messages, state), {}
+
+    summary = state.get("context_summary") or ""
+    start = _unsummarized_start(messages, state.get("summarized_through"))
+    turns = split_turns(messages[start:])
+    folded = turns[:-CONTEXT_KEEP_TURNS] if len(turns) > CONTEXT_KEEP_TURNS else []
+    # Turns keep their boundaries: stubbing only swaps ToolMessage contents
+    kept = split_turns(stub_consumed_tool_results([m for turn in turns[len(folded):] for m in turn], state))
+
+    def total(summary_tokens, kept):
+        return system_tokens + summary_tokens + sum(count_message_tokens(t) for t in kept)
+
+    def summary_cost(summary):
+        return count_tokens(SUMMARY_HEADER + summary) + MESSAGE_OVERHEAD_TOKENS if summary else 0
+
+    # Fold whole turns first: the budget may need more than the turn limit.
+    # A summary that is about to grow is counted at its cap while deciding.
+    while len(kept) > 1:
+        summary_tokens = summary_cost(summary) if not folded else \
+            count_tokens(SUMMARY_HEADER) + MESSAGE_OVERHEAD_TOKENS + CONTEXT_SUMMARY_TOKENS
+        if total(summary_tokens, kept) <= CONTEXT_MAX_TOKENS:
+            break
+        folded.append(kept.pop(0))
+
+    updates = {}
+    if folded:
+        folded_messages = [m for turn in folded for m in turn]
+        if CONTEXT_SUMMARIZER == "llm" and llm is not None:
+            summary = llm_summary(llm, summary, folded_messages)
+        else:
+            summary = extractive_summary(summary, folded_messages)
+        updates = {"context_summary": summary, "summarized_through": folded_messages[-1].id}
+
+    window = [m for turn in kept for m in turn]
+    excess = total(summary_cost(summary), kept) - CONTEXT_MAX_TOKENS
+    if excess > 0:
+        window, excess = _truncate_tool_messages(window, excess)
+    if excess > 0 and summary:
+        summary = trim_summary(summary, max(0, count_tokens(summary) - excess))
+
+    prompt_messages = ([SystemMessage(content=SUMMARY_HEADER + summary)] if summary else []) + window
+    logger.info(
+        f"Context: {len(prompt_messages)}/{len(messages)} messages, "
+        f"{system_tokens + count_message_tokens(prompt_messages)} prompt tokens "
+        f"(full history {system_tokens + count_message_tokens(messages)}, budget {CONTEXT_MAX_TOKENS})"
+    )
+    return prompt_messages, updates
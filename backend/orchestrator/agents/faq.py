@@ -0,0 +1,107 @@
+"""
+Answers for static FAQ intents without calling the LLM.
+
+"What are your interest rates?" used to take an LLM call, a
+get_market_rates_tool call and a second LLM call to show a fixed table.
+match_intent() recognises these questions from normalized text and
+get_answer() renders the reply from the same market-rate data the tool
+returns, caching each rendered answer for FAQ_CACHE_TTL seconds.
+
+Matching is deliberately narrow: a short question about rates, tenures or
+fees and nothing else. Messages with numbers (amounts, PAN, salary) or
+words about the customer's own application go to the agent as before,
+and so does every FAQ once the customer has an application under way
+(see route_start in unified_agent.py).
+"""
+import os
+import re
+import time
+import logging
+import threading
+from collections import Counter
+
+from agents.tools import get_market_rates
+
+logger = logging.getLogger(__name__)
+
+FAQ_CACHE = os.getenv("FAQ_CACHE", "true").lower() == "true"
+FAQ_CACHE_TTL = float(os.getenv("FAQ_CACHE_TTL", "300"))
+FAQ_MAX_WORDS = 14
+
+# Checked in order; the first match wins
+INTENTS = {
+    "fees": re.compile(r"\b(?:processing (?:fees?|charges?)|fees?|charges)\b"),
+    "tenures": re.compile(r"\b(?:tenures?|durations?|repayment (?:periods?|terms?)|loan terms?|how long)\b"),
+    "rates": re.compile(r"\b(?:interest rates?|rates? of interest|rates?|roi|interest)\b"),
+}
+
+# Words that make a question about the customer's own case rather than the rate card
+PERSONAL_WORDS = {
+    "i", "i'm", "im", "my", "mine", "eligible", "eligibility", "emi", "emis", "approve",
+    "approved", "apply", "salary", "payslip", "pan", "letter", "sanction", "lakh",
+    "lakhs", "lac", "thousand", "crore", "lower", "reduce", "discount", "negotiate",
+    "better", "match", "instead", "if", "why", "prepay", "prepayment", "foreclose",
+}
+
+_answers = {}  # intent -> (expires_at, text)
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9']+", " ", (text or "").lower()).split())
+
+
+def match_intent(text: str):
+    """Return the FAQ intent a message asks about, or None"""
+    normalized = normalize(text)
+    words = normalized.split()
+    if not words or len(words) > FAQ_MAX_WORDS or any(ch.isdigit() for ch in normalized):
+        return None
+    if PERSONAL_WORDS.intersection(words):
+        return None
+    for intent, pattern in INTENTS.items():
+        if pattern.search(normalized):
+            return intent
+    return None
+
+
+def render_answer(intent: str) -> str:
+    rates = get_market_rates()
+    if intent == "fees":
+        intro = "Here are our processing fees, charged once on the approved amount:"
+        lines = [f"- **{r['tenure']}**: {r['processing_fee']} processing fee ({r['rate']} p.a. interest)" for r in rates]
+    elif intent == "tenures":
+        tenures = [r["tenure"] for r in rates]
+        intro = f"You can choose a tenure of {', '.join(tenures[:-1])} or {tenures[-1]}:"
+        lines = [f"- **{r['tenure']}** at {r['rate']} p.a. (processing fee {r['processing_fee']})" for r in rates]
+    else:
+        intro = "Here are our current personal loan interest rates:"
+        lines = [f"- **{r['tenure']}**: {r['rate']} p.a. (processing fee {r['processing_fee']})" for r in rates]
+    outro = "Tell me how much you'd like to borrow and I'll help you pick the best option for you!"
+    return "\n".join([intro, ""] + lines + ["", outro])
+
+
+def get_answer(intent: str) -> str:
+    """Rendered answer for an intent, re-rendered once its TTL expires"""
+    now = time.monotonic()
+    with _lock:
+        cached = _answers.get(intent)
+        if cached and cached[0] > now:
+            _stats[f"hit:{intent}"] += 1
+            return cached[1]
+    answer = render_answer(intent)
+    with _lock:
+        _answers[intent] = (now + FAQ_CACHE_TTL, answer)
+        _stats[f"render:{intent}"] += 1
+    return answer
+
+
+def clear_cache():
+    with _lock:
+        _answers.clear()
+
+
+def get_faq_stats() -> dict:
+    with _lock:
+        return dict(_stats)
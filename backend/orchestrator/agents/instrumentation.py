@@ -0,0 +1,334 @@
+"""
+Per-node LLM latency, token and cost metrics.
+
+llm_metrics is a LangChain callback handler attached to the ChatOpenAI
+instances and to the compiled graphs. LangGraph tags every run with the
+node it belongs to (metadata["langgraph_node"]) and the session
+(metadata["thread_id"]), so the handler can attribute:
+
+- node runs: wall time per execution of agent, tools, supervisor, ...
+- LLM calls: wall time, time-to-first-token, prompt/completion/cached
+  tokens, tool calls requested and cost
+- tool runs: wall time per tool
+
+Totals and fixed-bucket histograms are kept per node, plus per-session
+totals for the most recent METRICS_MAX_SESSIONS sessions. snapshot()
+returns everything as JSON-ready dicts (served at /llm/stats).
+"""
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+METRICS_MAX_SESSIONS = int(os.getenv("METRICS_MAX_SESSIONS", "1000"))
+
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+TOKEN_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+# USD per million tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+}
+
+
+def _price(model):
+    model = model or ""
+    # Dated snapshots ("gpt-4o-mini-2024-07-18") price like their family
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_PRICES[name]
+    return None
+
+
+def llm_cost(model, prompt_tokens, cached_tokens, completion_tokens):
+    price = _price(model)
+    if price is None:
+        return 0.0
+    input_price, cached_price, output_price = price
+    return ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+            + completion_tokens * output_price) / 1e6
+
+
+class Histogram:
+    """Counts per upper bound, plus count/sum; the last bucket is +Inf"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        labels = [f"le_{b}" for b in self.bounds] + ["le_inf"]
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 1),
+            "mean": round(self.sum / self.count, 1) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+def _node_metrics():
+    return {
+        "runs": 0,
+        "errors": 0,
+        "wall_ms": Histogram(LATENCY_BUCKETS_MS),
+        "llm_calls": 0,
+        "llm_ms": Histogram(LATENCY_BUCKETS_MS),
+        "ttft_ms": Histogram(LATENCY_BUCKETS_MS),
+        "prompt_tokens": Histogram(TOKEN_BUCKETS),
+        "completion_tokens": Histogram(TOKEN_BUCKETS),
+        "cached_tokens": 0,
+        "tool_calls": 0,
+        "cost_usd": 0.0,
+    }
+
+
+def _session_metrics():
+    return {
+        "turns": 0,
+        "turn_ms": 0.0,
+        "llm_calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cached_tokens": 0,
+        "tool_calls": 0,
+        "cost_usd": 0.0,
+        "nodes": defaultdict(lambda: {"runs": 0, "wall_ms": 0.0, "llm_calls": 0, "tokens": 0}),
+    }
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Callback handler aggregating per-node and per-session LLM metrics"""
+
+    def __init__(self, max_sessions=METRICS_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._runs = {}  # run_id -> in-flight run info
+        self._nodes = defaultdict(_node_metrics)
+        self._tools = defaultdict(lambda: {"runs": 0, "errors": 0, "wall_ms": Histogram(LATENCY_BUCKETS_MS)})
+        self._sessions = OrderedDict()
+
+    # ---------- helpers ----------
+    def _session(self, session_id):
+        """Per-session totals; caller holds the lock"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _session_metrics()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def _start(self, run_id, kind, metadata, name=None):
+        metadata = metadata or {}
+        with self._lock:
+            self._runs[run_id] = {
+                "kind": kind,
+                "name": name,
+                "node": metadata.get("langgraph_node") or "(none)",
+                "session": metadata.get("thread_id"),
+                "model": metadata.get("ls_model_name"),
+                "started": time.perf_counter(),
+                "first_token": None,
+            }
+
+    def _finish(self, run_id):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is not None:
+            run["elapsed_ms"] = (time.perf_counter() - run["started"]) * 1000
+        return run
+
+    # ---------- graph runs and nodes ----------
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name")
+        if parent_run_id is None:
+            self._start(run_id, "turn", metadata, name)
+        elif metadata and name and name == metadata.get("langgraph_node") and not name.startswith("__"):
+            self._start(run_id, "node", metadata, name)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._record_chain(run_id, error=False)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._record_chain(run_id, error=True)
+
+    def _record_chain(self, run_id, error):
+        run = self._finish(run_id)
+        if run is None:
+            return
+        with self._lock:
+            session = self._session(run["session"]) if run["session"] else None
+            if run["kind"] == "turn":
+                if session is not None:
+                    session["turns"] += 1
+                    session["turn_ms"] += run["elapsed_ms"]
+                return
+            node = self._nodes[run["node"]]
+            node["runs"] += 1
+            node["errors"] += error
+            node["wall_ms"].observe(run["elapsed_ms"])
+            if session is not None:
+                session["nodes"][run["node"]]["runs"] += 1
+                session["nodes"][run["node"]]["wall_ms"] += run["elapsed_ms"]
+
+    # ---------- LLM calls ----------
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm", metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm", metadata)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None and run["first_token"] is None:
+                run["first_token"] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._finish(run_id)
+        if run is None:
+            return
+        usage, tool_calls, model = {}, 0, run["model"]
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is None:
+                    continue
+                usage = getattr(message, "usage_metadata", None) or usage
+                tool_calls += len(getattr(message, "tool_calls", None) or [])
+                model = (message.response_metadata or {}).get("model_name") or model
+        if not usage and response.llm_output:
+            token_usage = response.llm_output.get("token_usage") or {}
+            usage = {"input_tokens": token_usage.get("prompt_tokens", 0),
+                     "output_tokens": token_usage.get("completion_tokens", 0)}
+        prompt_tokens = usage.get("input_tokens", 0) or 0
+        completion_tokens = usage.get("output_tokens", 0) or 0
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        cost = llm_cost(model, prompt_tokens, cached_tokens, completion_tokens)
+
+        with self._lock:
+            node = self._nodes[run["node"]]
+            node["llm_calls"] += 1
+            node["llm_ms"].observe(run["elapsed_ms"])
+            if run["first_token"] is not None:
+                node["ttft_ms"].observe((run["first_token"] - run["started"]) * 1000)
+            node["prompt_tokens"].observe(prompt_tokens)
+            node["completion_tokens"].observe(completion_tokens)
+            node["cached_tokens"] += cached_tokens
+            node["tool_calls"] += tool_calls
+            node["cost_usd"] += cost
+            if run["session"]:
+                session = self._session(run["session"])
+                session["llm_calls"] += 1
+                session["prompt_tokens"] += prompt_tokens
+                session["completion_tokens"] += completion_tokens
+                session["cached_tokens"] += cached_tokens
+                session["tool_calls"] += tool_calls
+                session["cost_usd"] += cost
+                session["nodes"][run["node"]]["llm_calls"] += 1
+                session["nodes"][run["node"]]["tokens"] += prompt_tokens + completion_tokens
+        logger.info(
+            f"LLM [{run['node']}]: {run['elapsed_ms']:.0f} ms, "
+            f"{prompt_tokens} prompt ({cached_tokens} cached) + {completion_tokens} completion tokens, "
+            f"{tool_calls} tool calls, ${cost:.6f}"
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._finish(run_id)
+        if run is not None:
+            with self._lock:
+                self._nodes[run["node"]]["errors"] += 1
+
+    # ---------- tools ----------
+    def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "tool", metadata, (serialized or {}).get("name") or kwargs.get("name"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._record_tool(run_id, error=False)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._record_tool(run_id, error=True)
+
+    def _record_tool(self, run_id, error):
+        run = self._finish(run_id)
+        if run is None:
+            return
+        with self._lock:
+            tool = self._tools[run["name"] or "(unknown)"]
+            tool["runs"] += 1
+            tool["errors"] += error
+            tool["wall_ms"].observe(run["elapsed_ms"])
+
+    # ---------- reporting ----------
+    @staticmethod
+    def _export(metrics):
+        exported = {}
+        for key, value in metrics.items():
+            if isinstance(value, Histogram):
+                exported[key] = value.snapshot()
+            elif isinstance(value, float):
+                exported[key] = round(value, 6 if key == "cost_usd" else 1)
+            elif isinstance(value, dict):
+                exported[key] = {k: LLMMetricsHandler._export(v) if isinstance(v, dict) else v
+                                 for k, v in value.items()}
+            else:
+                exported[key] = value
+        return exported
+
+    def session_snapshot(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return self._export(session) if session is not None else None
+
+    def snapshot(self, max_sessions=20):
+        """Per-node and per-tool metrics plus the most recent sessions"""
+        with self._lock:
+            recent = list(self._sessions.items())[-max_sessions:] if max_sessions else []
+            return {
+                "nodes": {name: self._export(m) for name, m in self._nodes.items()},
+                "tools": {name: self._export(m) for name, m in self._tools.items()},
+                "sessions_tracked": len(self._sessions),
+                "sessions": {sid: self._export(m) for sid, m in reversed(recent)},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._runs.clear()
+            self._nodes.clear()
+            self._tools.clear()
+            self._sessions.clear()
+
+
+llm_metrics = LLMMetricsHandler()
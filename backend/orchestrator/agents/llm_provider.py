@@ -0,0 +1,348 @@
+"""
+Pluggable chat model provider for the agent graphs.
+
+Select the backend with LLM_PROVIDER:
+
+- openai (default): ChatOpenAI with OPENAI_MODEL (gpt-4o-mini)
+- stub: StubChatModel, an offline scripted model for load tests and
+  benchmarks. It needs no network or API key, walks the loan flow the
+  way the real model does (get_market_rates_tool for rate questions,
+  verification_agent_tool when a PAN arrives, underwriting_agent_tool
+  after verification, sanction_letter_tool when the customer confirms)
+  and simulates provider timing: STUB_LLM_LATENCY_MS before the first
+  token, then STUB_LLM_TOKENS_PER_SEC, with optional +/- STUB_LLM_JITTER
+  (fraction) seeded by STUB_LLM_SEED. Replies are deterministic.
+
+Additional providers can be added with register_provider().
+"""
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+logger = logging.getLogger(__name__)
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+STUB_LLM_LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", "400"))
+STUB_LLM_TOKENS_PER_SEC = float(os.getenv("STUB_LLM_TOKENS_PER_SEC", "80"))
+STUB_LLM_JITTER = float(os.getenv("STUB_LLM_JITTER", "0"))
+STUB_LLM_SEED = int(os.getenv("STUB_LLM_SEED", "0"))
+
+PAN_REGEX = re.compile(r"\b([A-Z]{5}[0-9]{4}[A-Z])\b")
+RATES_REGEX = re.compile(r"\b(?:interest|rates?|tenures?|roi)\b")
+CONFIRM_REGEX = re.compile(r"\b(?:yes|yeah|sure|ok(?:ay)?|proceed|generate|letter|sanction|confirm)\b")
+
+
+# ================= SCRIPTED STUB MODEL =================
+def _amount(text):
+    return int(text.replace(",", "")) if text else None
+
+
+class _Facts:
+    """What the stub knows about the application, read from the prompt"""
+
+    def __init__(self, messages):
+        state_text = "\n".join(m.content for m in messages if isinstance(m, SystemMessage))
+
+        def find(pattern):
+            match = re.search(pattern, state_text)
+            return match.group(1).strip() if match else None
+
+        self.name = find(r"Customer Name: (.+)")
+        if self.name in ("Not provided", "Not provided yet", "Customer"):
+            self.name = None
+        self.amount = _amount(find(r"(?:Loan|Requested) Amount: ₹([\d,]+)"))
+        self.salary = _amount(find(r"Monthly Salary: ₹([\d,]+)"))
+        self.status = find(r"Underwriting Status: (\w+)") or "PENDING"
+        self.kyc_verified = bool(re.search(r"KYC (?:Verified|Status): (?:Yes|Completed)", state_text))
+        self.pan = find(r"PAN: ([A-Z]{5}[0-9]{4}[A-Z])")
+        self.interest = None
+        self.letter = find(r"Sanction Letter: (Generated)") is not None
+
+        tool_names = {}
+        for message in messages:
+            if isinstance(message, HumanMessage):
+                pan = PAN_REGEX.search(str(message.content).upper())
+                self.pan = pan.group(1) if pan else self.pan
+                if self.amount is None:
+                    lakhs = re.search(r"(\d+(?:\.\d+)?)\s*(?:lakh|lac)", str(message.content).lower())
+                    self.amount = int(float(lakhs.group(1)) * 100000) if lakhs else None
+            elif isinstance(message, AIMessage):
+                for tool_call in message.tool_calls or []:
+                    tool_names[tool_call["id"]] = tool_call["name"]
+            elif isinstance(message, ToolMessage):
+                try:
+                    result = json.loads(message.content)
+                except (TypeError, ValueError):
+                    continue
+                name = tool_names.get(message.tool_call_id)
+                if name == "verification_agent_tool" and result.get("verified"):
+                    self.kyc_verified = True
+                    self.name = result.get("name") or self.name
+                elif name == "underwriting_agent_tool" and result.get("status"):
+                    self.status = result["status"]
+                    self.interest = result.get("interest_rate", self.interest)
+                elif name == "sanction_letter_tool" and result.get("status") == "success":
+                    self.letter = True
+        self.tool_names = tool_names
+
+
+def _schema_defaults(schema):
+    """Arguments satisfying a JSON schema: first enum option, placeholder strings"""
+    args = {}
+    for name, prop in (schema.get("properties") or {}).items():
+        if "enum" in prop:
+            args[name] = prop["enum"][0]
+        elif prop.get("type") in ("integer", "number"):
+            args[name] = 0
+        elif prop.get("type") == "boolean":
+            args[name] = False
+        else:
+            args[name] = "Scripted decision from the offline stub model."
+    return args
+
+
+class StubChatModel(BaseChatModel):
+    """Deterministic offline chat model that follows the loan flow."""
+
+    model_name: str = "stub-chat"
+    latency_ms: float = STUB_LLM_LATENCY_MS
+    tokens_per_sec: float = STUB_LLM_TOKENS_PER_SEC
+    jitter: float = STUB_LLM_JITTER
+    seed: int = STUB_LLM_SEED
+    streaming: bool = True
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+        self._rng_lock = threading.Lock()
+        self._calls = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name, "latency_ms": self.latency_ms,
+                "tokens_per_sec": self.tokens_per_sec}
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        formatted = [convert_to_openai_tool(t) for t in tools]
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        return self.bind(tools=formatted, **kwargs)
+
+    # ---------- script ----------
+    def _tool_call(self, name, args):
+        with self._rng_lock:
+            self._calls += 1
+            call_id = f"call_stub_{self._calls}"
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": call_id}])
+
+    def respond(self, messages, tools=None, tool_choice=None) -> AIMessage:
+        """The scripted reply to a prompt (no timing simulation)"""
+        tools = tools or []
+        available = {t["function"]["name"]: t["function"] for t in tools}
+        if tool_choice not in (None, "auto", "none") and len(tools) == 1:
+            # with_structured_output(): answer through the schema's tool
+            function = tools[0]["function"]
+            return self._tool_call(function["name"], _schema_defaults(function.get("parameters") or {}))
+
+        facts = _Facts(messages)
+        # The per-call state message follows the conversation (prompt_cache.py)
+        conversation = [m for m in messages if not isinstance(m, SystemMessage)]
+        last = conversation[-1] if conversation else HumanMessage(content="")
+
+        if isinstance(last, ToolMessage):
+            name = facts.tool_names.get(last.tool_call_id)
+            if (name == "verification_agent_tool" and "underwriting_agent_tool" in available
+                    and facts.kyc_verified and facts.pan and facts.amount and facts.status == "PENDING"):
+                return self._tool_call("underwriting_agent_tool", {
+                    "pan": facts.pan, "amount": facts.amount, "monthly_salary": facts.salary or 0})
+            return AIMessage(content=self._tool_reply(name, last.content, facts))
+
+        text = str(last.content)
+        lowered = text.lower()
+        pan = PAN_REGEX.search(text.upper())
+        if (facts.status == "APPROVED" and not facts.letter and "sanction_letter_tool" in available
+                and CONFIRM_REGEX.search(lowered) and facts.pan and facts.amount):
+            return self._tool_call("sanction_letter_tool", {
+                "name": facts.name or "Customer", "pan": facts.pan,
+                "amount": facts.amount, "interest": facts.interest or 10.5})
+        if pan and "verification_agent_tool" in available and not facts.kyc_verified:
+            return self._tool_call("verification_agent_tool", {"pan": pan.group(1)})
+        if (facts.kyc_verified and facts.status in ("PENDING", "NEED_SALARY") and facts.pan
+                and facts.amount and "underwriting_agent_tool" in available):
+            return self._tool_call("underwriting_agent_tool", {
+                "pan": facts.pan, "amount": facts.amount, "monthly_salary": facts.salary or 0})
+        if RATES_REGEX.search(lowered) and "get_market_rates_tool" in available:
+            return self._tool_call("get_market_rates_tool", {})
+        return AIMessage(content=self._text_reply(facts))
+
+    @staticmethod
+    def _tool_reply(name, content, facts):
+        try:
+            result = json.loads(content)
+        except (TypeError, ValueError):
+            result = {}
+        if name == "get_market_rates_tool":
+            rows = "\n".join(f"- **{r['tenure']}**: {r['rate']} p.a. (processing fee {r['processing_fee']})"
+                             for r in result.get("rates", []))
+            return (f"Here are our current interest rates:\n\n{rows}\n\n"
+                    "Shorter tenures carry a lower rate, while longer ones keep your EMI comfortable. "
+                    "How much would you like to borrow, and over how many months?")
+        if name == "verification_agent_tool":
+            if result.get("verified"):
+                return (f"✅ Thank you, {result.get('name') or 'your'} details are verified. "
+                        "Let me connect you to our credit evaluation team to check your eligibility.")
+            return ("❌ I couldn't verify that PAN against our records. "
+                    "Could you please double-check it and share it again? The format is ABCDE1234F.")
+        if name == "underwriting_agent_tool":
+            status = result.get("status")
+            if status == "APPROVED":
+                return (f"✅ Congratulations! Your loan of ₹{result.get('amount', facts.amount):,} is approved "
+                        f"at {result.get('interest_rate')}% p.a. Would you like me to generate your sanction letter?")
+            if status == "NEED_SALARY":
+                return ("Your request is above your pre-approved limit, so I need to confirm your income. "
+                        "Could you please upload your latest payslip showing your monthly in-hand salary?")
+            if status == "REJECTED":
+                return (f"❌ I'm sorry, I can't approve this request: {result.get('reason')}. "
+                        f"{result.get('suggestion', 'You may reapply with a smaller amount.')}")
+            return "I couldn't complete the eligibility check right now. Please try again in a moment."
+        if name == "sanction_letter_tool":
+            if result.get("status") == "success":
+                return ("🎉 Your sanction letter is ready! "
+                        f"[Download Sanction Letter]({result.get('download_link')})\n\n"
+                        "Please review the terms; the amount is disbursed once you accept the offer.")
+            return "I couldn't generate the sanction letter just now. Shall I try again?"
+        return "Thanks, I've noted that. How else can I help with your loan application?"
+
+    @staticmethod
+    def _text_reply(facts):
+        if facts.letter:
+            return "Your sanction letter has been generated. Is there anything else I can help you with?"
+        if not facts.amount:
+            return ("Hello! I'm Nexus, your personal loan advisor. I'd be happy to help you find the right loan. "
+                    "How much would you like to borrow, and what is the loan for?")
+        if not facts.kyc_verified:
+            return (f"Great, a loan of ₹{facts.amount:,} is something we can work with. "
+                    "We offer tenures of 12, 24 and 36 months at competitive rates. To proceed, "
+                    "could you please share your PAN number for KYC verification?")
+        if facts.status == "NEED_SALARY":
+            return "To complete the evaluation, could you please upload your latest payslip?"
+        if facts.status == "APPROVED":
+            return "Your loan is approved. Would you like me to generate your sanction letter now?"
+        return "Thanks! Is there anything else you'd like to know about your loan?"
+
+    # ---------- timing simulation ----------
+    def _first_token_delay(self):
+        delay = self.latency_ms / 1000
+        if self.jitter:
+            with self._rng_lock:
+                delay *= 1 + self._rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay)
+
+    def _plan(self, messages, tools, tool_choice):
+        """(reply, chunks, usage) where chunks is a list of (delay, AIMessageChunk)"""
+        from agents.context import count_message_tokens, count_tokens
+        reply = self.respond(messages, tools, tool_choice)
+        per_token = 1 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+        chunks = []
+        if reply.tool_calls:
+            tool_call = reply.tool_calls[0]
+            args = json.dumps(tool_call["args"])
+            output_tokens = count_tokens(tool_call["name"]) + count_tokens(args)
+            chunks.append((self._first_token_delay() + output_tokens * per_token, AIMessageChunk(
+                content="", tool_call_chunks=[{"name": tool_call["name"], "args": args,
+                                               "id": tool_call["id"], "index": 0}])))
+        else:
+            words = re.findall(r"\S+\s*", reply.content)
+            output_tokens = count_tokens(reply.content)
+            token_delay = per_token * output_tokens / max(1, len(words))
+            for i, word in enumerate(words):
+                chunks.append(((self._first_token_delay() if i == 0 else 0) + token_delay,
+                               AIMessageChunk(content=word)))
+        input_tokens = count_message_tokens(messages) + count_tokens(json.dumps(tools)) if tools else \
+            count_message_tokens(messages)
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                 "total_tokens": input_tokens + output_tokens}
+        chunks.append((0, AIMessageChunk(content="", usage_metadata=usage,
+                                         response_metadata={"model_name": self.model_name})))
+        return reply, chunks, usage
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs):
+        reply, chunks, usage = self._plan(messages, tools, tool_choice)
+        time.sleep(sum(delay for delay, _ in chunks))
+        reply.usage_metadata = usage
+        reply.response_metadata = {"model_name": self.model_name}
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs):
+        reply, chunks, usage = self._plan(messages, tools, tool_choice)
+        await asyncio.sleep(sum(delay for delay, _ in chunks))
+        reply.usage_metadata = usage
+        reply.response_metadata = {"model_name": self.model_name}
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+    def _stream(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs):
+        _, chunks, _ = self._plan(messages, tools, tool_choice)
+        for delay, chunk in chunks:
+            if delay:
+                time.sleep(delay)
+            yield ChatGenerationChunk(message=chunk)  # the base class reports tokens to callbacks
+
+    async def _astream(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs):
+        _, chunks, _ = self._plan(messages, tools, tool_choice)
+        for delay, chunk in chunks:
+            if delay:
+                await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=chunk)  # the base class reports tokens to callbacks
+
+
+# ================= PROVIDERS =================
+def _openai_llm(temperature=0.3, callbacks=None):
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        model=OPENAI_MODEL,
+        temperature=temperature,
+        api_key=os.getenv("OPENAI_API_KEY"),
+        streaming=True,
+        stream_usage=True,  # usage metadata (incl. cached prompt tokens) on streamed responses
+        callbacks=callbacks
+    )
+
+
+def _stub_llm(temperature=0.3, callbacks=None):
+    return StubChatModel(callbacks=callbacks)
+
+
+PROVIDERS = {
+    "openai": _openai_llm,
+    "stub": _stub_llm,
+}
+
+
+def register_provider(name, factory):
+    """Make a chat model factory(temperature, callbacks) selectable via LLM_PROVIDER."""
+    PROVIDERS[name] = factory
+
+
+def get_llm(provider: Optional[str] = None, temperature=0.3, callbacks=None):
+    """Create the chat model for provider (default LLM_PROVIDER)."""
+    provider = (provider or LLM_PROVIDER).lower()
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM_PROVIDER '{provider}' (available: {', '.join(PROVIDERS)})")
+    logger.info(f"LLM provider: {provider}")
+    return PROVIDERS[provider](temperature=temperature, callbacks=callbacks)
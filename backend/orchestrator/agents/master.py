@@ -2,21 +2,29 @@ import os
 import re
 import json
 import logging
+from collections import Counter
 from dotenv import load_dotenv, find_dotenv # Added find_dotenv for robustness
 from pathlib import Path
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import SystemMessage, HumanMessage, AnyMessage, AIMessage, ToolMessage
 from typing import Annotated, TypedDict, Literal, Optional
 from langgraph.graph.message import add_messages
 from pydantic import BaseModel
 
+from agents.checkpointers import get_checkpointer, flush_checkpoints
+from agents.context import build_context, count_tokens
+from agents.instrumentation import llm_metrics
+from agents.llm_provider import get_llm
+from agents.tool_executor import execute_tool_calls
+from agents.tool_payloads import encode_tool_result, underwriting_state, underwriting_summary
+from agents.prompt_cache import layout_prompt, record_usage
+
 # Import tools
 from agents.tools import (
     get_market_rates_tool, check_user_history_tool,
     verification_agent_tool,
-    underwriting_agent_tool, sanction_letter_tool
+    underwriting_agent_tool, sanction_letter_tool,
+    prefetch_bureau_data
 )
 
 # Setup logging
@@ -49,13 +57,8 @@ if not load_dotenv(find_dotenv()):
         logger.error(f"CRITICAL: .env file NOT found at: {env_path}")
 # --- FIX END ---
 
-# Initialize LLM
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0.3,
-    api_key=os.getenv("OPENAI_API_KEY"),
-    streaming=True
-)
+# Initialize LLM (LLM_PROVIDER=openai|stub, see agents/llm_provider.py)
+llm = get_llm(callbacks=[llm_metrics])
 
 # ================= STATE DEFINITION =================
 class AgentState(TypedDict):
@@ -78,8 +81,15 @@ class AgentState(TypedDict):
     pre_approved_limit: Optional[int]
     underwriting_status: str  # PENDING, APPROVED, REJECTED, NEED_SALARY
     approved_interest_rate: Optional[float]
+    underwriting_reason: Optional[str]
+    underwriting_suggestion: Optional[str]
+    max_eligible_amount: Optional[int]
     sanction_letter_url: Optional[str]
 
+    # Rolling summary of turns that fell out of the prompt window (agents/context.py)
+    context_summary: Optional[str]
+    summarized_through: Optional[str]
+
 # ================= HELPER FUNCTIONS =================
 def extract_loan_amount(text: str) -> Optional[int]:
     """Extract loan amount from text (handles lakhs, thousands, etc.)"""
@@ -188,7 +198,7 @@ def validate_pan(pan: str) -> dict:
 
 # --- Sales Agent ---
 sales_tools = [get_market_rates_tool, check_user_history_tool]
-sales_llm = llm.bind_tools(sales_tools)
+sales_llm = llm.bind_tools(sales_tools, prompt_cache_key="nexus-sales-agent")
 
 SALES_PROMPT = """You are Nexus, an enthusiastic and empathetic Personal Loan Advisor. Your goal is to build rapport, engage conversationally and persuade the user to take your loan and understand customer needs.
 
@@ -206,25 +216,30 @@ SALES_PROMPT = """You are Nexus, an enthusiastic and empathetic Personal Loan Ad
 - Once customer confirms their desired amount, say: "Excellent! Let me connect you with our verification team to proceed with your application."
 - Be positive and encouraging
 - Don't perform KYC or credit checks yourself
+- The customer's details so far are in the **Current Context** message after the conversation
 
-**Current Context:**
+Remember: You're building trust and gathering initial requirements. Keep it very conversational and be very persuasive!"""
+
+# Per-call context, sent after the conversation so SALES_PROMPT stays a
+# byte-identical (cacheable) prefix
+SALES_CONTEXT = """**Current Context:**
 - Customer Name: {customer_name}
 - Requested Amount: {loan_amount}
-- KYC Status: {kyc_status}
-
-Remember: You're building trust and gathering initial requirements. Keep it very conversational and be very persuasive!"""
+- KYC Status: {kyc_status}"""
 
 def sales_node(state: AgentState):
     logger.info("=== SALES AGENT ACTIVATED ===")
     
     # Build context-aware prompt
-    prompt = SALES_PROMPT.format(
+    state_text = SALES_CONTEXT.format(
         customer_name=state.get("customer_name") or "Not provided yet",
         loan_amount=f"₹{state.get('loan_amount'):,}" if state.get("loan_amount") else "Not specified yet",
         kyc_status="Completed ✓" if state.get("kyc_verified") else "Pending"
     )
     
-    result = sales_llm.invoke([SystemMessage(content=prompt)] + state["messages"])
+    context, context_updates = build_context(state, count_tokens(SALES_PROMPT + state_text), llm=llm)
+    result = sales_llm.invoke(layout_prompt(SALES_PROMPT, context, state_text))
+    record_usage("SalesAgent", result)
     
     # Extract information from conversation
     last_user_msg = ""
@@ -233,7 +248,7 @@ def sales_node(state: AgentState):
             last_user_msg = msg.content
             break
     
-    updates = {"messages": [result]}
+    updates = {"messages": [result], **context_updates}
     
     # Extract loan amount
     if not state.get("loan_amount"):
@@ -335,6 +350,8 @@ def kyc_node(state: AgentState):
 
     # ✅ PAN is valid → mark KYC verified
     logger.info(f"PAN VERIFIED (CODE-BASED): {validation['pan']}")
+    # Underwriting comes next; start its bureau lookups now
+    prefetch_bureau_data(validation["pan"])
 
     return {
         "pan_number": validation["pan"],
@@ -354,7 +371,7 @@ def kyc_node(state: AgentState):
 
 # --- Underwriting Agent ---
 uw_tools = [underwriting_agent_tool, sanction_letter_tool]
-uw_llm = llm.bind_tools(uw_tools)
+uw_llm = llm.bind_tools(uw_tools, prompt_cache_key="nexus-underwriting-agent")
 
 UW_PROMPT = """You are Dr. Sharma, a Senior Credit Analyst. Your role is to evaluate loan eligibility fairly and transparently.
 
@@ -372,24 +389,32 @@ UW_PROMPT = """You are Dr. Sharma, a Senior Credit Analyst. Your role is to eval
 - Extract salary from customer response and call underwriting_agent_tool again
 - For rejections: Be empathetic, provide actionable suggestions
 - For approvals: Clearly state loan amount, interest rate, and next steps
-- **CRITICAL**: When calling underwriting_agent_tool, you MUST pass the PAN number: {pan_number}
+- **CRITICAL**: When calling underwriting_agent_tool, you MUST pass the PAN from the Current Context
 - **CRITICAL**: When calling sanction_letter_tool after approval:
-  * Use the CUSTOMER'S REQUESTED loan amount: {loan_amount}
-  * Use the customer's name: {customer_name}
-  * Use the PAN: {pan_number}
+  * Use the CUSTOMER'S REQUESTED Loan Amount from the Current Context
+  * Use the Customer Name from the Current Context
+  * Use the PAN from the Current Context
   * Use the approved interest rate from underwriting result
   * After generation, ALWAYS include the download link in your response with markdown format:
     "Your sanction letter is ready! [Download Sanction Letter](DOWNLOAD_LINK_HERE)"
 
-**Current Context:**
+The **Current Context** message after the conversation holds the customer's latest details; always use it.
+
+Be professional, transparent, and helpful!"""
+
+# Per-call context, sent after the conversation so UW_PROMPT stays a
+# byte-identical (cacheable) prefix
+UW_CONTEXT = """**Current Context:**
 - Customer Name: {customer_name}
 - PAN: {pan_number}
 - Loan Amount: {loan_amount}
 - Monthly Salary: {monthly_salary}
 - Credit Score: {credit_score}
 - Underwriting Status: {underwriting_status}
-
-Be professional, transparent, and helpful!"""
+- Approved Interest Rate: {interest_rate}
+- Decision Reason: {underwriting_reason}
+- Suggestion: {underwriting_suggestion}
+- Maximum Eligible Amount: {max_eligible_amount}"""
 
 def uw_node(state: AgentState):
     logger.info("=== UNDERWRITING AGENT ACTIVATED ===")
@@ -415,7 +440,7 @@ def uw_node(state: AgentState):
         logger.info(f"Extracted monthly salary: ₹{salary:,}")
 
     # Build prompt AFTER updates
-    prompt = UW_PROMPT.format(
+    state_text = UW_CONTEXT.format(
         customer_name=state.get("customer_name") or "Customer",
         pan_number=state.get("pan_number") or "Not provided",
         loan_amount=f"₹{updates.get('loan_amount', state.get('loan_amount')):,}"
@@ -426,10 +451,14 @@ def uw_node(state: AgentState):
         else "Not provided",
         credit_score=state.get("credit_score") or "Pending",
         underwriting_status=state.get("underwriting_status", "PENDING"),
+        **underwriting_summary(state),
     )
 
-    result = uw_llm.invoke([SystemMessage(content=prompt)] + state["messages"])
+    context, context_updates = build_context(state, count_tokens(UW_PROMPT + state_text), llm=llm)
+    result = uw_llm.invoke(layout_prompt(UW_PROMPT, context, state_text))
+    record_usage("UnderwritingAgent", result)
 
+    updates.update(context_updates)
     updates["messages"] = [result]
     return updates
 
@@ -446,61 +475,60 @@ def call_tools(state: AgentState):
     state_updates = {}
     
     if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-        for tool_call in last_message.tool_calls:
+        # Independent tools run concurrently; outcomes come back in call order
+        for tool_call, result, error in execute_tool_calls(last_message.tool_calls, tool_map):
             tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
             
-            logger.info(f"Calling tool: {tool_name} with args: {tool_args}")
-            
-            tool = tool_map.get(tool_name)
-            if tool:
-                try:
-                    result = tool.invoke(tool_args)
-                    tool_messages.append(
-                        ToolMessage(content=json.dumps(result, indent=2), tool_call_id=tool_call["id"])
-                    )
-                    
-                    # Update state based on tool results
-                    if tool_name == "verification_agent_tool":
-                        if result.get("verified"):
-                            state_updates["kyc_verified"] = True
-                            state_updates["customer_name"] = result.get("name", state.get("customer_name"))
-                            state_updates["pan_number"] = result.get("pan", state.get("pan_number"))
-                            state_updates["phone_number"] = result.get("phone")
-                            logger.info(f"KYC VERIFIED for {result.get('name')}")
+            logger.info(f"Tool finished: {tool_name} with args: {tool_call['args']}")
+
+            try:
+                if error is not None:
+                    raise error
+                tool_messages.append(
+                    ToolMessage(content=encode_tool_result(tool_name, result), tool_call_id=tool_call["id"])
+                )
+                
+                # Update state based on tool results
+                if tool_name == "verification_agent_tool":
+                    if result.get("verified"):
+                        state_updates["kyc_verified"] = True
+                        state_updates["customer_name"] = result.get("name", state.get("customer_name"))
+                        state_updates["pan_number"] = result.get("pan", state.get("pan_number"))
+                        state_updates["phone_number"] = result.get("phone")
+                        logger.info(f"KYC VERIFIED for {result.get('name')}")
+                
+                elif tool_name == "underwriting_agent_tool":
+                    status = result.get("status")
+                    # Status, rate, reason and suggestion; the prompts read them from state
+                    state_updates.update(underwriting_state(result))
                     
-                    elif tool_name == "underwriting_agent_tool":
-                        status = result.get("status")
-                        state_updates["underwriting_status"] = status
-                        
-                        if status == "APPROVED":
-                            state_updates["approved_interest_rate"] = result.get("interest_rate")
-                            state_updates["credit_score"] = result.get("credit_score")
-                            logger.info(f"LOAN APPROVED: {result}")
-                        
-                        elif status == "REJECTED":
-                            state_updates["credit_score"] = result.get("credit_score")
-                            logger.info(f"LOAN REJECTED: {result.get('reason')}")
-                        
-                        elif status == "NEED_SALARY":
-                            state_updates["credit_score"] = result.get("credit_score")
-                            state_updates["pre_approved_limit"] = result.get("pre_approved_limit")
-                            logger.info("NEED_SALARY status - awaiting salary info")
+                    if status == "APPROVED":
+                        state_updates["credit_score"] = result.get("credit_score")
+                        logger.info(f"LOAN APPROVED: {result}")
                     
-                    elif tool_name == "sanction_letter_tool":
-                        if result.get("status") == "success":
-                            state_updates["sanction_letter_url"] = result.get("download_link")
-                            logger.info(f"Sanction letter generated: {result.get('download_link')}")
+                    elif status == "REJECTED":
+                        state_updates["credit_score"] = result.get("credit_score")
+                        logger.info(f"LOAN REJECTED: {result.get('reason')}")
                     
-                except Exception as e:
-                    logger.error(f"Tool execution error: {str(e)}")
-                    tool_messages.append(
-                        ToolMessage(
-                            content=json.dumps({"error": str(e)}),
-                            tool_call_id=tool_call["id"]
-                        )
+                    elif status == "NEED_SALARY":
+                        state_updates["credit_score"] = result.get("credit_score")
+                        state_updates["pre_approved_limit"] = result.get("pre_approved_limit")
+                        logger.info("NEED_SALARY status - awaiting salary info")
+                
+                elif tool_name == "sanction_letter_tool":
+                    if result.get("status") == "success":
+                        state_updates["sanction_letter_url"] = result.get("download_link")
+                        logger.info(f"Sanction letter generated: {result.get('download_link')}")
+                
+            except Exception as e:
+                logger.error(f"Tool execution error: {str(e)}")
+                tool_messages.append(
+                    ToolMessage(
+                        content=json.dumps({"error": str(e)}),
+                        tool_call_id=tool_call["id"]
                     )
-    
+                )
+
     return {"messages": tool_messages, **state_updates}
 
 # ================= SUPERVISOR (MASTER AGENT) =================
@@ -550,10 +578,110 @@ Provide clear reasoning for your decision."""
 
 supervisor_llm = llm.with_structured_output(RouterOutput)
 
+# Rule-based routing: the priority table above, evaluated against the state.
+# Only turns the rules cannot settle from state alone (does the customer want
+# the letter? did they acknowledge the rejection?) go to supervisor_llm.
+SUPERVISOR_RULES = os.getenv("SUPERVISOR_RULES", "true").lower() == "true"
+
+# Closing line of SALES_PROMPT: the customer's next message goes to KYC
+KYC_HANDOFF_PHRASE = "verification team"
+
+NEGATIVE_WORDS = {"no", "not", "nope", "don't", "dont", "later", "wait", "cancel", "stop"}
+LETTER_WORDS = {"letter", "sanction", "generate", "pdf", "download"}
+CONFIRM_WORDS = {"yes", "yeah", "yep", "yup", "sure", "ok", "okay", "proceed", "confirm", "confirmed"}
+FILLER_WORDS = {"please", "go", "ahead", "do", "it", "send", "me", "the", "thanks", "thank", "you", "great"}
+ACKNOWLEDGE_WORDS = {
+    "ok", "okay", "thanks", "thank", "you", "understood", "fine", "alright",
+    "bye", "got", "it", "noted", "i", "see",
+}
+
+# How often each routing path was taken ("rule:<name>" or "llm")
+ROUTING_STATS = Counter()
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z']+", text.lower()))
+
+
+def route_by_rules(state: AgentState) -> tuple[Optional[str], str]:
+    """Apply the supervisor priority rules to the state and last user message.
+
+    Returns:
+        tuple: (agent name or None, rule name). None means the rules are
+        ambiguous for this turn and the LLM should decide.
+    """
+    last_user_msg, last_ai_msg = "", ""
+    for msg in reversed(state["messages"]):
+        if isinstance(msg, HumanMessage) and not last_user_msg:
+            last_user_msg = msg.content
+        elif isinstance(msg, AIMessage) and msg.content and last_user_msg and not last_ai_msg:
+            last_ai_msg = msg.content
+        if last_user_msg and last_ai_msg:
+            break
+    words = _words(last_user_msg)
+    status = state.get("underwriting_status") or "PENDING"
+
+    # PRIORITY 1 - sanction letter
+    if state.get("sanction_letter_url"):
+        return "FINISH", "letter_generated"
+    if status == "APPROVED":
+        if words & NEGATIVE_WORDS:
+            return None, "approved_declined_or_unclear"
+        if words & LETTER_WORDS or (words & CONFIRM_WORDS and words <= CONFIRM_WORDS | FILLER_WORDS):
+            return "UnderwritingAgent", "approved_letter_confirmed"
+        return None, "approved_letter_unclear"
+
+    # PRIORITY 2 - underwriting
+    if state.get("kyc_verified") and status == "PENDING":
+        return "UnderwritingAgent", "kyc_verified_pending"
+    if status == "NEED_SALARY":
+        if extract_salary(last_user_msg):
+            return "UnderwritingAgent", "salary_provided"
+        return None, "need_salary_unclear"
+    if status == "REJECTED":
+        if words and words <= ACKNOWLEDGE_WORDS:
+            return "FINISH", "rejection_acknowledged"
+        return None, "rejected_unclear"
+
+    # PRIORITY 3 - KYC
+    if not state.get("kyc_verified"):
+        if extract_pan(last_user_msg):
+            return "KYCAgent", "pan_provided"
+        if state.get("loan_amount") and KYC_HANDOFF_PHRASE in last_ai_msg.lower():
+            return "KYCAgent", "sales_handoff"
+
+    # PRIORITY 4 - default
+    if not state.get("loan_amount"):
+        return "SalesAgent", "no_loan_amount"
+    return None, "unmatched"
+
+
+def get_routing_stats() -> dict:
+    """Counts of rule-based vs LLM routing decisions since startup"""
+    total = sum(ROUTING_STATS.values())
+    llm_calls = ROUTING_STATS["llm"]
+    return {
+        "total": total,
+        "rules": total - llm_calls,
+        "llm": llm_calls,
+        "rule_rate": round((total - llm_calls) / total, 3) if total else None,
+        "paths": dict(ROUTING_STATS),
+    }
+
+
 def supervisor_node(state: AgentState):
     """Master agent decides routing based on conversation and state"""
     logger.info("=== SUPERVISOR ROUTING ===")
-    
+
+    if SUPERVISOR_RULES:
+        next_agent, rule = route_by_rules(state)
+        if next_agent:
+            ROUTING_STATS[f"rule:{rule}"] += 1
+            logger.info(f"ROUTING DECISION: {next_agent} (rule: {rule})")
+            logger.info(f"ROUTING PATHS: {get_routing_stats()}")
+            return {"next_agent": next_agent}
+        logger.info(f"Rules ambiguous ({rule}), asking the LLM")
+
     # Build context-aware prompt
     prompt = SUPERVISOR_PROMPT.format(
         customer_name=state.get("customer_name") or "Not provided",
@@ -568,15 +696,18 @@ def supervisor_node(state: AgentState):
     
     result = supervisor_llm.invoke([SystemMessage(content=prompt)] + recent_messages)
     
+    ROUTING_STATS["llm"] += 1
     logger.info(f"ROUTING DECISION: {result.next}")
     logger.info(f"REASONING: {result.reasoning}")
+    logger.info(f"ROUTING PATHS: {get_routing_stats()}")
     
     return {"next_agent": result.next}
 
 # ================= GRAPH CONSTRUCTION =================
 def build_graph():
     """Construct the LangGraph workflow"""
-    memory = MemorySaver()
+    # CHECKPOINTER=memory|sqlite (agents/checkpointers.py)
+    memory = get_checkpointer()
     workflow = StateGraph(AgentState)
     
     # Add nodes
@@ -640,7 +771,8 @@ def build_graph():
         }
     )
     
-    return workflow.compile(checkpointer=memory)
+    # Node and tool timings per session (LLM calls are tracked via the llm's callbacks)
+    return workflow.compile(checkpointer=memory).with_config(callbacks=[llm_metrics])
 
 # Build the graph
 graph = build_graph()
@@ -664,6 +796,8 @@ def run_agent(user_input: str, thread_id: str):
             stream_mode="values"
         ):
             events.append(event)
+        # Persist the turn before replying (the SQLite saver batches writes)
+        flush_checkpoints(graph.checkpointer)
         
         # Get the last AI message
         if events:
@@ -735,6 +869,7 @@ def run_agent_stream(user_input: str, thread_id: str):
 
                         last_text = full_text
 
+        flush_checkpoints(graph.checkpointer)
         # End signal
         yield json.dumps({"done": True}) + "\n"
 
@@ -0,0 +1,70 @@
+"""
+Prompt layout for the provider's automatic prompt caching.
+
+OpenAI reuses the computation for the longest prompt prefix it has seen
+recently (prompts of 1024+ tokens, in 128-token steps): cached input tokens
+are billed at a discount and skip prefill, which shortens time-to-first-
+token. Tool schemas are part of that prefix, so the agents keep them in a
+fixed order. Agent prompts are laid out so the prefix stays identical:
+
+    [static instructions]   byte-identical on every call of an agent
+    [conversation summary]  changes only when turns are folded (context.py)
+    [recent turns]          append-only between folds
+    [state message]         customer/loan state, rebuilt on every call
+
+Anything that varies per call (names, amounts, statuses, one-off notes)
+belongs in the state message, never in the static instructions.
+
+record_usage() reads the cached-token count from each response's usage
+metadata; get_prompt_cache_stats() totals it per agent.
+"""
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+
+from langchain_core.messages import SystemMessage
+
+logger = logging.getLogger(__name__)
+
+_stats = defaultdict(lambda: {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "calls_with_cache_hit": 0})
+_stats_lock = threading.Lock()
+
+
+def prefix_fingerprint(static_prompt: str) -> str:
+    """Short hash of a static prefix; it must not change between calls"""
+    return hashlib.sha256(static_prompt.encode("utf-8")).hexdigest()[:12]
+
+
+def layout_prompt(static_prompt: str, context: list, state_text: str) -> list:
+    """Messages for one call: static prefix, context window, then the state"""
+    return [SystemMessage(content=static_prompt)] + list(context) + [SystemMessage(content=state_text)]
+
+
+def record_usage(agent: str, message) -> None:
+    """Add a response's input and cached tokens to the agent's totals"""
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    input_tokens = usage.get("input_tokens", 0) or 0
+    cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+    with _stats_lock:
+        stats = _stats[agent]
+        stats["calls"] += 1
+        stats["input_tokens"] += input_tokens
+        stats["cached_tokens"] += cached_tokens
+        stats["calls_with_cache_hit"] += cached_tokens > 0
+    logger.info(f"Prompt cache [{agent}]: {cached_tokens}/{input_tokens} input tokens cached")
+
+
+def get_prompt_cache_stats() -> dict:
+    """Per-agent totals with the share of input tokens served from cache"""
+    with _stats_lock:
+        return {
+            agent: {
+                **stats,
+                "cached_ratio": round(stats["cached_tokens"] / stats["input_tokens"], 3)
+                if stats["input_tokens"] else None,
+            }
+            for agent, stats in _stats.items()
+        }
@@ -0,0 +1,131 @@
+"""
+Concurrent execution of the tool calls in one AI message.
+
+When the model asks for several tools at once (check_user_history_tool +
+get_market_rates_tool, verification + underwriting) they used to run one
+after another, each possibly sitting in HTTP retries. execute_tool_calls()
+runs independent calls together on a shared, bounded thread pool
+(TOOL_WORKERS), so a turn waits for the slowest tool instead of the sum.
+
+Calls are grouped into waves: a call whose tool depends on another tool
+requested in the same message (TOOL_DEPENDENCIES, e.g. underwriting after
+verification) runs in a later wave than it. Results always come back in
+the order the model listed the calls, so ToolMessages and state updates
+are merged deterministically. The pool copies the caller's context, so
+callbacks (instrumentation, streaming) still see each tool run.
+
+aexecute_tool_calls() is the asyncio counterpart for the async graph path:
+the same waves, run with asyncio.gather on the tools' coroutines.
+"""
+import os
+import time
+import asyncio
+import logging
+
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "8"))
+PARALLEL_TOOLS = os.getenv("PARALLEL_TOOLS", "true").lower() == "true"
+
+# tool -> tools that must finish first when requested in the same message
+TOOL_DEPENDENCIES = {
+    "underwriting_agent_tool": {"verification_agent_tool"},
+    "sanction_letter_tool": {"verification_agent_tool", "underwriting_agent_tool"},
+}
+
+_executor = ContextThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+
+def plan_waves(tool_calls):
+    """Group call indexes into waves that may run concurrently"""
+    names = [call["name"] for call in tool_calls]
+    wave_of = {}
+
+    def wave(name, seen=()):
+        if name not in wave_of:
+            deps = [d for d in TOOL_DEPENDENCIES.get(name, ()) if d in names and d not in seen]
+            wave_of[name] = 1 + max((wave(d, seen + (name,)) for d in deps), default=-1)
+        return wave_of[name]
+
+    waves = {}
+    for index, name in enumerate(names):
+        waves.setdefault(wave(name), []).append(index)
+    return [waves[w] for w in sorted(waves)]
+
+
+def _invoke(tool, call, progress=None):
+    if progress:
+        progress("tool_start", call)
+    started = time.perf_counter()
+    try:
+        result, error = tool.invoke(call["args"]), None
+    except Exception as e:
+        result, error = None, e
+    if progress:
+        progress("tool_end", call, error=error, elapsed_ms=(time.perf_counter() - started) * 1000)
+    return result, error
+
+
+def execute_tool_calls(tool_calls, tool_map, progress=None):
+    """Run tool calls, concurrently where independent.
+
+    progress, if given, is called as progress("tool_start", call) and
+    progress("tool_end", call, error=..., elapsed_ms=...) from the thread
+    running the tool (used for streaming progress events).
+
+    Returns:
+        list of (tool_call, result, error) in the order of tool_calls; calls
+        to unknown tools are left out
+    """
+    calls = [call for call in tool_calls if call["name"] in tool_map]
+    for call in tool_calls:
+        if call["name"] not in tool_map:
+            logger.warning(f"Unknown tool requested: {call['name']}")
+    outcomes = [None] * len(calls)
+
+    if not PARALLEL_TOOLS or len(calls) <= 1:
+        for i, call in enumerate(calls):
+            outcomes[i] = (call, *_invoke(tool_map[call["name"]], call, progress))
+        return outcomes
+
+    waves = plan_waves(calls)
+    logger.info(f"Running {len(calls)} tool calls in {len(waves)} wave(s): "
+                f"{[[calls[i]['name'] for i in w] for w in waves]}")
+    for indexes in waves:
+        futures = {i: _executor.submit(_invoke, tool_map[calls[i]["name"]], calls[i], progress) for i in indexes}
+        for i, future in futures.items():
+            outcomes[i] = (calls[i], *future.result())
+    return outcomes
+
+
+async def _ainvoke(tool, call, progress=None):
+    if progress:
+        progress("tool_start", call)
+    started = time.perf_counter()
+    try:
+        result, error = await tool.ainvoke(call["args"]), None
+    except Exception as e:
+        result, error = None, e
+    if progress:
+        progress("tool_end", call, error=error, elapsed_ms=(time.perf_counter() - started) * 1000)
+    return result, error
+
+
+async def aexecute_tool_calls(tool_calls, tool_map, progress=None):
+    """Async execute_tool_calls: independent calls are awaited together"""
+    calls = [call for call in tool_calls if call["name"] in tool_map]
+    for call in tool_calls:
+        if call["name"] not in tool_map:
+            logger.warning(f"Unknown tool requested: {call['name']}")
+    outcomes = [None] * len(calls)
+
+    waves = plan_waves(calls) if PARALLEL_TOOLS else [[i] for i in range(len(calls))]
+    for indexes in waves:
+        results = await asyncio.gather(
+            *(_ainvoke(tool_map[calls[i]["name"]], calls[i], progress) for i in indexes)
+        )
+        for i, (result, error) in zip(indexes, results):
+            outcomes[i] = (calls[i], result, error)
+    return outcomes
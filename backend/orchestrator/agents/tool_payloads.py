@@ -0,0 +1,100 @@
+"""
+Compact tool results for the message history.
+
+Tool results used to be stored as json.dumps(result, indent=2) with every
+field the tool returns (phone, address, intermediate salary arithmetic,
+...), and every later LLM call paid for them again. encode_tool_result()
+keeps only the fields the model needs (TOOL_RESULT_FIELDS) and writes
+compact JSON.
+
+Once a turn is over, a verification, underwriting or sanction result is
+also captured in the graph state (kyc_verified, underwriting_state(),
+sanction_letter_url), which every prompt already carries in its state
+block. stub_consumed_tool_results() replaces such ToolMessages from
+earlier turns with a one-line stub when building a prompt; the stored
+history is unchanged. Results that no state field captures (rates,
+history) are kept.
+
+COMPACT_TOOL_RESULTS=false restores the old encoding and disables stubs.
+"""
+import os
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+COMPACT_TOOL_RESULTS = os.getenv("COMPACT_TOOL_RESULTS", "true").lower() == "true"
+
+# Fields the model reads from each tool's result; error/message are always kept
+TOOL_RESULT_FIELDS = {
+    "verification_agent_tool": ("verified", "name"),
+    "underwriting_agent_tool": ("status", "amount", "interest_rate", "credit_score", "pre_approved_limit",
+                                "monthly_emi", "estimated_emi", "max_loan_amount", "max_eligible", "reason", "suggestion"),
+    "sanction_letter_tool": ("status", "download_link", "loan_amount", "interest_rate"),
+    "get_market_rates_tool": ("rates",),
+    "check_user_history_tool": ("status", "customer", "history"),
+}
+ALWAYS_KEPT = ("error", "message")
+
+# Tool -> does the state already hold its outcome?
+CAPTURED_IN_STATE = {
+    "verification_agent_tool": lambda state: bool(state.get("kyc_verified")),
+    "underwriting_agent_tool": lambda state: state.get("underwriting_status") not in (None, "", "PENDING"),
+    "sanction_letter_tool": lambda state: bool(state.get("sanction_letter_url")),
+}
+STUB = "[{tool} result from an earlier turn; its outcome is in the current state]"
+
+
+def underwriting_state(result):
+    """State updates for an underwriting result: everything the model reads
+    from it later (rate, reason, suggested maximum), so it can be stubbed"""
+    status = result.get("status")
+    return {
+        "underwriting_status": status,
+        "approved_interest_rate": result.get("interest_rate") if status == "APPROVED" else None,
+        "underwriting_reason": result.get("reason") or result.get("message"),
+        "underwriting_suggestion": result.get("suggestion"),
+        "max_eligible_amount": result.get("max_loan_amount") or result.get("max_eligible"),
+    }
+
+
+def underwriting_summary(state):
+    """Values for the underwriting lines of a prompt's state block"""
+    rate = state.get("approved_interest_rate")
+    max_amount = state.get("max_eligible_amount")
+    return {
+        "interest_rate": f"{rate}% p.a." if rate is not None else "Not decided",
+        "underwriting_reason": state.get("underwriting_reason") or "None",
+        "underwriting_suggestion": state.get("underwriting_suggestion") or "None",
+        "max_eligible_amount": f"₹{max_amount:,}" if max_amount else "None",
+    }
+
+
+def encode_tool_result(tool_name, result):
+    """ToolMessage content for a tool result"""
+    if not COMPACT_TOOL_RESULTS:
+        return json.dumps(result, indent=2)
+    fields = TOOL_RESULT_FIELDS.get(tool_name)
+    if fields is not None and isinstance(result, dict):
+        result = {k: v for k, v in result.items() if (k in fields or k in ALWAYS_KEPT) and v not in (None, "")}
+    return json.dumps(result, separators=(",", ":"), ensure_ascii=False)
+
+
+def stub_consumed_tool_results(messages, state):
+    """Replace ToolMessages before the latest user message whose outcome is in state"""
+    if not COMPACT_TOOL_RESULTS:
+        return list(messages)
+    last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+    tool_names = {
+        tool_call["id"]: tool_call["name"]
+        for message in messages[:last_human] if isinstance(message, AIMessage)
+        for tool_call in message.tool_calls or []
+    }
+    stubbed = list(messages)
+    for i, message in enumerate(messages[:last_human]):
+        if not isinstance(message, ToolMessage):
+            continue
+        tool_name = tool_names.get(message.tool_call_id)
+        captured = CAPTURED_IN_STATE.get(tool_name)
+        if captured is not None and captured(state):
+            stubbed[i] = message.model_copy(update={"content": STUB.format(tool=tool_name)})
+    return stubbed
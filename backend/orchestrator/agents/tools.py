@@ -1,7 +1,12 @@
 import os
+import time
+import asyncio
+import threading
 import requests
+import httpx
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field, validator
 from tenacity import retry, stop_after_attempt, wait_exponential
@@ -44,7 +49,49 @@ def call_api_with_retry(url: str, payload: dict, timeout: int = 5):
     response.raise_for_status()
     return response.json()
 
+# ================= ASYNC HTTP CLIENT =================
+# The async tools (used by asgi.py) share one connection pool per process,
+# so thousands of waiting sessions need no thread each
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+# Waiting for a free connection is queueing, not a slow service
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "30"))
+_async_client = None
+
+def get_async_client():
+    """Shared httpx.AsyncClient, created on first use"""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(5, pool=HTTP_POOL_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+        )
+    return _async_client
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
+async def acall_api_with_retry(url: str, payload: dict, timeout: int = 5):
+    """Async API caller with the same retry policy as call_api_with_retry"""
+    response = await get_async_client().post(url, json=payload, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
 # ================= SALES TOOLS =================
+MARKET_RATES = [
+    {"tenure": "12 months", "rate": "10.5%", "processing_fee": "1%"},
+    {"tenure": "24 months", "rate": "11.0%", "processing_fee": "1.5%"},
+    {"tenure": "36 months", "rate": "12.0%", "processing_fee": "2%"}
+]
+
+def get_market_rates():
+    """Current rate card: one dict per tenure with rate and processing fee"""
+    return [dict(option) for option in MARKET_RATES]
+
 @tool
 def get_market_rates_tool():
     """Returns current interest rate options for different loan tenures.
@@ -55,11 +102,7 @@ def get_market_rates_tool():
     logger.info("Fetching market rates")
     return {
         "status": "success",
-        "rates": [
-            {"tenure": "12 months", "rate": "10.5%", "processing_fee": "1%"},
-            {"tenure": "24 months", "rate": "11.0%", "processing_fee": "1.5%"},
-            {"tenure": "36 months", "rate": "12.0%", "processing_fee": "2%"}
-        ]
+        "rates": get_market_rates()
     }
 
 @tool
@@ -89,6 +132,19 @@ def check_user_history_tool(name: str):
         }
 
 # ================= KYC TOOLS =================
+def _kyc_response(pan: str, result: dict):
+    """Tool result for a CRM /verify-kyc answer"""
+    logger.info(f"KYC verification result: {result.get('verified', False)}")
+    return {
+        # The CRM answers {"status": "verified", ...}
+        "verified": result.get("verified", result.get("status") == "verified"),
+        "name": result.get("name", ""),
+        "pan": pan.upper(),
+        "phone": result.get("phone", ""),
+        "address": result.get("address", ""),
+        "message": result.get("message", "Verification complete")
+    }
+
 @tool
 def verification_agent_tool(pan: str):
     """Verifies PAN number against CRM system for KYC compliance.
@@ -114,15 +170,7 @@ def verification_agent_tool(pan: str):
             {"pan": pan.upper()}
         )
         
-        logger.info(f"KYC verification result: {result.get('verified', False)}")
-        return {
-            "verified": result.get("verified", False),
-            "name": result.get("name", ""),
-            "pan": pan.upper(),
-            "phone": result.get("phone", ""),
-            "address": result.get("address", ""),
-            "message": result.get("message", "Verification complete")
-        }
+        return _kyc_response(pan, result)
         
     except requests.Timeout:
         logger.error("CRM service timeout")
@@ -143,7 +191,181 @@ def verification_agent_tool(pan: str):
             "error": f"Verification failed: {str(e)}"
         }
 
+# ================= BUREAU PREFETCH =================
+# The credit score and pre-approved limit only depend on the PAN, so they
+# are requested in the background as soon as a valid PAN is captured and
+# the bureau latency overlaps with the LLM's turn. The underwriting tools
+# use a prefetched result when there is one and fetch it themselves
+# otherwise (prefetch disabled, expired or failed). Keyed by PAN, so every
+# session of the same customer shares one lookup.
+BUREAU_PREFETCH = os.getenv("BUREAU_PREFETCH", "true").lower() == "true"
+BUREAU_PREFETCH_TTL = float(os.getenv("BUREAU_PREFETCH_TTL", "300"))
+BUREAU_PREFETCH_WORKERS = int(os.getenv("BUREAU_PREFETCH_WORKERS", "8"))
+BUREAU_LOOKUPS = {"credit_score": f"{CREDIT_URL}/get-score", "pre_approved_limit": f"{OFFER_URL}/get-limit"}
+
+_prefetch_pool = None
+_prefetched = {}  # pan -> (started at, {field: Future})
+_prefetch_lock = threading.Lock()
+
+def _bureau_fetch(url: str, pan: str, field: str):
+    return call_api_with_retry(url, {"pan": pan}).get(field, 0)
+
+def prefetch_bureau_data(pan: str):
+    """Start the credit score and pre-approved limit lookups for a PAN
+    in the background (no-op if they are already running or cached)"""
+    global _prefetch_pool
+    if not BUREAU_PREFETCH or not pan:
+        return
+    now = time.monotonic()
+    with _prefetch_lock:
+        for expired in [p for p, (started, _) in _prefetched.items() if now - started > BUREAU_PREFETCH_TTL]:
+            del _prefetched[expired]
+        if pan in _prefetched:
+            return
+        if _prefetch_pool is None:
+            _prefetch_pool = ThreadPoolExecutor(max_workers=BUREAU_PREFETCH_WORKERS,
+                                                thread_name_prefix="bureau-prefetch")
+        _prefetched[pan] = (now, {field: _prefetch_pool.submit(_bureau_fetch, url, pan, field)
+                                  for field, url in BUREAU_LOOKUPS.items()})
+    logger.info(f"Prefetching bureau data for PAN={pan[:4]}****")
+
+def _prefetched_future(pan: str, field: str):
+    """The prefetch Future for a PAN's field, or None if there is no live one"""
+    with _prefetch_lock:
+        entry = _prefetched.get(pan)
+        if entry is None or time.monotonic() - entry[0] > BUREAU_PREFETCH_TTL:
+            return None
+        future = entry[1][field]
+        if future.done() and future.exception() is not None:
+            # Failed in the background: the caller fetches (and retries) itself
+            _prefetched.pop(pan, None)
+            return None
+        return future
+
+def bureau_lookup(pan: str, field: str):
+    """credit_score or pre_approved_limit for a PAN, prefetched if possible"""
+    future = _prefetched_future(pan, field)
+    if future is not None:
+        try:
+            return future.result()
+        except Exception as e:
+            logger.warning(f"Prefetched {field} lookup failed, fetching again: {e}")
+    return _bureau_fetch(BUREAU_LOOKUPS[field], pan, field)
+
+async def abureau_lookup(pan: str, field: str):
+    """bureau_lookup for the async tools"""
+    future = _prefetched_future(pan, field)
+    if future is not None:
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception as e:
+            logger.warning(f"Prefetched {field} lookup failed, fetching again: {e}")
+    response = await acall_api_with_retry(BUREAU_LOOKUPS[field], {"pan": pan})
+    return response.get(field, 0)
+
+def clear_bureau_prefetch():
+    with _prefetch_lock:
+        _prefetched.clear()
+
+
 # ================= UNDERWRITING TOOLS =================
+def evaluate_underwriting(amount: int, monthly_salary: int, credit_score: int, pre_approved_limit: int):
+    """Underwriting decision from the bureau data (no I/O).
+    
+    Shared by the sync and async underwriting tools; see
+    underwriting_agent_tool for the rules.
+    """
+    logger.info(f"Credit Score: {credit_score}, Pre-approved Limit: {pre_approved_limit}")
+    
+    # Rule 1: Credit score must be >= 700
+    if credit_score < 700:
+        return {
+            "status": "REJECTED",
+            "reason": f"Credit score ({credit_score}) is below minimum requirement of 700",
+            "credit_score": credit_score,
+            "suggestion": "Please improve your credit score and reapply after 3 months"
+        }
+    
+    # Rule 2: Amount within pre-approved limit - instant approval
+    if amount <= pre_approved_limit:
+        return {
+            "status": "APPROVED",
+            "amount": amount,
+            "interest_rate": 10.5,
+            "credit_score": credit_score,
+            "pre_approved_limit": pre_approved_limit,
+            "reason": "Amount within pre-approved limit"
+        }
+    
+    # Rule 3: Amount between 1x and 2x pre-approved limit
+    if amount <= (2 * pre_approved_limit):
+        # Need salary information
+        if monthly_salary == 0:
+            return {
+                "status": "NEED_SALARY",
+                "message": "Please provide your monthly salary to proceed with evaluation",
+                "amount": amount,
+                "credit_score": credit_score,
+                "pre_approved_limit": pre_approved_limit
+            }
+        
+        # USER REQUIREMENT: Salary during loan duration should be at least 2x the loan amount
+        # Assuming 24-month loan duration
+        loan_duration_months = 24
+        total_salary_over_duration = monthly_salary * loan_duration_months
+        required_salary = amount * 2
+        
+        logger.info(f"Salary Check: Total over {loan_duration_months} months = ₹{total_salary_over_duration}, Required (2x loan) = ₹{required_salary}")
+        
+        if total_salary_over_duration < required_salary:
+            return {
+                "status": "REJECTED",
+                "reason": f"Total salary over {loan_duration_months} months (₹{total_salary_over_duration:,}) is less than 2x the loan amount (₹{required_salary:,})",
+                "monthly_salary": monthly_salary,
+                "loan_duration_months": loan_duration_months,
+                "total_salary": total_salary_over_duration,
+                "required_amount": required_salary,
+                "max_loan_amount": int(total_salary_over_duration / 2),
+                "suggestion": f"Maximum eligible loan based on your salary: ₹{int(total_salary_over_duration / 2):,}"
+            }
+        
+        # Calculate EMI (simple estimation: amount/24 months * 1.1 for interest)
+        estimated_emi = (amount / loan_duration_months) * 1.1
+        max_allowed_emi = 0.5 * monthly_salary
+        
+        logger.info(f"EMI Check: Estimated={estimated_emi}, Max Allowed={max_allowed_emi}")
+        
+        if estimated_emi <= max_allowed_emi:
+            return {
+                "status": "APPROVED",
+                "amount": amount,
+                "interest_rate": 12.0,
+                "credit_score": credit_score,
+                "monthly_emi": round(estimated_emi, 2),
+                "monthly_salary": monthly_salary,
+                "loan_duration_months": loan_duration_months,
+                "reason": "Salary verification successful - Meets 2x loan requirement and EMI within affordability"
+            }
+        else:
+            return {
+                "status": "REJECTED",
+                "reason": f"EMI (₹{round(estimated_emi, 2)}) exceeds 50% of salary (₹{monthly_salary})",
+                "estimated_emi": round(estimated_emi, 2),
+                "monthly_salary": monthly_salary,
+                "max_loan_amount": int(max_allowed_emi * loan_duration_months / 1.1),
+                "suggestion": f"Maximum eligible amount based on EMI: ₹{int(max_allowed_emi * loan_duration_months / 1.1):,}"
+            }
+    
+    # Rule 4: Amount exceeds 2x pre-approved limit
+    return {
+        "status": "REJECTED",
+        "reason": f"Requested amount (₹{amount}) exceeds maximum eligible amount of ₹{2 * pre_approved_limit}",
+        "credit_score": credit_score,
+        "pre_approved_limit": pre_approved_limit,
+        "max_eligible": 2 * pre_approved_limit,
+        "suggestion": f"Please apply for an amount up to ₹{2 * pre_approved_limit}"
+    }
+
 @tool(args_schema=UnderwritingInput)
 def underwriting_agent_tool(pan: str, amount: int, monthly_salary: int = 0):
     """Evaluates loan eligibility based on credit score, pre-approved limit, and salary.
@@ -168,8 +390,7 @@ def underwriting_agent_tool(pan: str, amount: int, monthly_salary: int = 0):
     try:
         # Fetch credit score
         try:
-            credit_response = call_api_with_retry(f"{CREDIT_URL}/get-score", {"pan": pan})
-            credit_score = credit_response.get("credit_score", 0)
+            credit_score = bureau_lookup(pan, "credit_score")
         except Exception as e:
             logger.error(f"Credit bureau error: {str(e)}")
             return {
@@ -179,8 +400,7 @@ def underwriting_agent_tool(pan: str, amount: int, monthly_salary: int = 0):
         
         # Fetch pre-approved limit
         try:
-            offer_response = call_api_with_retry(f"{OFFER_URL}/get-limit", {"pan": pan})
-            pre_approved_limit = offer_response.get("pre_approved_limit", 0)
+            pre_approved_limit = bureau_lookup(pan, "pre_approved_limit")
         except Exception as e:
             logger.error(f"Offer service error: {str(e)}")
             return {
@@ -188,96 +408,7 @@ def underwriting_agent_tool(pan: str, amount: int, monthly_salary: int = 0):
                 "error": "Unable to fetch pre-approved limit. Please try again later."
             }
         
-        logger.info(f"Credit Score: {credit_score}, Pre-approved Limit: {pre_approved_limit}")
-        
-        # Rule 1: Credit score must be >= 700
-        if credit_score < 700:
-            return {
-                "status": "REJECTED",
-                "reason": f"Credit score ({credit_score}) is below minimum requirement of 700",
-                "credit_score": credit_score,
-                "suggestion": "Please improve your credit score and reapply after 3 months"
-            }
-        
-        # Rule 2: Amount within pre-approved limit - instant approval
-        if amount <= pre_approved_limit:
-            return {
-                "status": "APPROVED",
-                "amount": amount,
-                "interest_rate": 10.5,
-                "credit_score": credit_score,
-                "pre_approved_limit": pre_approved_limit,
-                "reason": "Amount within pre-approved limit"
-            }
-        
-        # Rule 3: Amount between 1x and 2x pre-approved limit
-        if amount <= (2 * pre_approved_limit):
-            # Need salary information
-            if monthly_salary == 0:
-                return {
-                    "status": "NEED_SALARY",
-                    "message": "Please provide your monthly salary to proceed with evaluation",
-                    "amount": amount,
-                    "credit_score": credit_score,
-                    "pre_approved_limit": pre_approved_limit
-                }
-            
-            # USER REQUIREMENT: Salary during loan duration should be at least 2x the loan amount
-            # Assuming 24-month loan duration
-            loan_duration_months = 24
-            total_salary_over_duration = monthly_salary * loan_duration_months
-            required_salary = amount * 2
-            
-            logger.info(f"Salary Check: Total over {loan_duration_months} months = ₹{total_salary_over_duration}, Required (2x loan) = ₹{required_salary}")
-            
-            if total_salary_over_duration < required_salary:
-                return {
-                    "status": "REJECTED",
-                    "reason": f"Total salary over {loan_duration_months} months (₹{total_salary_over_duration:,}) is less than 2x the loan amount (₹{required_salary:,})",
-                    "monthly_salary": monthly_salary,
-                    "loan_duration_months": loan_duration_months,
-                    "total_salary": total_salary_over_duration,
-                    "required_amount": required_salary,
-                    "max_loan_amount": int(total_salary_over_duration / 2),
-                    "suggestion": f"Maximum eligible loan based on your salary: ₹{int(total_salary_over_duration / 2):,}"
-                }
-            
-            # Calculate EMI (simple estimation: amount/24 months * 1.1 for interest)
-            estimated_emi = (amount / loan_duration_months) * 1.1
-            max_allowed_emi = 0.5 * monthly_salary
-            
-            logger.info(f"EMI Check: Estimated={estimated_emi}, Max Allowed={max_allowed_emi}")
-            
-            if estimated_emi <= max_allowed_emi:
-                return {
-                    "status": "APPROVED",
-                    "amount": amount,
-                    "interest_rate": 12.0,
-                    "credit_score": credit_score,
-                    "monthly_emi": round(estimated_emi, 2),
-                    "monthly_salary": monthly_salary,
-                    "loan_duration_months": loan_duration_months,
-                    "reason": "Salary verification successful - Meets 2x loan requirement and EMI within affordability"
-                }
-            else:
-                return {
-                    "status": "REJECTED",
-                    "reason": f"EMI (₹{round(estimated_emi, 2)}) exceeds 50% of salary (₹{monthly_salary})",
-                    "estimated_emi": round(estimated_emi, 2),
-                    "monthly_salary": monthly_salary,
-                    "max_loan_amount": int(max_allowed_emi * loan_duration_months / 1.1),
-                    "suggestion": f"Maximum eligible amount based on EMI: ₹{int(max_allowed_emi * loan_duration_months / 1.1):,}"
-                }
-        
-        # Rule 4: Amount exceeds 2x pre-approved limit
-        return {
-            "status": "REJECTED",
-            "reason": f"Requested amount (₹{amount}) exceeds maximum eligible amount of ₹{2 * pre_approved_limit}",
-            "credit_score": credit_score,
-            "pre_approved_limit": pre_approved_limit,
-            "max_eligible": 2 * pre_approved_limit,
-            "suggestion": f"Please apply for an amount up to ₹{2 * pre_approved_limit}"
-        }
+        return evaluate_underwriting(amount, monthly_salary, credit_score, pre_approved_limit)
         
     except Exception as e:
         logger.error(f"Unexpected error in underwriting: {str(e)}")
@@ -326,4 +457,81 @@ def sanction_letter_tool(name: str, pan: str, amount: int, interest: float):
             "status": "error",
             "message": "Failed to generate sanction letter",
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+# ================= ASYNC TOOL IMPLEMENTATIONS =================
+# Used by tool.ainvoke() on the async graph path. HTTP calls go through the
+# shared async client; DB and PDF work runs in the default thread pool.
+async def _averification(pan: str):
+    logger.info(f"Verifying PAN: {pan[:4]}****{pan[-2:]}")
+    
+    if not pan or len(pan) != 10:
+        return {
+            "verified": False,
+            "error": "Invalid PAN format. Must be 10 characters."
+        }
+    
+    try:
+        result = await acall_api_with_retry(f"{CRM_URL}/verify-kyc", {"pan": pan.upper()})
+        return _kyc_response(pan, result)
+    except httpx.TimeoutException:
+        logger.error("CRM service timeout")
+        return {
+            "verified": False,
+            "error": "CRM service is taking too long to respond. Please try again."
+        }
+    except httpx.HTTPError as e:
+        logger.error(f"CRM service error: {str(e)}")
+        return {
+            "verified": False,
+            "error": "CRM service is currently unavailable. Please try again later."
+        }
+    except Exception as e:
+        logger.error(f"Unexpected error in KYC verification: {str(e)}")
+        return {
+            "verified": False,
+            "error": f"Verification failed: {str(e)}"
+        }
+
+async def _aunderwriting(pan: str, amount: int, monthly_salary: int = 0):
+    logger.info(f"Underwriting evaluation: PAN={pan[:4]}****, Amount={amount}, Salary={monthly_salary}")
+    
+    # Bureau and offer mart are independent - ask both at once
+    credit_score, pre_approved_limit = await asyncio.gather(
+        abureau_lookup(pan, "credit_score"),
+        abureau_lookup(pan, "pre_approved_limit"),
+        return_exceptions=True,
+    )
+    if isinstance(credit_score, Exception):
+        logger.error(f"Credit bureau error: {str(credit_score)}")
+        return {
+            "status": "ERROR",
+            "error": "Unable to fetch credit score. Please try again later."
+        }
+    if isinstance(pre_approved_limit, Exception):
+        logger.error(f"Offer service error: {str(pre_approved_limit)}")
+        return {
+            "status": "ERROR",
+            "error": "Unable to fetch pre-approved limit. Please try again later."
+        }
+    
+    try:
+        return evaluate_underwriting(amount, monthly_salary, credit_score, pre_approved_limit)
+    except Exception as e:
+        logger.error(f"Unexpected error in underwriting: {str(e)}")
+        return {
+            "status": "ERROR",
+            "error": f"Underwriting evaluation failed: {str(e)}"
+        }
+
+async def _acheck_user_history(name: str):
+    return await asyncio.to_thread(check_user_history_tool.func, name)
+
+async def _asanction_letter(name: str, pan: str, amount: int, interest: float):
+    # PDF rendering and the DB write are blocking; keep them off the event loop
+    return await asyncio.to_thread(sanction_letter_tool.func, name, pan, amount, interest)
+
+verification_agent_tool.coroutine = _averification
+underwriting_agent_tool.coroutine = _aunderwriting
+check_user_history_tool.coroutine = _acheck_user_history
+sanction_letter_tool.coroutine = _asanction_letter
@@ -4,25 +4,35 @@ Handles sales, KYC, underwriting, and sanction letter generation in one flow
 """
 import os
 import re
-import json
+import uuid
+import asyncio
 import logging
 from pathlib import Path
 from typing import Optional, TypedDict, Annotated
 
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import AnyMessage
 
+from agents.checkpointers import get_checkpointer, flush_checkpoints
+from agents.context import build_context, count_tokens
+from agents.instrumentation import llm_metrics
+from agents.llm_provider import get_llm
+from agents import faq
+from agents.tool_executor import execute_tool_calls, aexecute_tool_calls
+from agents.tool_payloads import encode_tool_result, underwriting_state, underwriting_summary
+from agents.prompt_cache import layout_prompt, prefix_fingerprint, record_usage
 from agents.tools import (
     get_market_rates_tool,
     check_user_history_tool,
     verification_agent_tool,
     underwriting_agent_tool,
-    sanction_letter_tool
+    sanction_letter_tool,
+    prefetch_bureau_data,
 )
 
 # Setup logging
@@ -37,13 +47,12 @@ if env_path.exists():
 else:
     logger.error(f"CRITICAL: .env file NOT found at: {env_path}")
 
-# Initialize LLM
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0.3,
-    api_key=os.getenv("OPENAI_API_KEY"),
-    streaming=True
-)
+# Initialize LLM (LLM_PROVIDER=openai|stub, see agents/llm_provider.py)
+llm = get_llm(callbacks=[llm_metrics])
+
+# Run underwriting from state as soon as its inputs are known, instead of
+# waiting for the LLM to ask for it (see underwrite_node)
+UNDERWRITING_SHORTCUT = os.getenv("UNDERWRITING_SHORTCUT", "true").lower() == "true"
 
 # ================= STATE DEFINITION =================
 class AgentState(TypedDict):
@@ -59,8 +68,19 @@ class AgentState(TypedDict):
     pre_approved_limit: Optional[int]
     underwriting_status: str
     approved_interest_rate: Optional[float]
+    underwriting_reason: Optional[str]
+    underwriting_suggestion: Optional[str]
+    max_eligible_amount: Optional[int]
     sanction_letter_url: Optional[str]
 
+    # underwriting_agent_tool arguments when underwrite_node should run next
+    # (set by extract_node and the tool nodes; read by route_underwriting)
+    underwriting_args: Optional[dict]
+
+    # Rolling summary of turns that fell out of the prompt window (agents/context.py)
+    context_summary: Optional[str]
+    summarized_through: Optional[str]
+
 # ================= HELPER FUNCTIONS =================
 def extract_loan_amount(text: str) -> Optional[int]:
     """Extract loan amount from text"""
@@ -120,17 +140,11 @@ UNIFIED_PROMPT = """You are Nexus AI, a professional and friendly loan advisor.
 4. **underwriting_agent_tool** - Evaluate loan eligibility
 5. **sanction_letter_tool** - Generate approval letter
 
-**Current State:**
-- Customer Name: {customer_name}
-- Loan Amount: {loan_amount}
-- KYC Verified: {kyc_verified}
-- Monthly Salary: {monthly_salary}
-- Underwriting Status: {underwriting_status}
-- Sanction Letter: {sanction_letter}
+The customer's current state (name, loan amount, KYC, salary, underwriting status, sanction letter) is given in the **Current State** message after the conversation. Always go by the latest Current State.
 
 **CRITICAL: WHEN SALARY IS PROVIDED OR UPLOADED:**
-If monthly_salary is shown above (not "Not provided"), you MUST:
-1. IMMEDIATELY acknowledge it: "Thank you for uploading your payslip! I can see your monthly salary is {monthly_salary}."
+If Monthly Salary in the Current State is not "Not provided", you MUST:
+1. IMMEDIATELY acknowledge it: "Thank you for uploading your payslip! I can see your monthly salary is <Monthly Salary>."
 2. Check if user's question was about eligibility/requirements
 3. If loan amount is known, tell them if they meet the 2x salary requirement
 4. Then ask for PAN to proceed with KYC verification
@@ -177,7 +191,7 @@ To proceed with your loan application, I'll need your PAN number for KYC verific
 **CRITICAL RULES:**
 - **NEVER GO BLANK** - Always respond to user input!
 - **ALWAYS ACKNOWLEDGE SALARY UPLOADS** - Say the exact amount and check eligibility
-- When monthly_salary shows a value → You MUST mention it in your response
+- When Monthly Salary shows a value → You MUST mention it in your response
 - Extract loan_amount, salary, PAN from messages and update state
 - Be conversational and helpful, not robotic
 - If user asks "am I eligible?" check if you have salary + amount, then answer
@@ -191,6 +205,22 @@ To proceed with your loan application, I'll need your PAN number for KYC verific
 - Keep responses clear and actionable
 """
 
+# Per-call state, sent after the conversation so UNIFIED_PROMPT stays a
+# byte-identical (cacheable) prefix
+UNIFIED_STATE = """**Current State:**
+- Customer Name: {customer_name}
+- Loan Amount: {loan_amount}
+- KYC Verified: {kyc_verified}
+- Monthly Salary: {monthly_salary}
+- Underwriting Status: {underwriting_status}
+- Approved Interest Rate: {interest_rate}
+- Decision Reason: {underwriting_reason}
+- Suggestion: {underwriting_suggestion}
+- Maximum Eligible Amount: {max_eligible_amount}
+- Sanction Letter: {sanction_letter}"""
+
+UNIFIED_PROMPT_TOKENS = count_tokens(UNIFIED_PROMPT)
+
 # Bind all tools to the LLM
 all_tools = [
     get_market_rates_tool,
@@ -199,26 +229,25 @@ all_tools = [
     underwriting_agent_tool,
     sanction_letter_tool
 ]
-agent_llm = llm.bind_tools(all_tools)
+agent_llm = llm.bind_tools(all_tools, prompt_cache_key="nexus-unified-agent")
+logger.info(f"Unified prompt prefix: {prefix_fingerprint(UNIFIED_PROMPT)}")
 
-def agent_node(state: AgentState):
-    """Single unified agent that handles everything"""
-    logger.info("=== UNIFIED AGENT PROCESSING ===")
-    
-    # Extract information from latest user message
-    last_user_msg = ""
+def _last_user_message(state: AgentState) -> str:
     for msg in reversed(state["messages"]):
         if isinstance(msg, HumanMessage):
-            last_user_msg = msg.content
-            break
-    
+            return msg.content
+    return ""
+
+def _is_payslip_upload(text: str) -> bool:
+    return "uploaded my payslip" in text.lower() or "monthly salary is" in text.lower()
+
+def _extract_details(state: AgentState) -> dict:
+    """State updates for the loan amount, salary and PAN in the latest user message"""
+    last_user_msg = _last_user_message(state)
     updates = {}
     
     # Check if this is a payslip upload message (force re-extraction of salary)
-    is_payslip_upload = "uploaded my payslip" in last_user_msg.lower() or "monthly salary is" in last_user_msg.lower()
-    
-    # If salary is typed without payslip, ask for payslip confirmation
-    is_salary_typed = extract_salary(last_user_msg) is not None and not is_payslip_upload
+    is_payslip_upload = _is_payslip_upload(last_user_msg)
     
     # Extract loan amount
     if not state.get("loan_amount"):
@@ -242,107 +271,261 @@ def agent_node(state: AgentState):
             if validation["valid"]:
                 updates["pan_number"] = validation["pan"]
                 logger.info(f"Extracted PAN: {validation['pan']}")
+                # Bureau lookups run while the LLM and KYC do their part
+                prefetch_bureau_data(validation["pan"])
+    return updates
+
+def extract_node(state: AgentState):
+    """Extract details from the latest user message, once per turn, and
+    decide whether underwriting can run from state"""
+    updates = _extract_details(state)
+    updates["underwriting_args"] = _underwriting_args({**state, **updates})
+    return updates
+
+def _state_text(state: AgentState) -> str:
+    """State block for agent_node and aagent_node (details were already
+    extracted by extract_node)"""
+    logger.info("=== UNIFIED AGENT PROCESSING ===")
+    
+    last_user_msg = _last_user_message(state)
+    
+    # If salary is typed without payslip, ask for payslip confirmation
+    is_salary_typed = extract_salary(last_user_msg) is not None and not _is_payslip_upload(last_user_msg)
     
     # Build prompt with current state
-    loan_amt = updates.get('loan_amount') or state.get('loan_amount')
-    salary_amt = updates.get('monthly_salary') or state.get('monthly_salary')
+    loan_amt = state.get('loan_amount')
+    salary_amt = state.get('monthly_salary')
     
-    prompt = UNIFIED_PROMPT.format(
+    state_text = UNIFIED_STATE.format(
         customer_name=state.get("customer_name") or "Not provided",
         loan_amount=f"₹{loan_amt:,}" if loan_amt else "Not specified",
         kyc_verified="Yes ✓" if state.get("kyc_verified") else "No ✗",
         monthly_salary=f"₹{salary_amt:,}" if salary_amt else "Not provided",
         underwriting_status=state.get("underwriting_status", "PENDING"),
-        sanction_letter="Generated ✓" if state.get("sanction_letter_url") else "Not generated"
+        sanction_letter="Generated ✓" if state.get("sanction_letter_url") else "Not generated",
+        **underwriting_summary(state)
     )
     
     # Add note about salary verification if needed
     salary_note = ""
     if is_salary_typed:
         salary_note = "\n\nIMPORTANT: The user just mentioned their monthly salary in text, but they haven't uploaded a payslip yet. Acknowledge their salary amount and ask them to upload their payslip for verification before proceeding."
+    state_text += salary_note
+    return state_text
+
+def agent_node(state: AgentState):
+    """Single unified agent that handles everything"""
+    state_text = _state_text(state)
+    
+    # Recent turns verbatim, older ones as a summary, within the token budget
+    context, updates = build_context(state, UNIFIED_PROMPT_TOKENS + count_tokens(state_text), llm=llm)
     
     # Get response from LLM
-    result = agent_llm.invoke([SystemMessage(content=prompt + salary_note)] + state["messages"])
+    result = agent_llm.invoke(layout_prompt(UNIFIED_PROMPT, context, state_text))
+    record_usage("agent", result)
     
     updates["messages"] = [result]
     return updates
 
-def tool_node(state: AgentState):
-    """Execute tools and update state"""
-    logger.info("=== EXECUTING TOOLS ===")
-    last_message = state["messages"][-1]
+async def aagent_node(state: AgentState):
+    """agent_node for the async path: the LLM call is awaited, not blocking"""
+    state_text = _state_text(state)
     
-    tool_map = {tool.name: tool for tool in all_tools}
+    # May call the summary LLM synchronously; keep it off the event loop
+    context, updates = await asyncio.to_thread(
+        build_context, state, UNIFIED_PROMPT_TOKENS + count_tokens(state_text), llm=llm
+    )
+    
+    result = await agent_llm.ainvoke(layout_prompt(UNIFIED_PROMPT, context, state_text))
+    record_usage("agent", result)
+    
+    updates["messages"] = [result]
+    return updates
+
+def faq_node(state: AgentState):
+    """Answer a static FAQ (rates, tenures, fees) from the rate card, no LLM"""
+    intent = faq.match_intent(_last_user_message(state))
+    logger.info(f"=== FAQ ANSWER: {intent} ===")
+    return {"messages": [AIMessage(content=faq.get_answer(intent))]}
+
+def _tool_progress():
+    """Progress callback emitting tool events for run_agent_stream
+    (a no-op when the graph is not streamed in custom mode)"""
+    writer = get_stream_writer()
+    
+    def progress(event, tool_call, error=None, elapsed_ms=None):
+        payload = {"type": event, "tool": tool_call["name"], "id": tool_call["id"]}
+        if event == "tool_end":
+            payload.update(ok=error is None, ms=round(elapsed_ms))
+        writer(payload)
+    
+    return progress
+
+def _apply_tool_outcomes(state: AgentState, outcomes):
+    """ToolMessages and state updates from (tool_call, result, error) outcomes"""
     tool_messages = []
     state_updates = {}
     
-    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-        for tool_call in last_message.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
+    for tool_call, result, error in outcomes:
+        tool_name = tool_call["name"]
+        
+        logger.info(f"Tool finished: {tool_name}")
+        
+        try:
+            if error is not None:
+                raise error
+            tool_messages.append(
+                ToolMessage(content=encode_tool_result(tool_name, result), tool_call_id=tool_call["id"])
+            )
             
-            logger.info(f"Calling tool: {tool_name}")
+            # Update state based on tool results
+            if tool_name == "verification_agent_tool":
+                if result.get("verified"):
+                    state_updates["kyc_verified"] = True
+                    state_updates["customer_name"] = result.get("name", state.get("customer_name"))
+                    state_updates["pan_number"] = result.get("pan")
+                    state_updates["phone_number"] = result.get("phone")
+                    logger.info(f"KYC VERIFIED: {result.get('name')}")
             
-            tool = tool_map.get(tool_name)
-            if tool:
-                try:
-                    result = tool.invoke(tool_args)
-                    from langchain_core.messages import ToolMessage
-                    tool_messages.append(
-                        ToolMessage(content=json.dumps(result, indent=2), tool_call_id=tool_call["id"])
-                    )
-                    
-                    # Update state based on tool results
-                    if tool_name == "verification_agent_tool":
-                        if result.get("verified"):
-                            state_updates["kyc_verified"] = True
-                            state_updates["customer_name"] = result.get("name", state.get("customer_name"))
-                            state_updates["pan_number"] = result.get("pan")
-                            state_updates["phone_number"] = result.get("phone")
-                            logger.info(f"KYC VERIFIED: {result.get('name')}")
-                    
-                    elif tool_name == "underwriting_agent_tool":
-                        status = result.get("status")
-                        state_updates["underwriting_status"] = status
-                        
-                        if status == "APPROVED":
-                            state_updates["approved_interest_rate"] = result.get("interest_rate")
-                            state_updates["credit_score"] = result.get("credit_score")
-                            logger.info(f"LOAN APPROVED at {result.get('interest_rate')}%")
-                        
-                        elif status == "REJECTED":
-                            state_updates["credit_score"] = result.get("credit_score")
-                            logger.info(f"LOAN REJECTED: {result.get('reason')}")
-                        
-                        elif status == "NEED_SALARY":
-                            logger.info("Need salary information")
-                    
-                    elif tool_name == "sanction_letter_tool":
-                        state_updates["sanction_letter_url"] = result.get("pdf_url")
-                        logger.info(f"Sanction letter generated: {result.get('pdf_url')}")
+            elif tool_name == "underwriting_agent_tool":
+                status = result.get("status")
+                # Status, rate, reason and suggestion; the state block carries them
+                state_updates.update(underwriting_state(result))
                 
-                except Exception as e:
-                    logger.error(f"Tool error: {e}")
-                    from langchain_core.messages import ToolMessage
-                    tool_messages.append(
-                        ToolMessage(content=f"Error: {str(e)}", tool_call_id=tool_call["id"])
-                    )
-    
+                if status == "APPROVED":
+                    state_updates["credit_score"] = result.get("credit_score")
+                    logger.info(f"LOAN APPROVED at {result.get('interest_rate')}%")
+                
+                elif status == "REJECTED":
+                    state_updates["credit_score"] = result.get("credit_score")
+                    logger.info(f"LOAN REJECTED: {result.get('reason')}")
+                
+                elif status == "NEED_SALARY":
+                    logger.info("Need salary information")
+            
+            elif tool_name == "sanction_letter_tool":
+                state_updates["sanction_letter_url"] = result.get("download_link")
+                logger.info(f"Sanction letter generated: {result.get('download_link')}")
+        
+        except Exception as e:
+            logger.error(f"Tool error: {e}")
+            tool_messages.append(
+                ToolMessage(content=f"Error: {str(e)}", tool_call_id=tool_call["id"])
+            )
+
+    # KYC may just have completed; underwrite next if the inputs are now in state
+    state_updates["underwriting_args"] = _underwriting_args({**state, **state_updates})
     state_updates["messages"] = tool_messages
     return state_updates
 
+def tool_node(state: AgentState):
+    """Execute tools and update state"""
+    logger.info("=== EXECUTING TOOLS ===")
+    last_message = state["messages"][-1]
+    
+    tool_map = {tool.name: tool for tool in all_tools}
+    outcomes = []
+    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
+        # Independent tools run concurrently; outcomes come back in call order
+        outcomes = execute_tool_calls(last_message.tool_calls, tool_map, _tool_progress())
+    return _apply_tool_outcomes(state, outcomes)
+
+async def atool_node(state: AgentState):
+    """tool_node for the async path, awaiting the tools' coroutines"""
+    logger.info("=== EXECUTING TOOLS (async) ===")
+    last_message = state["messages"][-1]
+    
+    tool_map = {tool.name: tool for tool in all_tools}
+    outcomes = []
+    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
+        outcomes = await aexecute_tool_calls(last_message.tool_calls, tool_map, _tool_progress())
+    return _apply_tool_outcomes(state, outcomes)
+
+def _underwriting_args(facts: dict) -> Optional[dict]:
+    """underwriting_agent_tool arguments once KYC, PAN and amount are in state
+    (salary too after a NEED_SALARY decision); None if it should not run now"""
+    if not (facts.get("kyc_verified") and facts.get("pan_number") and facts.get("loan_amount")):
+        return None
+    status = facts.get("underwriting_status") or "PENDING"
+    if status not in ("PENDING", "NEED_SALARY") or (status == "NEED_SALARY" and not facts.get("monthly_salary")):
+        return None
+    # At most once per turn, however the previous attempt ended
+    for msg in reversed(facts["messages"]):
+        if isinstance(msg, HumanMessage):
+            break
+        if any(call["name"] == "underwriting_agent_tool" for call in getattr(msg, "tool_calls", None) or []):
+            return None
+    return {"pan": facts["pan_number"], "amount": facts["loan_amount"],
+            "monthly_salary": facts.get("monthly_salary") or 0}
+
+def _underwriting_call(state: AgentState):
+    """Tool call for underwrite_node and aunderwrite_node, with the
+    arguments extract_node or the tool node left in state"""
+    logger.info("=== UNDERWRITING FROM STATE ===")
+    return {"name": "underwriting_agent_tool", "args": state["underwriting_args"],
+            "id": f"call_underwrite_{uuid.uuid4().hex[:12]}"}
+
+def _underwriting_updates(state: AgentState, tool_call, outcomes):
+    # Recorded as an ordinary tool round trip, so the agent LLM only has
+    # to phrase the decision and the history reads as if it had asked
+    updates = _apply_tool_outcomes(state, outcomes)
+    tool_messages = updates.pop("messages")
+    updates["underwriting_args"] = None
+    updates["messages"] = [AIMessage(content="", tool_calls=[tool_call])] + tool_messages
+    return updates
+
+def underwrite_node(state: AgentState):
+    """Run underwriting deterministically, without an LLM hop to request it"""
+    tool_call = _underwriting_call(state)
+    outcomes = execute_tool_calls([tool_call], {underwriting_agent_tool.name: underwriting_agent_tool},
+                                  _tool_progress())
+    return _underwriting_updates(state, tool_call, outcomes)
+
+async def aunderwrite_node(state: AgentState):
+    """underwrite_node for the async path"""
+    tool_call = _underwriting_call(state)
+    outcomes = await aexecute_tool_calls([tool_call], {underwriting_agent_tool.name: underwriting_agent_tool},
+                                         _tool_progress())
+    return _underwriting_updates(state, tool_call, outcomes)
+
+def route_underwriting(state: AgentState):
+    """Underwrite from state when its inputs are complete, else ask the agent"""
+    if UNDERWRITING_SHORTCUT and state.get("underwriting_args"):
+        return "underwrite"
+    return "agent"
+
 # ================= GRAPH CONSTRUCTION =================
 def build_graph():
     """Build the simplified single-agent workflow"""
-    memory = MemorySaver()
+    # CHECKPOINTER=memory|sqlite (agents/checkpointers.py)
+    memory = get_checkpointer()
     workflow = StateGraph(AgentState)
     
     # Add nodes
-    workflow.add_node("agent", agent_node)
-    workflow.add_node("tools", tool_node)
+    # Sync and async implementations; graph.stream uses the first,
+    # graph.astream (asgi.py) the second
+    workflow.add_node("agent", RunnableLambda(agent_node, afunc=aagent_node))
+    workflow.add_node("tools", RunnableLambda(tool_node, afunc=atool_node))
+    
+    workflow.add_node("underwrite", RunnableLambda(underwrite_node, afunc=aunderwrite_node))
+    
+    workflow.add_node("faq", faq_node)
+    workflow.add_node("extract", extract_node)
     
-    # Start with agent
-    workflow.add_edge(START, "agent")
+    # Static FAQs are answered directly until an application is under way
+    # (then "what's the rate?" means the customer's rate, which only the
+    # agent knows); everything else goes to the agent, through
+    # underwriting when its inputs are complete
+    def route_start(state: AgentState):
+        application_started = state.get("loan_amount") or state.get("underwriting_status") not in (None, "", "PENDING")
+        if faq.FAQ_CACHE and not application_started and faq.match_intent(_last_user_message(state)):
+            return "faq"
+        return "extract"
+    
+    workflow.add_conditional_edges(START, route_start, {"faq": "faq", "extract": "extract"})
+    workflow.add_conditional_edges("extract", route_underwriting, {"underwrite": "underwrite", "agent": "agent"})
+    workflow.add_edge("faq", END)
+    workflow.add_edge("underwrite", "agent")
     
     # Agent decides: call tools or end
     def route_agent(state: AgentState):
@@ -353,10 +536,11 @@ def build_graph():
     
     workflow.add_conditional_edges("agent", route_agent, {"tools": "tools", END: END})
     
-    # After tools, always return to agent
-    workflow.add_edge("tools", "agent")
+    # After tools (e.g. KYC just verified), underwrite before the agent replies
+    workflow.add_conditional_edges("tools", route_underwriting, {"underwrite": "underwrite", "agent": "agent"})
     
-    return workflow.compile(checkpointer=memory)
+    # Node and tool timings per session (LLM calls are tracked via the llm's callbacks)
+    return workflow.compile(checkpointer=memory).with_config(callbacks=[llm_metrics])
 
 # Build the graph
 graph = build_graph()
@@ -379,6 +563,8 @@ def run_agent(user_input: str, thread_id: str):
             stream_mode="values"
         ):
             events.append(event)
+        # Persist the turn before replying (the SQLite saver batches writes)
+        flush_checkpoints(graph.checkpointer)
         
         if events:
             final_state = events[-1]
@@ -409,3 +595,116 @@ def run_agent(user_input: str, thread_id: str):
         import traceback
         traceback.print_exc()
         return f"I apologize, but I encountered an error: {str(e)}. Please try rephrasing your request."
+
+
+# Nodes whose AI messages are shown to the user
+STREAMED_NODES = ("agent", "faq")
+STATE_SUMMARY_KEYS = (
+    "customer_name", "loan_amount", "kyc_verified", "monthly_salary",
+    "underwriting_status", "approved_interest_rate", "sanction_letter_url",
+)
+
+def _stream_event(mode, data):
+    """Client event for a "messages" or "custom" stream part, or None"""
+    if mode == "custom":
+        return data
+    message, metadata = data
+    node = metadata.get("langgraph_node")
+    # Tool-call argument chunks and tool results carry no text
+    if isinstance(message, AIMessage) and message.content and node in STREAMED_NODES:
+        return {"type": "token", "node": node, "text": message.content}
+    return None
+
+def _final_event(final_state):
+    response = ""
+    if final_state.get("messages") and isinstance(final_state["messages"][-1], AIMessage):
+        response = final_state["messages"][-1].content
+    return {
+        "type": "final",
+        "response": response,
+        "state": {key: final_state.get(key) for key in STATE_SUMMARY_KEYS},
+    }
+
+def _error_event(e):
+    return {"type": "error", "error": f"I apologize, but I encountered an error: {str(e)}. Please try rephrasing your request."}
+
+def run_agent_stream(user_input: str, thread_id: str):
+    """Execute the unified agent workflow, yielding events as they happen.
+    
+    Yields dicts:
+        {"type": "token", "node": ..., "text": ...}     LLM output as generated
+        {"type": "tool_start", "tool": ..., "id": ...}
+        {"type": "tool_end", "tool": ..., "id": ..., "ok": ..., "ms": ...}
+        {"type": "final", "response": ..., "state": {...}}  once, at the end
+        {"type": "error", "error": ...}                  instead of final on failure
+    """
+    logger.info(f"\n{'='*60}")
+    logger.info(f"[STREAMING] USER INPUT: {user_input}")
+    logger.info(f"[STREAMING] THREAD ID: {thread_id}")
+    logger.info(f"{'='*60}\n")
+    
+    config = {"configurable": {"thread_id": thread_id}, "recursion_limit": 50}
+    
+    try:
+        final_state = {}
+        for mode, data in graph.stream(
+            {"messages": [HumanMessage(content=user_input)]},
+            config=config,
+            stream_mode=["messages", "custom", "values"]
+        ):
+            if mode == "values":
+                final_state = data
+            else:
+                event = _stream_event(mode, data)
+                if event:
+                    yield event
+        
+        flush_checkpoints(graph.checkpointer)
+        yield _final_event(final_state)
+    
+    except Exception as e:
+        logger.error(f"ERROR in run_agent_stream: {e}", exc_info=True)
+        yield _error_event(e)
+
+async def arun_agent_stream(user_input: str, thread_id: str):
+    """Async run_agent_stream (graph.astream); yields the same events"""
+    logger.info(f"[ASYNC STREAMING] THREAD ID: {thread_id}, USER INPUT: {user_input}")
+    config = {"configurable": {"thread_id": thread_id}, "recursion_limit": 50}
+    
+    try:
+        final_state = {}
+        async for mode, data in graph.astream(
+            {"messages": [HumanMessage(content=user_input)]},
+            config=config,
+            stream_mode=["messages", "custom", "values"]
+        ):
+            if mode == "values":
+                final_state = data
+            else:
+                event = _stream_event(mode, data)
+                if event:
+                    yield event
+        
+        await asyncio.to_thread(flush_checkpoints, graph.checkpointer)
+        yield _final_event(final_state)
+    
+    except Exception as e:
+        logger.error(f"ERROR in arun_agent_stream: {e}", exc_info=True)
+        yield _error_event(e)
+
+async def arun_agent(user_input: str, thread_id: str):
+    """Async run_agent (graph.ainvoke); returns the reply text"""
+    logger.info(f"[ASYNC] THREAD ID: {thread_id}, USER INPUT: {user_input}")
+    config = {"configurable": {"thread_id": thread_id}, "recursion_limit": 50}
+    
+    try:
+        final_state = await graph.ainvoke({"messages": [HumanMessage(content=user_input)]}, config=config)
+        await asyncio.to_thread(flush_checkpoints, graph.checkpointer)
+        for msg in reversed(final_state.get("messages", [])):
+            if isinstance(msg, AIMessage) and msg.content:
+                return msg.content
+        return "I'm processing your request. Please continue."
+    
+    except Exception as e:
+        logger.error(f"ERROR in arun_agent: {e}", exc_info=True)
+        return f"I apologize, but I encountered an error: {str(e)}. Please try rephrasing your request."
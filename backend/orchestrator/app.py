@@ -1,40 +1,24 @@
 # app.py (improved)
+import io
 import os
 import json
 import traceback
 import re
-from flask import Flask, request, jsonify, send_from_directory, Response
+import itertools
+from urllib.parse import quote
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import ast
-from agents.unified_agent import run_agent
-
-# Configure Tesseract path (works on both Windows and Linux)
-try:
-    import pytesseract
-    tesseract_path = os.getenv('TESSERACT_PATH', None)
-    if tesseract_path:
-        pytesseract.pytesseract.tesseract_cmd = tesseract_path
-        print(f"✅ Tesseract-OCR configured from env: {tesseract_path}")
-    elif os.name == 'nt':  # Windows
-        default_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-        if os.path.exists(default_path):
-            pytesseract.pytesseract.tesseract_cmd = default_path
-            print("✅ Tesseract-OCR configured from default Windows path")
-    else:
-        print("✅ Tesseract-OCR will use system PATH (Linux/Docker)")
-except ImportError:
-    print("⚠️ pytesseract not installed")
-except Exception as e:
-    print(f"⚠️ Error configuring Tesseract: {e}")
-
-# Configure Poppler path for pdf2image (optional, system PATH can be used)
-POPPLER_PATH = os.getenv('POPPLER_PATH', None)
-if POPPLER_PATH is None and os.name == 'nt':  # Windows
-    default_poppler = r'C:\Users\Ritika\poppler\poppler-24.08.0\Library\bin'
-    if os.path.exists(default_poppler):
-        POPPLER_PATH = default_poppler
-        print(f"✅ Poppler-utils configured from default Windows path")
+from agents.unified_agent import graph, run_agent, run_agent_stream
+from agents.checkpointers import checkpointer_stats
+from agents import batch_underwriting
+from agents.instrumentation import llm_metrics
+from agents.prompt_cache import get_prompt_cache_stats
+from agents.faq import get_faq_stats
+from services.ocr_cache import OCRCache
+from services.ocr_jobs import OCRJobQueue, OCRQueueFull
+from services.upload_store import UploadStore
 
 # --- App setup ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -48,139 +32,79 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_salary_from_file(filepath):
-    """Extract salary information from uploaded payslip image/PDF using OCR"""
-    try:
-        text = ""
-        
-        # Handle PDF files
-        if filepath.lower().endswith('.pdf'):
-            try:
-                import pdfplumber
-                import pytesseract
-                from PIL import Image
-                import pdf2image
-                
-                print(f"📄 Processing PDF: {filepath}")
-                
-                # First try text extraction
-                with pdfplumber.open(filepath) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text
-                
-                print(f"📝 Extracted {len(text)} chars from PDF text layer")
-                
-                # If no text found, it's a scanned/image PDF - use OCR
-                if len(text) < 50:
-                    print("🔍 PDF appears to be image-based, using OCR...")
-                    try:
-                        # Convert PDF pages to images
-                        images = pdf2image.convert_from_path(filepath, dpi=300, poppler_path=POPPLER_PATH)
-                        print(f"📸 Converted PDF to {len(images)} image(s)")
-                        
-                        # OCR each page
-                        for i, img in enumerate(images):
-                            # Preprocess for better OCR
-                            img = img.convert('L')  # Grayscale
-                            page_text = pytesseract.image_to_string(img, config='--psm 6')
-                            text += page_text
-                            print(f"✅ OCR page {i+1}: {len(page_text)} chars")
-                        
-                        print(f"🎯 Total OCR extracted: {len(text)} chars")
-                    except ImportError as ie:
-                        print(f"❌ Missing package: {ie}")
-                        print("Install: pip install pdf2image")
-                        print("Also needs poppler: https://github.com/oschwartz10612/poppler-windows/releases/")
-                        return None
-                    except Exception as ocr_err:
-                        print(f"❌ OCR error: {ocr_err}")
-                        import traceback
-                        traceback.print_exc()
-                        return None
-                        
-            except Exception as pdf_error:
-                print(f"❌ PDF extraction error: {pdf_error}")
-                import traceback
-                traceback.print_exc()
-                return None
-        
-        # Handle image files (PNG, JPG, JPEG)
-        elif filepath.lower().endswith(('.png', '.jpg', '.jpeg')):
-            try:
-                import pytesseract
-                from PIL import Image
-                
-                print(f"🖼️ Processing image: {filepath}")
-                
-                # Open and preprocess image
-                img = Image.open(filepath)
-                img = img.convert('L')  # Grayscale
-                
-                # Extract text using OCR
-                text = pytesseract.image_to_string(img, config='--psm 6')
-                print(f"✅ OCR extracted {len(text)} chars from image")
-                
-            except ImportError as ie:
-                print(f"❌ {ie} - pytesseract not installed")
-                return None
-            except Exception as ocr_error:
-                print(f"❌ OCR error: {ocr_error}")
-                import traceback
-                traceback.print_exc()
-                return None
-        else:
-            print(f"❌ Unsupported file type: {filepath}")
-            return None
-        
-        if not text or len(text) < 10:
-            print("No meaningful text extracted from file")
-            return None
-        
-        # DEBUG: Print extracted text
-        print(f"🔍 DEBUG - Extracted text:\n{text}\n")
-        
-        # Enhanced salary extraction patterns
-        salary_patterns = [
-            r'net\s*pay[:\s]*[₹rs.\s]*(\d+[,\d]*)',
-            r'net\s*salary[:\s]*[₹rs.\s]*(\d+[,\d]*)',
-            r'take\s*home[:\s]*[₹rs.\s]*(\d+[,\d]*)',
-            r'monthly\s*salary[:\s]*[₹rs.\s]*(\d+[,\d]*)',
-            r'basic\s*salary[:\s]*[₹rs.\s]*(\d+[,\d]*)',
-            r'gross\s*salary[:\s]*[₹rs.\s]*(\d+[,\d]*)',
-            r'₹\s*(\d{2}[,\d]+)',
-            r'rs\.?\s*(\d{2}[,\d]+)',
-        ]
-        
-        text_lower = text.lower()
-        found_salaries = []
-        
-        for pattern in salary_patterns:
-            matches = re.finditer(pattern, text_lower)
-            for match in matches:
-                salary_str = match.group(1).replace(',', '').replace(' ', '')
-                try:
-                    salary = int(salary_str)
-                    if 10000 <= salary <= 500000:
-                        found_salaries.append(salary)
-                        print(f"Found potential salary: ₹{salary:,}")
-                except ValueError:
-                    continue
-        
-        if found_salaries:
-            final_salary = max(found_salaries)
-            print(f"Selected salary: ₹{final_salary:,}")
-            return final_salary
-        
-        print("No salary found in document")
-        return None
-        
-    except Exception as e:
-        print(f"Error extracting salary from file: {e}")
-        import traceback
-        traceback.print_exc()
+# --- OCR worker pool ---
+# Payslip OCR runs in a bounded process pool so a scanned PDF never ties up
+# a request thread. Defaults: one worker per core, 32 pending jobs.
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', os.cpu_count() or 1))
+OCR_MAX_PENDING = int(os.getenv('OCR_MAX_PENDING', 32))
+OCR_SYNC_TIMEOUT = float(os.getenv('OCR_SYNC_TIMEOUT', 60))
+# Multipart /chat (upload and message in one request) only waits this long;
+# slower jobs are handed back as a job id to follow on /upload/<id>/events
+OCR_CHAT_WAIT = float(os.getenv('OCR_CHAT_WAIT', 5))
+
+# Re-uploads of the same payslip are answered from a SHA-256 keyed cache
+ocr_cache = None
+if os.getenv('OCR_CACHE', 'true').lower() != 'false':
+    ocr_cache = OCRCache(
+        os.getenv('OCR_CACHE_DB', os.path.join(BASE_DIR, "ocr_cache.db")),
+        max_memory_entries=int(os.getenv('OCR_CACHE_MEMORY_ENTRIES', 256)),
+        max_disk_bytes=int(os.getenv('OCR_CACHE_DISK_MB', 50)) * 1024 * 1024,
+        max_age=int(os.getenv('OCR_CACHE_MAX_AGE_DAYS', 30)) * 24 * 3600,
+    )
+ocr_jobs = OCRJobQueue(max_workers=OCR_WORKERS, max_pending=OCR_MAX_PENDING, cache=ocr_cache)
+
+# Uploads are OCR'd straight from memory (Werkzeug spools large ones to a
+# temp file). Keeping a copy in UPLOAD_DIR is optional and happens on a
+# background thread, with age- and size-based cleanup.
+UPLOAD_IN_MEMORY = os.getenv('UPLOAD_IN_MEMORY', 'true').lower() != 'false'
+UPLOAD_PERSIST = os.getenv('UPLOAD_PERSIST', 'true').lower() != 'false'
+upload_store = None
+if UPLOAD_PERSIST:
+    upload_store = UploadStore(
+        UPLOAD_DIR,
+        retention_seconds=int(os.getenv('UPLOAD_RETENTION_HOURS', 24 * 7)) * 3600,
+        max_bytes=int(os.getenv('UPLOAD_MAX_MB', 500)) * 1024 * 1024,
+    )
+
+def save_upload(file, session_id):
+    """Save an uploaded payslip to UPLOAD_DIR and return (filename, filepath)"""
+    filename = secure_filename(file.filename)
+    filepath = os.path.join(UPLOAD_DIR, f"{session_id}_{filename}")
+    file.save(filepath)
+    print(f"File saved: {filepath}")
+    return filename, filepath
+
+def queue_upload(file, session_id):
+    """Hand an uploaded payslip to the OCR pool and return its OCRJob"""
+    if not UPLOAD_IN_MEMORY:
+        filename, filepath = save_upload(file, session_id)
+        return ocr_jobs.submit(filepath, filename=filename, session_id=session_id)
+    
+    filename = secure_filename(file.filename)
+    data = file.read()
+    data_hash = OCRCache.hash_bytes(data)
+    if upload_store is not None:
+        upload_store.save_async(data, data_hash, filename, session_id)
+    return ocr_jobs.submit(filename, filename=filename, session_id=session_id,
+                           data=data, data_hash=data_hash)
+
+def session_job(job_id, session_id):
+    """The OCR job job_id if session_id queued it, else None: knowing a job
+    id must not let another session use that customer's payslip"""
+    job = ocr_jobs.get(job_id)
+    if job is None or job.session_id != session_id:
         return None
+    return job
+
+def payslip_message(extracted_salary, filename):
+    """Build the chat message the agent sees after a payslip upload"""
+    if extracted_salary:
+        # Make it clear to the agent that salary has been provided
+        print(f"✅ Extracted salary: ₹{extracted_salary:,}")
+        return f"I have uploaded my payslip. My monthly salary is ₹{extracted_salary:,}. Please verify my eligibility for the loan."
+    # If extraction fails, ask user to provide salary
+    print("⚠️ Could not extract salary from file")
+    return f"I uploaded a payslip file ({filename}), but the salary could not be extracted automatically. Can you help me verify my eligibility? (You may need to ask me for my salary)"
 
 app = Flask(__name__, static_folder=os.path.join(BASE_DIR, "static"))
 # Allow your frontend origin (adjust if needed). Using "*" is OK for local dev.
@@ -215,22 +139,18 @@ def chat():
                 file = request.files['file']
                 if file and allowed_file(file.filename):
                     try:
-                        filename = secure_filename(file.filename)
-                        filepath = os.path.join(UPLOAD_DIR, f"{session_id}_{filename}")
-                        file.save(filepath)
-                        print(f"File saved: {filepath}")
-                        
-                        # Extract salary from file
-                        extracted_salary = extract_salary_from_file(filepath)
-                        if extracted_salary:
-                            uploaded_salary = extracted_salary
-                            # Make it clear to the agent that salary has been provided
-                            message = f"I have uploaded my payslip. My monthly salary is ₹{extracted_salary:,}. Please verify my eligibility for the loan."
-                            print(f"✅ Extracted salary: ₹{extracted_salary:,}")
-                        else:
-                            # If extraction fails, ask user to provide salary
-                            message = f"I uploaded a payslip file ({filename}), but the salary could not be extracted automatically. Can you help me verify my eligibility? (You may need to ask me for my salary)"
-                            print("⚠️ Could not extract salary from file")
+                        # Extract salary in the OCR pool; cache hits and small
+                        # images finish within OCR_CHAT_WAIT
+                        job = queue_upload(file, session_id)
+                        if not job.wait(OCR_CHAT_WAIT):
+                            # Don't hold a request thread on OCR: the client follows
+                            # the job and resends with "ocr_job_id" when it's done
+                            return jsonify({
+                                "response": "I'm still reading your payslip. I'll check your eligibility as soon as it's done.",
+                                "ocr_job": job.to_dict(),
+                                "events_url": f"/upload/{job.id}/events?session_id={quote(session_id)}",
+                            }), 202
+                        message = payslip_message(job.salary, job.filename)
                     except Exception as file_error:
                         print(f"Error processing file: {file_error}")
                         import traceback
@@ -241,6 +161,16 @@ def chat():
             data = request.get_json(force=True, silent=True) or {}
             message = data.get("message", "")
             session_id = data.get("session_id", "guest")
+            
+            # Payslip already OCR'd through /upload
+            job_id = data.get("ocr_job_id")
+            if job_id:
+                job = session_job(job_id, session_id)
+                if job is None:
+                    return jsonify({"error": f"Unknown OCR job: {job_id}"}), 404
+                if not job.wait(OCR_SYNC_TIMEOUT):
+                    return jsonify({"error": "OCR job still running", "job": job.to_dict()}), 409
+                message = payslip_message(job.salary, job.filename)
 
         # run the unified agent workflow
         raw_response = run_agent(message, session_id)
@@ -288,7 +218,10 @@ def chat_stream():
     """Streaming endpoint using Server-Sent Events (SSE).
     
     This endpoint streams responses in real-time as they are generated,
-    providing a more responsive user experience.
+    providing a more responsive user experience. Each event is a JSON
+    object with a "type": "token" (LLM text as it is generated),
+    "tool_start"/"tool_end" (tool progress), then "final" (full response
+    and state summary) or "error", followed by {"done": true}.
     """
     try:
         data = request.get_json(force=True, silent=True) or {}
@@ -298,10 +231,9 @@ def chat_stream():
         def generate():
             """Generator function for SSE streaming."""
             try:
-                for chunk in run_agent_stream(message, session_id):
-                    if chunk:
-                        # Format as SSE data event
-                        yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+                for event in run_agent_stream(message, session_id):
+                    # Format as SSE data event
+                    yield f"data: {json.dumps(event, default=str)}\n\n"
                 
                 # Send done signal
                 yield f"data: {json.dumps({'done': True})}\n\n"
@@ -326,6 +258,133 @@ def chat_stream():
         return jsonify({"error": f"System Error: {str(e)}", "trace": tb}), 500
 
 
+@app.route("/upload", methods=["POST"])
+def upload():
+    """Queue a payslip for OCR and return a job id immediately.
+    
+    Poll GET /upload/<job_id> (optionally with ?wait=<seconds>) or subscribe
+    to GET /upload/<job_id>/events, passing the same ?session_id=, then send
+    the job id to /chat as "ocr_job_id" from that session once it is done.
+    """
+    session_id = request.form.get("session_id", "guest")
+    file = request.files.get('file')
+    if not file or not allowed_file(file.filename):
+        return jsonify({"error": "A PNG, JPG or PDF payslip is required"}), 400
+    
+    try:
+        job = queue_upload(file, session_id)
+    except OCRQueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    
+    return jsonify(job.to_dict()), 202
+
+
+@app.route("/upload/<job_id>", methods=["GET"])
+def upload_status(job_id):
+    # Only the session that uploaded the payslip (?session_id=) can see it
+    job = session_job(job_id, request.args.get("session_id", "guest"))
+    if job is None:
+        return jsonify({"error": f"Unknown OCR job: {job_id}"}), 404
+    
+    # Long-poll: hold the request until the job finishes or wait expires
+    wait = min(request.args.get("wait", 0, type=float), OCR_SYNC_TIMEOUT)
+    if wait > 0:
+        job.wait(wait)
+    return jsonify(job.to_dict())
+
+
+@app.route("/upload/<job_id>/events", methods=["GET"])
+def upload_events(job_id):
+    """Push the OCR result over SSE as soon as the job finishes."""
+    job = session_job(job_id, request.args.get("session_id", "guest"))
+    if job is None:
+        return jsonify({"error": f"Unknown OCR job: {job_id}"}), 404
+    
+    def generate():
+        yield f"data: {json.dumps(job.to_dict())}\n\n"
+        # Heartbeat every few seconds until the result is in
+        while not job.wait(5):
+            yield ": keep-alive\n\n"
+        yield f"data: {json.dumps(job.to_dict())}\n\n"
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+@app.route("/ocr/stats", methods=["GET"])
+def ocr_stats():
+    """Queue depth and per-job timing percentiles for the OCR pool"""
+    return jsonify(ocr_jobs.stats())
+
+
+@app.route("/llm/stats", methods=["GET"])
+def llm_stats():
+    """Per-node LLM latency/token/cost histograms; ?session_id= for one session"""
+    session_id = request.args.get("session_id")
+    if session_id:
+        session = llm_metrics.session_snapshot(session_id)
+        if session is None:
+            return jsonify({"error": "Unknown session"}), 404
+        return jsonify(session)
+    stats = llm_metrics.snapshot(max_sessions=request.args.get("sessions", 20, type=int))
+    stats["prompt_cache"] = get_prompt_cache_stats()
+    stats["faq"] = get_faq_stats()
+    return jsonify(stats)
+
+@app.route("/sessions/stats", methods=["GET"])
+def sessions_stats():
+    """Live sessions and bytes held by the graph checkpointer"""
+    return jsonify(checkpointer_stats(graph.checkpointer))
+
+@app.route("/underwriting/batch", methods=["POST"])
+def underwriting_batch():
+    """Underwrite a campaign list of (pan, amount, monthly_salary) rows.
+    
+    Input: a CSV or JSON Lines upload ("file"), a text/csv or
+    application/x-ndjson body, or JSON {"applications": [...]}.
+    Results are streamed back in input order as JSON Lines (default) or
+    CSV (?format=csv); see agents/batch_underwriting.py.
+    """
+    fmt = request.args.get("format", "jsonl").lower()
+    if fmt not in batch_underwriting.FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(batch_underwriting.FORMATS)}"}), 400
+    
+    # Bodies are buffered (a few MB per 10k rows): the request's streams are
+    # closed before the response generator reads past the first chunk
+    file = request.files.get("file")
+    content_type = request.mimetype or ""
+    if file:
+        input_format = "jsonl" if file.filename.lower().endswith((".jsonl", ".ndjson")) else "csv"
+        chunks = batch_underwriting.read_applications(io.BytesIO(file.read()), input_format)
+    elif content_type == "application/json":
+        applications = (request.get_json(silent=True) or {}).get("applications") or []
+        chunks = batch_underwriting.record_chunks(applications)
+    elif content_type in ("text/csv", "application/x-ndjson"):
+        chunks = batch_underwriting.read_applications(
+            io.BytesIO(request.get_data()), "csv" if content_type == "text/csv" else "jsonl")
+    else:
+        return jsonify({"error": "Send a CSV/JSON Lines file, a text/csv or application/x-ndjson body, "
+                                 "or JSON {\"applications\": [...]}"}), 400
+    
+    output = batch_underwriting.underwrite_stream(chunks, fmt)
+    try:
+        # Bad input (missing columns, unparsable file) fails on the first chunk: report it as a 400
+        first = next(output, "")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return Response(
+        stream_with_context(itertools.chain([first], output)),
+        mimetype=batch_underwriting.MEDIA_TYPES[fmt],
+        headers={'X-Accel-Buffering': 'no'}
+    )
+
 @app.route("/static/pdfs/<path:filename>")
 def serve_pdf(filename):
     # Safe serving from absolute PDF_DIR
@@ -0,0 +1,118 @@
+"""
+ASGI entry point: async chat endpoints in front of the Flask app.
+
+    cd backend/orchestrator && uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+/chat (JSON) and /chat/stream run the unified agent with graph.ainvoke /
+graph.astream: the LLM call and the bank service calls (shared
+httpx.AsyncClient) are awaited, so a session waiting on them holds no
+thread and one process can keep thousands of sessions in flight. PDF and
+DB work runs in the default thread pool, OCR in the OCR process pool.
+
+Every other route (uploads, OCR status, stats, PDFs, frontend) and
+multipart /chat uploads are served by the Flask app from app.py, so both
+entry points share one set of handlers and one OCR pool.
+
+Run a single worker. OCR jobs (ocr_jobs), the OCR process pool (sized to
+the cores) and, with the default CHECKPOINTER=memory, the conversation
+sessions all live in the process: with --workers N an upload's follow-up
+requests 404 on another worker, sessions are lost between workers and
+each worker starts its own full-size OCR pool.
+"""
+import json
+import time
+import asyncio
+import contextlib
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import app as flask_app, payslip_message, session_job, OCR_SYNC_TIMEOUT
+from agents.tools import close_async_client
+from agents.unified_agent import arun_agent, arun_agent_stream
+
+flask_asgi = WSGIMiddleware(flask_app)
+
+
+async def wait_for_job(job, timeout):
+    """Wait for an OCR job without tying up a thread. True if it finished."""
+    deadline = time.monotonic() + timeout
+    while not job.done:
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(0.1)
+    return True
+
+
+async def chat(request):
+    try:
+        data = await request.json()
+    except Exception:
+        data = {}
+    message = data.get("message", "")
+    session_id = data.get("session_id", "guest")
+
+    # Payslip already OCR'd through /upload
+    job_id = data.get("ocr_job_id")
+    if job_id:
+        job = session_job(job_id, session_id)
+        if job is None:
+            return JSONResponse({"error": f"Unknown OCR job: {job_id}"}, status_code=404)
+        if not await wait_for_job(job, OCR_SYNC_TIMEOUT):
+            return JSONResponse({"error": "OCR job still running", "job": job.to_dict()}, status_code=409)
+        message = payslip_message(job.salary, job.filename)
+
+    response = await arun_agent(message, session_id)
+    return JSONResponse({"response": response if isinstance(response, str) else str(response)})
+
+
+async def chat_stream(request):
+    """SSE stream of run_agent_stream events (see /chat/stream in app.py)"""
+    try:
+        data = await request.json()
+    except Exception:
+        data = {}
+    message = data.get("message", "")
+    session_id = data.get("session_id", "guest")
+
+    async def generate():
+        async for event in arun_agent_stream(message, session_id):
+            yield f"data: {json.dumps(event, default=str)}\n\n"
+        yield f"data: {json.dumps({'done': True})}\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await close_async_client()
+
+
+api = Starlette(
+    routes=[
+        Route("/chat", chat, methods=["POST"]),
+        Route("/chat/stream", chat_stream, methods=["POST"]),
+        Mount("/", app=flask_asgi),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan,
+)
+
+
+async def app(scope, receive, send):
+    # Multipart /chat carries a payslip: let Flask parse the upload
+    if scope["type"] == "http" and scope["path"] == "/chat":
+        content_type = dict(scope["headers"]).get(b"content-type", b"")
+        if content_type.startswith(b"multipart/form-data"):
+            await flask_asgi(scope, receive, send)
+            return
+    await api(scope, receive, send)
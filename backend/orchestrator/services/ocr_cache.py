@@ -0,0 +1,144 @@
+"""
+Content-addressed cache for payslip OCR results.
+
+Uploads are keyed by the SHA-256 of their bytes, so a re-uploaded payslip
+(retry, page refresh, the bundled sample) skips Tesseract entirely. Entries
+live in an in-memory LRU backed by a SQLite store on disk; both levels
+evict by age, and the disk store also evicts least-recently-used entries
+once it grows past its byte budget.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class OCRCache:
+    def __init__(self, db_path, max_memory_entries=256, max_disk_bytes=50 * 1024 * 1024,
+                 max_age=30 * 24 * 3600):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age = max_age
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._init_db()
+
+    @staticmethod
+    def hash_bytes(data):
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_file(filepath, chunk_size=1024 * 1024):
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _get_connection(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._get_connection()
+        conn.execute('''CREATE TABLE IF NOT EXISTS ocr_cache (
+            key TEXT PRIMARY KEY,
+            text TEXT, salary INTEGER, size INTEGER,
+            created_at REAL, accessed_at REAL)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_ocr_cache_accessed ON ocr_cache (accessed_at)')
+        conn.commit()
+        conn.close()
+
+    def get(self, key):
+        """Return {"text", "salary"} for a cached upload hash, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry["created_at"] <= self.max_age:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return {"text": entry["text"], "salary": entry["salary"]}
+                del self._memory[key]
+
+        conn = self._get_connection()
+        try:
+            row = conn.execute(
+                "SELECT text, salary, created_at FROM ocr_cache WHERE key=? AND created_at>=?",
+                (key, now - self.max_age)
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE ocr_cache SET accessed_at=? WHERE key=?", (now, key))
+                conn.commit()
+        finally:
+            conn.close()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, row["text"], row["salary"], row["created_at"])
+        return {"text": row["text"], "salary": row["salary"]}
+
+    def put(self, key, text, salary):
+        now = time.time()
+        text = text or ""
+        with self._lock:
+            self._remember(key, text, salary, now)
+
+        conn = self._get_connection()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, text, salary, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, text, salary, len(text.encode('utf-8')), now, now)
+            )
+            self._evict_disk(conn, now)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _remember(self, key, text, salary, created_at):
+        """Insert into the memory LRU. Caller must hold the lock."""
+        self._memory[key] = {"text": text, "salary": salary, "created_at": created_at}
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, conn, now):
+        conn.execute("DELETE FROM ocr_cache WHERE created_at<?", (now - self.max_age,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        # Drop least recently used entries until we're back under budget
+        for row in conn.execute("SELECT key, size FROM ocr_cache ORDER BY accessed_at").fetchall():
+            if total <= self.max_disk_bytes:
+                break
+            conn.execute("DELETE FROM ocr_cache WHERE key=?", (row["key"],))
+            total -= row["size"]
+
+    def stats(self):
+        conn = self._get_connection()
+        try:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_cache"
+            ).fetchone()
+        finally:
+            conn.close()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": entries,
+                "disk_bytes": size,
+            }
@@ -0,0 +1,149 @@
+"""
+Pluggable OCR engines for the payslip pipeline.
+
+pytesseract runs a fresh `tesseract` process per call: it writes the image
+to a temp file, the process reloads the language model, and the output is
+parsed back from a TSV file. For small payslip images that start-up cost
+is most of the OCR time. TesserocrEngine instead keeps a Tesseract API
+handle (language data already loaded) alive per thread through the
+tesserocr C API binding, so in the long-lived OCR worker processes each
+page costs only the recognition itself.
+
+Select the engine with OCR_ENGINE=auto|tesserocr|pytesseract. "auto" (the
+default) uses tesserocr when it is installed and falls back to pytesseract
+otherwise. Additional engines can be added with register_engine().
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+
+OCR_ENGINE = os.getenv('OCR_ENGINE', 'auto').lower()
+OCR_LANG = os.getenv('OCR_LANG', 'eng')
+
+
+class OCREngine(ABC):
+    """Interface: turn a PIL image into (text, mean word confidence 0-100)."""
+
+    name = "base"
+
+    @abstractmethod
+    def ocr(self, img):
+        """(text, mean word confidence 0-100) for a PIL image"""
+
+
+class PytesseractEngine(OCREngine):
+    """One tesseract subprocess per call (always available)."""
+
+    name = "pytesseract"
+
+    def __init__(self, lang=OCR_LANG):
+        import pytesseract  # noqa: F401 - fail early if missing
+        self.lang = lang
+
+    def ocr(self, img):
+        import pytesseract
+
+        data = pytesseract.image_to_data(
+            img, lang=self.lang, config='--psm 6', output_type=pytesseract.Output.DICT
+        )
+        lines = {}
+        confidences = []
+        for i, word in enumerate(data['text']):
+            word = word.strip()
+            if not word:
+                continue
+            conf = float(data['conf'][i])
+            if conf >= 0:
+                confidences.append(conf)
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append(word)
+
+        text = "\n".join(" ".join(words) for words in lines.values()) + "\n"
+        confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return text, confidence
+
+
+class TesserocrEngine(OCREngine):
+    """Persistent in-process Tesseract via tesserocr.
+
+    A PyTessBaseAPI handle is not thread-safe, so each thread (the PDF page
+    pool uses several) lazily creates its own and keeps it for the life of
+    the process.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang=OCR_LANG, tessdata=None):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.lang = lang
+        self.tessdata = tessdata or os.getenv('TESSDATA_PREFIX')
+        self._local = threading.local()
+        # Load once up front so a missing language pack fails here, not mid-upload
+        self._api()
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            kwargs = {"lang": self.lang, "psm": self._tesserocr.PSM.SINGLE_BLOCK}
+            if self.tessdata:
+                kwargs["path"] = self.tessdata
+            api = self._local.api = self._tesserocr.PyTessBaseAPI(**kwargs)
+        return api
+
+    def ocr(self, img):
+        api = self._api()
+        api.SetImage(img)
+        text = api.GetUTF8Text()
+        confidence = float(api.MeanTextConf())
+        api.Clear()
+        # Match PytesseractEngine's output: one line of words per text line
+        lines = (" ".join(line.split()) for line in text.splitlines())
+        return "\n".join(line for line in lines if line) + "\n", confidence
+
+
+ENGINES = {
+    "tesserocr": TesserocrEngine,
+    "pytesseract": PytesseractEngine,
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def register_engine(name, factory):
+    """Make a custom OCREngine selectable via OCR_ENGINE/get_engine(name)."""
+    ENGINES[name] = factory
+
+
+def get_engine(name=None):
+    """Return the (per-process, shared) OCR engine for name or OCR_ENGINE.
+
+    "auto" tries tesserocr then pytesseract. If the requested engine cannot
+    be created (not installed, no language data), pytesseract is used.
+    """
+    name = (name or OCR_ENGINE).lower()
+    with _engines_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            engine = _engines[name] = _create_engine(name)
+        return engine
+
+
+def _create_engine(name):
+    candidates = ["tesserocr", "pytesseract"] if name == "auto" else [name, "pytesseract"]
+    for candidate in candidates:
+        try:
+            engine = ENGINES[candidate]()
+        except KeyError:
+            print(f"⚠️ Unknown OCR engine '{candidate}'")
+            continue
+        except Exception as e:
+            # ImportError when the binding isn't installed, RuntimeError when
+            # Tesseract can't load its language data
+            if name != "auto" or candidate != "tesserocr":
+                print(f"⚠️ OCR engine '{candidate}' unavailable: {e}")
+            continue
+        print(f"✅ OCR engine: {engine.name}")
+        return engine
+    raise RuntimeError("No OCR engine available")
@@ -0,0 +1,231 @@
+"""
+Background OCR job queue.
+
+Payslip OCR (pdf2image + Tesseract) is CPU bound and can take several
+seconds per scanned page, so it must not run on a Flask request thread.
+OCRJobQueue hands each upload to a bounded process pool and returns a job
+id straight away; clients poll (or subscribe to) the job for its result.
+When an OCRCache is attached, uploads whose bytes were seen before finish
+immediately from the cache without touching the pool.
+"""
+import os
+import time
+import uuid
+import threading
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from services.ocr_cache import OCRCache
+from services.ocr_service import extract_payslip
+from services.salary_extraction import extract_salary
+
+
+class OCRQueueFull(Exception):
+    """Raised when the number of pending OCR jobs hits the configured limit."""
+
+
+def _run_ocr_job(filepath, data=None):
+    """Worker entry point - runs inside the OCR process pool."""
+    started_at = time.time()
+    result = extract_payslip(filepath, data=data)
+    return {**result, "started_at": started_at, "finished_at": time.time()}
+
+
+class OCRJob:
+    def __init__(self, filename, session_id=None):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.session_id = session_id
+        self.status = "pending"  # pending, done, failed
+        self.cache_key = None
+        self.cached = False
+        self.salary = None
+        self.ocr_tiers = []
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes. Returns True if it finished in time."""
+        return self._done.wait(timeout)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def to_dict(self):
+        timings = {}
+        if self.started_at:
+            timings["queue_ms"] = round((self.started_at - self.submitted_at) * 1000, 1)
+        if self.finished_at:
+            if self.started_at:
+                timings["ocr_ms"] = round((self.finished_at - self.started_at) * 1000, 1)
+            timings["total_ms"] = round((self.finished_at - self.submitted_at) * 1000, 1)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "filename": self.filename,
+            "session_id": self.session_id,
+            "salary": self.salary,
+            "cached": self.cached,
+            "ocr_tiers": self.ocr_tiers,
+            "error": self.error,
+            "timings": timings,
+        }
+
+
+class OCRJobQueue:
+    """Bounded process-pool executor for payslip OCR with a job registry."""
+
+    def __init__(self, max_workers=None, max_pending=32, job_ttl=900, history_size=500, cache=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache = cache
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        # Recent per-job timings for the stats endpoint
+        self._history = deque(maxlen=history_size)
+        # Which DPI tier each OCR'd page/image was accepted at
+        self._tier_counts = Counter()
+
+    def submit(self, filepath, filename=None, session_id=None, data=None, data_hash=None):
+        """Queue a file for OCR and return its OCRJob immediately.
+        
+        Pass data (the upload's bytes) to OCR straight from memory; filepath
+        is then only used for its name. data_hash saves re-hashing the bytes
+        when the caller already has their SHA-256.
+        """
+        job = OCRJob(filename or os.path.basename(filepath), session_id=session_id)
+        if self.cache is not None:
+            if data is not None:
+                job.cache_key = data_hash or OCRCache.hash_bytes(data)
+            else:
+                job.cache_key = OCRCache.hash_file(filepath)
+            cached = self.cache.get(job.cache_key)
+            if cached is not None:
+                return self._finish_from_cache(job, cached)
+
+        with self._lock:
+            self._prune()
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise OCRQueueFull(f"OCR queue is full ({self._pending} jobs pending)")
+            self._jobs[job.id] = job
+            self._pending += 1
+            self._submitted += 1
+
+        try:
+            future = self._executor.submit(_run_ocr_job, filepath, data)
+        except Exception:
+            with self._lock:
+                del self._jobs[job.id]
+                self._pending -= 1
+            raise
+        future.add_done_callback(lambda f: self._on_done(job, f))
+        return job
+
+    def _finish_from_cache(self, job, cached):
+        # Re-pick the salary from the cached text so entries written before a
+        # change to the salary scorer don't keep serving the old answer
+        if cached["text"]:
+            job.salary = extract_salary(cached["text"])["salary"]
+        else:
+            job.salary = cached["salary"]
+        job.cached = True
+        job.status = "done"
+        job.started_at = job.finished_at = time.time()
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            self._submitted += 1
+            self._completed += 1
+            self._history.append(job.to_dict()["timings"])
+        job._done.set()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _on_done(self, job, future):
+        try:
+            result = future.result()
+            job.salary = result["salary"]
+            job.started_at = result["started_at"]
+            job.ocr_tiers = result.get("ocr_tiers", [])
+            # Unreadable file (OCR/Poppler error) vs a document with no salary
+            if result.get("error"):
+                job.error = result["error"]
+                job.status = "failed"
+            else:
+                job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        job.finished_at = time.time()
+
+        # Only cache real extractions, not failures
+        if self.cache is not None and job.status == "done" and result["text"] is not None:
+            try:
+                self.cache.put(job.cache_key, result["text"], result["salary"])
+            except Exception as e:
+                print(f"⚠️ Could not cache OCR result: {e}")
+
+        with self._lock:
+            self._pending -= 1
+            if job.status == "done":
+                self._completed += 1
+            else:
+                self._failed += 1
+            self._history.append(job.to_dict()["timings"])
+            self._tier_counts.update(str(tier) for tier in job.ocr_tiers)
+        job._done.set()
+
+    def _prune(self):
+        """Drop finished jobs older than job_ttl. Caller must hold the lock."""
+        cutoff = time.time() - self.job_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.done and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self):
+        """Queue depth, counters and latency percentiles over recent jobs."""
+        with self._lock:
+            history = list(self._history)
+            stats = {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "queue_depth": self._pending,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "ocr_tiers": dict(self._tier_counts),
+            }
+
+        for key in ("queue_ms", "ocr_ms", "total_ms"):
+            values = sorted(t[key] for t in history if key in t)
+            if values:
+                stats[key] = {
+                    "p50": values[len(values) // 2],
+                    "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                    "max": values[-1],
+                }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,374 @@
+"""
+OCR service for payslip uploads.
+
+Holds the Tesseract/Poppler configuration and the salary extraction
+pipeline so it can run both inside the Flask process and inside the
+OCR worker processes (see services/ocr_jobs.py).
+"""
+import io
+import os
+import tempfile
+from collections import deque
+from contextlib import closing, contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from services.ocr_engines import get_engine
+from services.ocr_preprocess import preprocess
+from services.salary_extraction import extract_salary, find_confident_salary, has_salary_candidate
+
+# Configure Tesseract path (works on both Windows and Linux)
+try:
+    import pytesseract
+    tesseract_path = os.getenv('TESSERACT_PATH', None)
+    if tesseract_path:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_path
+        print(f"✅ Tesseract-OCR configured from env: {tesseract_path}")
+    elif os.name == 'nt':  # Windows
+        default_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+        if os.path.exists(default_path):
+            pytesseract.pytesseract.tesseract_cmd = default_path
+            print("✅ Tesseract-OCR configured from default Windows path")
+    else:
+        print("✅ Tesseract-OCR will use system PATH (Linux/Docker)")
+except ImportError:
+    print("⚠️ pytesseract not installed")
+except Exception as e:
+    print(f"⚠️ Error configuring Tesseract: {e}")
+
+# Configure Poppler path for pdf2image (optional, system PATH can be used)
+POPPLER_PATH = os.getenv('POPPLER_PATH', None)
+if POPPLER_PATH is None and os.name == 'nt':  # Windows
+    default_poppler = r'C:\Users\Ritika\poppler\poppler-24.08.0\Library\bin'
+    if os.path.exists(default_poppler):
+        POPPLER_PATH = default_poppler
+        print(f"✅ Poppler-utils configured from default Windows path")
+
+# Scanned PDFs are rendered a window of pages at a time and OCR'd on a
+# small thread pool (pytesseract calls are separate tesseract processes and
+# tesserocr releases the GIL while recognising, so threads run in parallel).
+# At most OCR_PAGE_THREADS + 2 * OCR_PAGE_WINDOW page images are alive at
+# once, whatever the page count.
+OCR_PAGE_THREADS = int(os.getenv('OCR_PAGE_THREADS', min(4, os.cpu_count() or 1)))
+OCR_PAGE_WINDOW = int(os.getenv('OCR_PAGE_WINDOW', 2))
+# We parallelise across pages ourselves; stop each tesseract process from
+# also spinning up one OpenMP thread per core.
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+# Early exit: stop OCR'ing further pages once a net pay / net salary /
+# take home line has been read. Region of interest: OCR only the bottom
+# OCR_ROI_FRACTION of a page first (where the summary usually sits) and
+# fall back to the full page when no net pay line turns up there.
+OCR_EARLY_EXIT = os.getenv('OCR_EARLY_EXIT', 'true').lower() != 'false'
+OCR_ROI = os.getenv('OCR_ROI', 'false').lower() == 'true'
+OCR_ROI_FRACTION = float(os.getenv('OCR_ROI_FRACTION', 0.5))
+
+# Adaptive resolution: OCR at the cheapest tier first and only re-run at
+# the next tier when Tesseract's mean word confidence is below
+# OCR_MIN_CONFIDENCE or no salary-looking amount was read. Scanned PDFs are
+# rasterized at each tier's DPI; images are downscaled relative to their
+# own DPI (300 assumed when the file doesn't say).
+OCR_DPI_TIERS = sorted(int(dpi) for dpi in os.getenv('OCR_DPI_TIERS', '150,300').split(','))
+OCR_MIN_CONFIDENCE = float(os.getenv('OCR_MIN_CONFIDENCE', 70))
+
+# Image cleanup before Tesseract (see services/ocr_preprocess.py): Otsu
+# binarization, border crop, downscale to OCR_TARGET_CHAR_HEIGHT pixel
+# text lines (0 disables) and deskew up to OCR_MAX_SKEW degrees.
+OCR_PREPROCESS = os.getenv('OCR_PREPROCESS', 'true').lower() != 'false'
+OCR_TARGET_CHAR_HEIGHT = int(os.getenv('OCR_TARGET_CHAR_HEIGHT', 30))
+OCR_BINARIZE = os.getenv('OCR_BINARIZE', 'true').lower() != 'false'
+OCR_DESKEW = os.getenv('OCR_DESKEW', 'true').lower() != 'false'
+OCR_CROP_BORDERS = os.getenv('OCR_CROP_BORDERS', 'true').lower() != 'false'
+OCR_MAX_SKEW = float(os.getenv('OCR_MAX_SKEW', 5))
+
+def prepare_image(img):
+    """Apply the configured preprocessing to a page image before OCR"""
+    if not OCR_PREPROCESS:
+        return img
+    return preprocess(
+        img,
+        target_char_height=OCR_TARGET_CHAR_HEIGHT,
+        binarize=OCR_BINARIZE,
+        deskew=OCR_DESKEW,
+        crop=OCR_CROP_BORDERS,
+        max_skew=OCR_MAX_SKEW,
+    )
+
+def _ocr_with_confidence(img):
+    """OCR with the configured engine, returning (text, mean word confidence)"""
+    return get_engine().ocr(img)
+
+def _good_enough(text, confidence):
+    return confidence >= OCR_MIN_CONFIDENCE and has_salary_candidate(text)
+
+def ocr_image(img):
+    """OCR a grayscale page image, trying the region of interest first.
+    
+    Returns:
+        tuple: (text, mean word confidence)
+    """
+    img = prepare_image(img)
+    if OCR_ROI:
+        width, height = img.size
+        top = int(height * (1 - OCR_ROI_FRACTION))
+        region_text, confidence = _ocr_with_confidence(img.crop((0, top, width, height)))
+        if find_confident_salary(region_text):
+            print(f"🎯 Net pay found in bottom {OCR_ROI_FRACTION:.0%} of page, skipping full-page OCR")
+            return region_text, confidence
+    
+    return _ocr_with_confidence(img)
+
+def ocr_image_adaptive(img):
+    """OCR an uploaded image, escalating through OCR_DPI_TIERS.
+    
+    Returns:
+        tuple: (text, tier) where tier is the DPI that was accepted
+    """
+    source_dpi = int(img.info.get('dpi', (300, 300))[0] or 300)
+    for tier in OCR_DPI_TIERS:
+        scale = tier / source_dpi
+        last_tier = tier == OCR_DPI_TIERS[-1] or scale >= 1
+        if scale < 1:
+            scaled = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))))
+        else:
+            scaled, tier = img, source_dpi
+        
+        text, confidence = ocr_image(scaled)
+        print(f"🔎 OCR at {tier} DPI: confidence {confidence:.0f}")
+        if last_tier or _good_enough(text, confidence):
+            return text, tier
+
+def _ocr_page(filepath, page_number, img):
+    """OCR one rendered PDF page, re-rendering at higher tiers if needed."""
+    import pdf2image
+    
+    tier = OCR_DPI_TIERS[0]
+    try:
+        text, confidence = ocr_image(img)
+    finally:
+        img.close()
+    
+    for next_tier in OCR_DPI_TIERS[1:]:
+        if _good_enough(text, confidence):
+            break
+        print(f"🔎 Page {page_number}: confidence {confidence:.0f} at {tier} DPI, retrying at {next_tier} DPI")
+        img = pdf2image.convert_from_path(
+            filepath, dpi=next_tier, first_page=page_number, last_page=page_number,
+            grayscale=True, poppler_path=POPPLER_PATH
+        )[0]
+        try:
+            text, confidence = ocr_image(img)
+        finally:
+            img.close()
+        tier = next_tier
+    
+    return text, tier
+
+def iter_pdf_page_text(filepath):
+    """OCR a scanned PDF page by page, yielding (page_number, text, tier) in order.
+    
+    Pages are rasterized at the lowest DPI tier in windows of OCR_PAGE_WINDOW
+    and OCR'd in parallel, so peak memory depends on the window size, not on
+    the document length. Stopping iteration early (or a page failing)
+    cancels the pages that haven't started yet and waits for the running
+    ones, so filepath can be removed once the generator is closed.
+    """
+    import pdf2image
+    
+    info = pdf2image.pdfinfo_from_path(filepath, poppler_path=POPPLER_PATH)
+    page_count = int(info.get("Pages", 0))
+    max_in_flight = OCR_PAGE_THREADS + OCR_PAGE_WINDOW
+    
+    pool = ThreadPoolExecutor(max_workers=OCR_PAGE_THREADS)
+    pending = deque()  # (page_number, future) in page order
+    next_page = 1
+    try:
+        while next_page <= page_count or pending:
+            # Render ahead while there's room, so rasterizing overlaps OCR
+            while next_page <= page_count and len(pending) < max_in_flight:
+                last_page = min(next_page + OCR_PAGE_WINDOW - 1, page_count)
+                images = pdf2image.convert_from_path(
+                    filepath, dpi=OCR_DPI_TIERS[0], first_page=next_page, last_page=last_page,
+                    grayscale=True, poppler_path=POPPLER_PATH
+                )
+                for offset, img in enumerate(images):
+                    page_number = next_page + offset
+                    pending.append((page_number, pool.submit(_ocr_page, filepath, page_number, img)))
+                del images
+                next_page = last_page + 1
+            
+            page_number, future = pending.popleft()
+            text, tier = future.result()
+            yield page_number, text, tier
+    finally:
+        # Pages still running read filepath (re-rendering at higher DPI), and
+        # the caller may delete it next: cancel the queued ones, wait for the rest
+        pool.shutdown(wait=True, cancel_futures=True)
+
+@contextmanager
+def _poppler_path(filepath, data):
+    """Yield a path poppler can read. pdftoppm only takes files, so an
+    in-memory scanned PDF is spooled to a temp file for the OCR pass."""
+    if data is None:
+        yield filepath
+        return
+    fd, tmp_path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        yield tmp_path
+    finally:
+        os.remove(tmp_path)
+
+def extract_text_from_file(filepath, ocr_tiers=None, data=None, errors=None):
+    """Run the PDF text layer / OCR pipeline and return the raw text.
+    
+    If data is given, the upload is read from those in-memory bytes and
+    filepath only supplies the file name/extension. Returns None when the
+    file could not be processed (unsupported type, missing OCR dependencies,
+    OCR errors); if errors is a list, the reason is appended to it. If
+    ocr_tiers is a list, the DPI tier accepted for each OCR'd page/image is
+    appended to it.
+    """
+    def failed(reason):
+        if errors is not None:
+            errors.append(reason)
+        return None
+    
+    text = ""
+    source = io.BytesIO(data) if data is not None else filepath
+    
+    # Handle PDF files
+    if filepath.lower().endswith('.pdf'):
+        try:
+            import pdfplumber
+            import pytesseract
+            from PIL import Image
+            import pdf2image
+            
+            print(f"📄 Processing PDF: {filepath}")
+            
+            # First try text extraction
+            with pdfplumber.open(source) as pdf:
+                for page in pdf.pages:
+                    page_text = page.extract_text()
+                    if page_text:
+                        text += page_text
+            
+            print(f"📝 Extracted {len(text)} chars from PDF text layer")
+            
+            # If no text found, it's a scanned/image PDF - use OCR
+            if len(text) < 50:
+                print("🔍 PDF appears to be image-based, using OCR...")
+                try:
+                    # Render and OCR pages in a bounded, parallel window
+                    # closing(): page workers finish before a temp PDF is removed
+                    with _poppler_path(filepath, data) as pdf_path, closing(iter_pdf_page_text(pdf_path)) as pages:
+                        for page_number, page_text, tier in pages:
+                            text += page_text
+                            if ocr_tiers is not None:
+                                ocr_tiers.append(tier)
+                            print(f"✅ OCR page {page_number}: {len(page_text)} chars at {tier} DPI")
+                            if OCR_EARLY_EXIT and find_confident_salary(page_text):
+                                print(f"⏩ Net pay found on page {page_number}, skipping remaining pages")
+                                break
+                    
+                    print(f"🎯 Total OCR extracted: {len(text)} chars")
+                except ImportError as ie:
+                    print(f"❌ Missing package: {ie}")
+                    print("Install: pip install pdf2image")
+                    print("Also needs poppler: https://github.com/oschwartz10612/poppler-windows/releases/")
+                    return failed(f"Missing package: {ie}")
+                except Exception as ocr_err:
+                    print(f"❌ OCR error: {ocr_err}")
+                    import traceback
+                    traceback.print_exc()
+                    return failed(f"OCR error: {ocr_err}")
+                    
+        except Exception as pdf_error:
+            print(f"❌ PDF extraction error: {pdf_error}")
+            import traceback
+            traceback.print_exc()
+            return failed(f"PDF extraction error: {pdf_error}")
+    
+    # Handle image files (PNG, JPG, JPEG)
+    elif filepath.lower().endswith(('.png', '.jpg', '.jpeg')):
+        try:
+            import pytesseract
+            from PIL import Image
+            
+            print(f"🖼️ Processing image: {filepath}")
+            
+            # Open and preprocess image
+            img = Image.open(source)
+            img = img.convert('L')  # Grayscale
+            
+            # Extract text using OCR
+            text, tier = ocr_image_adaptive(img)
+            if ocr_tiers is not None:
+                ocr_tiers.append(tier)
+            print(f"✅ OCR extracted {len(text)} chars from image")
+            
+        except ImportError as ie:
+            print(f"❌ {ie} - pytesseract not installed")
+            return failed(f"Missing package: {ie}")
+        except Exception as ocr_error:
+            print(f"❌ OCR error: {ocr_error}")
+            import traceback
+            traceback.print_exc()
+            return failed(f"OCR error: {ocr_error}")
+    else:
+        print(f"❌ Unsupported file type: {filepath}")
+        return failed(f"Unsupported file type: {os.path.basename(filepath)}")
+    
+    return text
+
+def extract_salary_from_text(text):
+    """Pick the monthly salary out of OCR/PDF text"""
+    if not text or len(text) < 10:
+        print("No meaningful text extracted from file")
+        return None
+    
+    # DEBUG: Print extracted text
+    print(f"🔍 DEBUG - Extracted text:\n{text}\n")
+    
+    result = extract_salary(text)
+    for candidate in result["candidates"]:
+        score = "out of range" if candidate["score"] is None else f"score {candidate['score']}"
+        print(f"Found potential salary ({candidate['label']}, line {candidate['line']}): "
+              f"₹{candidate['amount']:,} - {score}")
+    
+    if result["salary"]:
+        print(f"Selected salary: ₹{result['salary']:,} ({result['label']})")
+        return result["salary"]
+    
+    print("No salary found in document")
+    return None
+
+def extract_payslip(filepath, data=None):
+    """Extract text and salary from an uploaded payslip image/PDF.
+    
+    Pass data to process an upload held in memory; filepath is then only
+    used for the file name.
+    
+    Returns:
+        dict: {"text": str | None, "salary": int | None, "ocr_tiers": list,
+               "error": str | None}. text is None (and error says why) when
+        the file could not be read; a readable document without a salary
+        has text and salary None.
+    """
+    ocr_tiers = []
+    errors = []
+    try:
+        text = extract_text_from_file(filepath, ocr_tiers=ocr_tiers, data=data, errors=errors)
+        salary = extract_salary_from_text(text)
+        error = None if text is not None else (errors[0] if errors else "Could not read the file")
+        return {"text": text, "salary": salary, "ocr_tiers": ocr_tiers, "error": error}
+    except Exception as e:
+        print(f"Error extracting salary from file: {e}")
+        import traceback
+        traceback.print_exc()
+        return {"text": None, "salary": None, "ocr_tiers": ocr_tiers, "error": str(e)}
+
+def extract_salary_from_file(filepath):
+    """Extract salary information from uploaded payslip image/PDF using OCR"""
+    return extract_payslip(filepath)["salary"]
@@ -0,0 +1,155 @@
+"""
+Salary extraction from payslip OCR/PDF text.
+
+One pass of a precompiled regex finds every salary-sized number in the
+text; each is tagged with the label in front of it on its line (net pay,
+take home, gross, basic, ...) by a short look-back match (or at the end
+of the previous line when the amount stands alone on its line), plus its
+character offset and line number. Numbers with neither a label nor a
+currency marker (IDs, account numbers, dates) are dropped. A
+deterministic scorer then picks the salary: labelled net/take-home amounts
+beat monthly/gross/basic ones, amounts near the end of the document (where
+payslip summaries sit) win ties, and a "net" amount larger than the gross
+pay is distrusted. Deductions and individual components (HRA, allowances)
+are never chosen.
+
+Use extract_salary(text) for the chosen amount plus every scored candidate
+(handy for debugging a wrong pick), or find_confident_salary(text) for the
+cheap "is there a net pay line?" check used by early-exit OCR.
+"""
+import re
+
+MIN_SALARY = 10000
+MAX_SALARY = 500000
+
+# Label name -> regex. Words may be split or glued by OCR, hence \s*.
+LABELS = {
+    "net": r"net\s*(?:pay(?:able)?|salary|amount|earnings)",
+    "take_home": r"take[\s-]*home(?:\s*(?:pay|salary))?",
+    "monthly": r"monthly\s*(?:salary|income|pay)",
+    "gross": r"gross\s*(?:pay|salary|earnings|total)?|total\s*earnings",
+    "basic": r"basic(?:\s*(?:pay|salary))?",
+    "deduction": r"(?:total\s*)?deductions?",
+    "component": r"h\.?r\.?a|(?:special\s*|other\s*)?allowances?|bonus|arrears|p\.?f|tds|professional\s*tax|income\s*tax",
+}
+
+# Base score per label; "currency" is an unlabelled ₹/Rs amount.
+LABEL_WEIGHTS = {
+    "net": 100,
+    "take_home": 100,
+    "monthly": 70,
+    "gross": 40,
+    "basic": 25,
+    "currency": 10,
+    "component": -20,
+    "deduction": -100,
+}
+CONFIDENT_LABELS = ("net", "take_home")
+POSITION_WEIGHT = 5  # bonus for the last line of the document, scaled linearly
+NET_ABOVE_GROSS_PENALTY = 70  # drops below gross: likely an OCR misread
+
+# Five or more digits/commas: anything that can be in the salary range
+AMOUNT_REGEX = re.compile(r"\d[\d,]{4,}")
+# Matched against the text just before an amount: a label followed by up to
+# 24 non-digit characters (": Rs. "), or a bare currency marker
+_LABEL_ALTERNATION = "|".join(f"(?P<{name}>{pattern})" for name, pattern in LABELS.items())
+LABEL_REGEX = re.compile(
+    rf"\b(?:{_LABEL_ALTERNATION})\b[^\d\n]{{0,24}}$|(?P<currency>₹|\brs\b\.?|\binr\b)\s*$",
+    re.IGNORECASE,
+)
+LOOKBACK_CHARS = 48
+
+
+def find_candidates(text):
+    """Scan text once and return every amount as an unscored candidate.
+
+    Returns:
+        list[dict]: {"label", "amount", "raw", "offset", "line", "in_range"}
+        in document order
+    """
+    candidates = []
+    text = text or ""
+    search_label = LABEL_REGEX.search
+    line, counted_to = 0, 0
+    for match in AMOUNT_REGEX.finditer(text):
+        start = match.start()
+        window_start = max(0, start - LOOKBACK_CHARS)
+        line_start = text.rfind("\n", window_start, start) + 1 or window_start
+        label_match = search_label(text, line_start, start)
+        value_start = start if label_match is None else label_match.start()
+        if line_start and (label_match is None or label_match.lastgroup == "currency") \
+                and not text[line_start:value_start].strip():
+            # Amount alone on its line (table cells, rotated PDFs): the label
+            # may end the previous line
+            previous_end = line_start - 1
+            window_start = max(0, previous_end - LOOKBACK_CHARS)
+            previous_match = search_label(
+                text, text.rfind("\n", window_start, previous_end) + 1 or window_start, previous_end
+            )
+            if previous_match is not None and previous_match.lastgroup != "currency":
+                label_match = previous_match
+        if label_match is None:
+            continue
+        amount = int(match.group().replace(",", ""))
+        line += text.count("\n", counted_to, start)
+        counted_to = start
+        candidates.append({
+            "label": label_match.lastgroup,
+            "amount": amount,
+            "raw": text[label_match.start():match.end()].strip(),
+            "offset": label_match.start(),
+            "line": line,
+            "in_range": MIN_SALARY <= amount <= MAX_SALARY,
+        })
+    return candidates
+
+
+def score_candidates(candidates):
+    """Add a "score" to each candidate (None when out of range) in place."""
+    if not candidates:
+        return candidates
+    last_line = candidates[-1]["line"] or 1
+    max_gross = max(
+        (c["amount"] for c in candidates if c["label"] == "gross" and c["in_range"]), default=None
+    )
+
+    for candidate in candidates:
+        if not candidate["in_range"]:
+            candidate["score"] = None
+            continue
+        score = LABEL_WEIGHTS[candidate["label"]] + POSITION_WEIGHT * candidate["line"] / last_line
+        if max_gross and candidate["label"] in CONFIDENT_LABELS and candidate["amount"] > max_gross:
+            score -= NET_ABOVE_GROSS_PENALTY
+        candidate["score"] = round(score, 2)
+    return candidates
+
+
+def extract_salary(text):
+    """Choose the monthly salary in text.
+
+    Returns:
+        dict: {"salary": int | None, "label": str | None,
+               "candidates": list of scored candidates}
+    """
+    candidates = score_candidates(find_candidates(text))
+    eligible = [c for c in candidates if c["score"] is not None and c["score"] > 0]
+    if not eligible:
+        return {"salary": None, "label": None, "candidates": candidates}
+    # Highest score, then the later one in the document, then the larger amount
+    best = max(eligible, key=lambda c: (c["score"], c["offset"], c["amount"]))
+    return {"salary": best["amount"], "label": best["label"], "candidates": candidates}
+
+
+def find_confident_salary(text):
+    """Return the first in-range net pay / net salary / take home amount, if any"""
+    for candidate in find_candidates(text):
+        if candidate["label"] in CONFIDENT_LABELS and candidate["in_range"]:
+            return candidate["amount"]
+    return None
+
+
+def has_salary_candidate(text):
+    """True if text contains any salary-sized labelled or currency amount"""
+    return any(
+        c["in_range"] and LABEL_WEIGHTS[c["label"]] > 0 for c in find_candidates(text)
+    )
@@ -0,0 +1,92 @@
+"""
+Asynchronous storage for uploaded payslips.
+
+OCR reads uploads straight from memory, so writing them to UPLOAD_DIR is
+only kept for audit/debugging. UploadStore does that write on a background
+thread, names files by content hash so uploads from the same session don't
+overwrite each other, and periodically deletes files past the retention
+age or beyond the directory's byte budget.
+"""
+import os
+import queue
+import re
+import threading
+import time
+
+from werkzeug.utils import secure_filename
+
+# Files written by UploadStore: <session>_<12 hex chars of sha256>_<name>.
+# Cleanup only touches these, never files placed in the directory by hand.
+STORED_NAME = re.compile(r'^.+_[0-9a-f]{12}_.+$')
+
+
+class UploadStore:
+    def __init__(self, upload_dir, retention_seconds=7 * 24 * 3600, max_bytes=500 * 1024 * 1024,
+                 cleanup_interval=600):
+        self.upload_dir = upload_dir
+        self.retention_seconds = retention_seconds
+        self.max_bytes = max_bytes
+        self.cleanup_interval = cleanup_interval
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self._queue = queue.Queue()
+        self._last_cleanup = 0
+        self._thread = threading.Thread(target=self._run, name="upload-store", daemon=True)
+        self._thread.start()
+
+    def path_for(self, data_hash, filename, session_id):
+        name = secure_filename(f"{session_id}_{data_hash[:12]}_{filename}")
+        return os.path.join(self.upload_dir, name)
+
+    def save_async(self, data, data_hash, filename, session_id):
+        """Queue an upload to be written to disk; returns its eventual path."""
+        filepath = self.path_for(data_hash, filename, session_id)
+        self._queue.put((filepath, data))
+        return filepath
+
+    def _run(self):
+        while True:
+            try:
+                filepath, data = self._queue.get(timeout=self.cleanup_interval)
+            except queue.Empty:
+                filepath = None
+            if filepath:
+                try:
+                    # Same hash means same bytes, so an existing file is already correct
+                    if not os.path.exists(filepath):
+                        with open(filepath, 'wb') as f:
+                            f.write(data)
+                        print(f"File saved: {filepath}")
+                except OSError as e:
+                    print(f"⚠️ Could not save upload {filepath}: {e}")
+            if time.time() - self._last_cleanup >= self.cleanup_interval:
+                try:
+                    self.cleanup()
+                except OSError as e:
+                    print(f"⚠️ Upload cleanup failed: {e}")
+
+    def cleanup(self):
+        """Delete stored uploads older than the retention age, then oldest-first past max_bytes."""
+        self._last_cleanup = now = time.time()
+        files = []
+        for entry in os.scandir(self.upload_dir):
+            if not entry.is_file() or not STORED_NAME.match(entry.name):
+                continue
+            stat = entry.stat()
+            if now - stat.st_mtime > self.retention_seconds:
+                self._remove(entry.path)
+            else:
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            print(f"🧹 Removed expired upload: {path}")
+        except OSError as e:
+            print(f"⚠️ Could not remove upload {path}: {e}")
@@ -0,0 +1,148 @@
+"""
+Rows/sec of batch underwriting vs the per-call tool, and result parity.
+
+Fills the mock bank with --customers synthetic customers, starts the mock
+credit bureau and offer mart in-process and builds a campaign list of
+--rows applications. The list has a spread of amounts and salaries, and
+a few unknown PANs and invalid rows. Then it times:
+    - the engine alone (validation, decisions and JSON Lines, bureau data in memory)
+    - the batch pipeline end to end (bulk lookups from the mock services,
+      output as JSON Lines and as CSV)
+    - underwriting_agent_tool called once per row, on a --sample of rows
+It checks the batch results against tools.evaluate_underwriting for every
+row, and against the tool itself for the sample.
+
+Usage:
+    python benchmarks/bench_batch_underwriting.py [--rows 100000] [--customers 50000] [--sample 300]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sqlite3
+import string
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend', 'orchestrator'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd  # noqa: E402
+
+from bench_graph_stub import start_mock_services  # noqa: E402
+
+
+def pan_for(index):
+    """A distinct valid-format PAN per index"""
+    letters, rest = "", index // 10000
+    for _ in range(5):
+        rest, digit = divmod(rest, 26)
+        letters += string.ascii_uppercase[digit]
+    return f"{letters}{index % 10000:04d}Z"
+
+
+def make_customers(count, rng):
+    return [(pan_for(i), f"Customer {i}", rng.randrange(550, 900), rng.randrange(1, 40) * 25000,
+             "Mumbai", f"9{i:09d}") for i in range(count)]
+
+
+def make_applications(rows, customers, rng):
+    applications = []
+    for i in range(rows):
+        pan = customers[rng.randrange(len(customers))][0] if rng.random() > 0.01 else f"QQQQQ{i % 10000:04d}Q"
+        amount = rng.randrange(1, 60) * 25000
+        salary = rng.choice([0, 0, rng.randrange(2, 40) * 5000])
+        if rng.random() < 0.005:
+            amount = rng.choice([5000, "abc", 20_000_000])
+        applications.append({"pan": pan, "amount": amount, "monthly_salary": salary})
+    return applications
+
+
+def to_csv(applications):
+    lines = ["pan,amount,monthly_salary"] + [f"{a['pan']},{a['amount']},{a['monthly_salary']}" for a in applications]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--customers", type=int, default=50_000)
+    parser.add_argument("--sample", type=int, default=300, help="rows sent through the per-call tool")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    workdir = tempfile.mkdtemp(prefix="bench_graph_")
+    start_mock_services(workdir)
+    customers = make_customers(args.customers, rng)
+    conn = sqlite3.connect(os.path.join(workdir, "mock_bank.db"))
+    conn.executemany("INSERT OR IGNORE INTO customers VALUES (?,?,?,?,?,?)", customers)
+    conn.commit()
+    conn.close()
+    known = {pan: (score, limit) for pan, _, score, limit, *_ in customers}
+
+    import logging
+    logging.disable(logging.ERROR)  # unknown PANs log bureau errors by design
+    from agents import batch_underwriting, tools
+
+    applications = make_applications(args.rows, customers, rng)
+    csv_text = to_csv(applications)
+    print(f"{args.rows:,} applications over {args.customers:,} customers\n")
+
+    # Decision engine alone: bureau data already in memory
+    chunk = pd.read_csv(io.StringIO(csv_text), dtype=str, keep_default_na=False)
+    scores = {p: s for p, (s, _) in known.items()}
+    limits = {p: lim for p, (_, lim) in known.items()}
+    started = time.perf_counter()
+    pan, amount, salary, error = batch_underwriting.validate_applications(chunk)
+    results = batch_underwriting.evaluate_batch(pan, amount, salary, batch_underwriting._lookup(pan, scores),
+                                                batch_underwriting._lookup(pan, limits), error)
+    batch_underwriting.to_jsonl(results)
+    engine = time.perf_counter() - started
+
+    # End to end: chunked reads, bulk lookups over HTTP, streamed output
+    timings, outputs = {}, {}
+    for fmt in batch_underwriting.FORMATS:
+        started = time.perf_counter()
+        chunks = batch_underwriting.read_applications(io.StringIO(csv_text), "csv")
+        outputs[fmt] = "".join(batch_underwriting.underwrite_stream(chunks, fmt))
+        timings[fmt] = time.perf_counter() - started
+
+    # The per-call tool, as the chat path runs it (no prefetch)
+    tools.BUREAU_PREFETCH = False
+    sample = [i for i in range(args.sample)
+              if isinstance(applications[i]["amount"], int) and 10_000 <= applications[i]["amount"] <= 10_000_000]
+    started = time.perf_counter()
+    tool_results = {i: tools.underwriting_agent_tool.invoke(applications[i]) for i in sample}
+    per_call = time.perf_counter() - started
+
+    print(f"{'path':<40} {'seconds':>8} {'rows/sec':>12}")
+    print(f"{'engine (bureau data in memory)':<40} {engine:>8.2f} {args.rows / engine:>12,.0f}")
+    for fmt in batch_underwriting.FORMATS:
+        print(f"{'batch end to end, ' + fmt:<40} {timings[fmt]:>8.2f} {args.rows / timings[fmt]:>12,.0f}")
+    print(f"{f'underwriting_agent_tool x {len(sample)}':<40} {per_call:>8.2f} {len(sample) / per_call:>12,.0f}")
+
+    # Parity
+    records = [json.loads(line) for line in outputs["jsonl"].splitlines()]
+    mismatches = 0
+    checked = 0
+    for application, record in zip(applications, records):
+        record.pop("pan")
+        if application["pan"] not in known or record["status"] == "ERROR":
+            continue
+        checked += 1
+        score, limit = known[application["pan"]]
+        expected = tools.evaluate_underwriting(application["amount"], application["monthly_salary"], score, limit)
+        mismatches += record != expected
+    tool_mismatches = sum(records[i] != result for i, result in tool_results.items())
+    statuses = Counter(record["status"] for record in records)
+    print(f"\nStatuses: {dict(statuses)}")
+    print(f"Parity: {mismatches} mismatches vs evaluate_underwriting over {checked:,} rows, "
+          f"{tool_mismatches} vs underwriting_agent_tool over {len(tool_results)} rows")
+
+
+if __name__ == "__main__":
+    main()
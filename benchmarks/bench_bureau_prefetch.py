@@ -0,0 +1,83 @@
+"""
+Latency of the PAN turn with and without the bureau prefetch.
+
+The turn where the customer gives their PAN runs KYC and then
+underwriting, whose credit bureau and offer mart lookups used to start
+only inside underwriting_agent_tool. With BUREAU_PREFETCH they start as
+soon as the PAN is extracted, while the agent's LLM call and KYC run.
+
+Replays the first four turns of the bench_graph_stub conversation for
+each customer, with the stub LLM and the mock services, where the bureau
+and offer mart answer after --bureau-latency-ms. Reports the PAN turn's
+latency and the time spent inside the underwriting tool, prefetch off vs
+on.
+
+Usage:
+    python benchmarks/bench_bureau_prefetch.py [--sessions 12] [--bureau-latency-ms 300]
+        [--latency-ms 400]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend', 'orchestrator'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_graph_stub import CUSTOMERS, SCRIPT, percentile, start_mock_services  # noqa: E402
+
+PAN_TURN = 3
+
+
+def run(unified_agent, sessions, prefix):
+    """PAN turn latencies (ms) over the sessions"""
+    latencies = []
+    for index in range(sessions):
+        pan = CUSTOMERS[index % len(CUSTOMERS)][0]
+        for turn, message in enumerate(SCRIPT[:PAN_TURN + 1]):
+            started = time.perf_counter()
+            unified_agent.run_agent(message.format(pan=pan), f"{prefix}-{index}")
+            if turn == PAN_TURN:
+                latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=12)
+    parser.add_argument("--bureau-latency-ms", type=float, default=300)
+    parser.add_argument("--latency-ms", type=float, default=400, help="stub LLM time to first token")
+    args = parser.parse_args()
+
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["STUB_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["STUB_LLM_TOKENS_PER_SEC"] = "0"
+    workdir = tempfile.mkdtemp(prefix="bench_graph_")
+    start_mock_services(workdir, latency_ms={"credit_bureau": args.bureau_latency_ms,
+                                             "offer_mart": args.bureau_latency_ms})
+
+    import logging
+    logging.disable(logging.WARNING)
+    from agents import tools, unified_agent
+    from agents.instrumentation import llm_metrics
+    tools.pdf_service.output_dir = workdir
+    tools.db_service.db_name = os.path.join(workdir, "nexus.db")
+    tools.db_service._init_db()
+
+    print(f"{args.sessions} sessions, bureau and offer mart latency {args.bureau_latency_ms:.0f} ms, "
+          f"stub LLM latency {args.latency_ms:.0f} ms\n")
+    print(f"{'prefetch':<10} {'PAN turn p50':>13} {'p95':>7} {'underwriting tool mean':>23}")
+    for prefetch in (False, True):
+        tools.BUREAU_PREFETCH = prefetch
+        tools.clear_bureau_prefetch()
+        llm_metrics.reset()
+        latencies = run(unified_agent, args.sessions, f"prefetch-{prefetch}")
+        underwriting = llm_metrics.snapshot(max_sessions=0)["tools"]["underwriting_agent_tool"]
+        print(f"{'on' if prefetch else 'off':<10} {percentile(latencies, 0.5):>10.0f} ms "
+              f"{percentile(latencies, 0.95):>4.0f} ms {underwriting['wall_ms']['mean']:>20} ms")
+
+
+if __name__ == "__main__":
+    main()
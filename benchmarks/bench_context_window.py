@@ -0,0 +1,117 @@
+"""
+Prompt tokens per LLM call with and without context windowing.
+
+Replays a synthetic loan negotiation (the customer haggling over amount and
+tenure, with market-rate and underwriting tool calls every few turns) and
+counts the tokens sent on each call: the whole history, as agents did
+before, versus agents/context.build_context with the current CONTEXT_*
+settings. Full-history prompts grow linearly per turn, so their total over
+a conversation grows quadratically; windowed prompts level off.
+
+Usage:
+    python benchmarks/bench_context_window.py [--turns 40] [--system-tokens 1500]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend', 'orchestrator'))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage  # noqa: E402
+
+from agents import context  # noqa: E402
+
+RATES = {
+    "status": "success",
+    "rates": [
+        {"tenure": "12 months", "rate": "10.5%", "processing_fee": "1%"},
+        {"tenure": "24 months", "rate": "11.0%", "processing_fee": "1.5%"},
+        {"tenure": "36 months", "rate": "12.0%", "processing_fee": "2%"},
+    ],
+}
+
+
+def _id():
+    return str(uuid.uuid4())
+
+
+def negotiation_turn(rng, turn):
+    """Messages for one customer turn: question, optional tool round trip, answer"""
+    amount = rng.randrange(2, 15) * 100000
+    tenure = rng.choice([12, 24, 36])
+    messages = [HumanMessage(
+        id=_id(),
+        content=rng.choice([
+            f"What if I take {amount // 100000} lakhs over {tenure} months instead?",
+            f"Can you do a lower rate for {tenure} months? My EMI budget is tight.",
+            f"My friend got a better offer elsewhere, can you match it for ₹{amount:,}?",
+            "Explain the processing fee again please, and whether it is deducted upfront.",
+        ]),
+    )]
+    if turn % 3 == 0:
+        call_id = f"call_{turn}"
+        name, result = rng.choice([
+            ("get_market_rates_tool", RATES),
+            ("underwriting_agent_tool", {
+                "status": "NEED_SALARY", "amount": amount, "credit_score": 760,
+                "pre_approved_limit": 500000,
+                "message": "Please provide your monthly salary to proceed with evaluation",
+            }),
+        ])
+        messages.append(AIMessage(id=_id(), content="", tool_calls=[{"name": name, "args": {}, "id": call_id}]))
+        messages.append(ToolMessage(id=_id(), content=json.dumps(result, indent=2), tool_call_id=call_id))
+    messages.append(AIMessage(
+        id=_id(),
+        content=(f"Great question! For ₹{amount:,} over {tenure} months at 11.0% your EMI would be "
+                 f"about ₹{int(amount * 1.11 / tenure):,}. " * rng.randrange(2, 5)
+                 + "Shall I check your eligibility next?"),
+    ))
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--system-tokens", type=int, default=1500,
+                        help="size of the agent's system prompt")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    state = {"messages": [], "context_summary": None, "summarized_through": None}
+    full_total = windowed_total = 0
+    build_seconds = 0.0
+    print(f"keep_turns={context.CONTEXT_KEEP_TURNS} max_tokens={context.CONTEXT_MAX_TOKENS} "
+          f"summarizer={context.CONTEXT_SUMMARIZER}\n")
+    print(f"{'turn':>5} {'full':>8} {'windowed':>9}")
+    for turn in range(1, args.turns + 1):
+        turn_messages = negotiation_turn(rng, turn)
+        # The agent is called with the user message (and again after tools);
+        # count the call that sees the whole turn so far, before the answer
+        state["messages"] = state["messages"] + turn_messages[:-1]
+        full = args.system_tokens + context.count_message_tokens(state["messages"])
+        started = time.perf_counter()
+        prompt_messages, updates = context.build_context(state, args.system_tokens)
+        build_seconds += time.perf_counter() - started
+        windowed = args.system_tokens + context.count_message_tokens(prompt_messages)
+        state.update(updates)
+        state["messages"] = state["messages"] + turn_messages[-1:]
+        full_total += full
+        windowed_total += windowed
+        if turn % 5 == 0 or turn == 1:
+            print(f"{turn:>5} {full:>8} {windowed:>9}")
+
+    print(f"\nTotal prompt tokens over {args.turns} turns: full {full_total:,}, "
+          f"windowed {windowed_total:,} ({1 - windowed_total / full_total:.0%} fewer)")
+    print(f"build_context: {build_seconds / args.turns * 1000:.2f} ms per call")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)  # build_context logs every call
+    main()
@@ -0,0 +1,155 @@
+"""
+End-to-end load test of the unified agent graph with the offline stub LLM.
+
+Runs many scripted loan conversations (greeting, amount, rate question,
+PAN, sanction letter) through run_agent concurrently with LLM_PROVIDER=stub,
+so the numbers measure the graph, tools and services without the network
+or an API key. The stub's latency and token rate are configurable; set
+them to 0 to see pure framework overhead.
+
+Customers cover the three underwriting outcomes (approved, rejected on
+credit score, salary needed). With --start-services the CRM, credit bureau
+and offer mart mock services are started in-process on their usual ports
+against a temporary customer database; otherwise start them yourself
+(backend/mock_services/*.py) or the KYC/underwriting tools fail after
+their retries. Sanction letters and loan records go to a temp directory.
+
+Usage:
+    python benchmarks/bench_graph_stub.py --start-services [--sessions 50] [--concurrency 8]
+        [--latency-ms 400] [--tokens-per-sec 80]
+"""
+import argparse
+import importlib.util
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend', 'orchestrator'))
+
+CUSTOMERS = [
+    # pan, name, credit score, pre-approved limit, address, phone
+    ("ABCDE1000F", "Aarush Luthra", 850, 500000, "123, Tech Park, Bangalore", "9999999990"),
+    ("ABCDE2000F", "Rohan Das", 600, 100000, "45, Old City, Delhi", "9999999991"),
+    ("ABCDE3000F", "Priya Sharma", 750, 200000, "78, Sea Link, Mumbai", "9999999992"),
+]
+SCRIPT = [
+    "Hi there",
+    "I need 3 lakhs for home renovation",
+    "What interest rates do you offer for 24 months?",
+    "My PAN is {pan}",
+    "Yes please, generate the sanction letter",
+]
+MOCK_SERVICES = (("crm", 5001), ("credit_bureau", 5002), ("offer_mart", 5003))
+
+
+def _with_latency(app, latency_ms):
+    """WSGI wrapper answering every request latency_ms later"""
+    def delayed(environ, start_response):
+        time.sleep(latency_ms / 1000)
+        return app(environ, start_response)
+    return delayed
+
+
+def start_mock_services(workdir, latency_ms=None):
+    """Serve the mock CRM/bureau/offer apps in threads against a temp DB.
+
+    latency_ms optionally maps a service name to a simulated response delay.
+    """
+    from werkzeug.serving import make_server
+
+    db_path = os.path.join(workdir, "mock_bank.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE customers (pan TEXT PRIMARY KEY, name TEXT, credit_score INTEGER, "
+                 "pre_approved_limit INTEGER, address TEXT, phone TEXT)")
+    conn.executemany("INSERT INTO customers VALUES (?,?,?,?,?,?)", CUSTOMERS)
+    conn.commit()
+    conn.close()
+
+    for name, port in MOCK_SERVICES:
+        path = os.path.join(ROOT, "backend", "mock_services", f"{name}.py")
+        spec = importlib.util.spec_from_file_location(f"mock_{name}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.DB_PATH = db_path
+        app = module.app
+        if (latency_ms or {}).get(name):
+            app = _with_latency(app, latency_ms[name])
+        server = make_server("127.0.0.1", port, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=400, help="stub time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=80, help="stub output rate (0 = instant)")
+    parser.add_argument("--start-services", action="store_true", help="run the mock services in-process")
+    args = parser.parse_args()
+
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["STUB_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["STUB_LLM_TOKENS_PER_SEC"] = str(args.tokens_per_sec)
+    workdir = tempfile.mkdtemp(prefix="bench_graph_")
+    if args.start_services:
+        start_mock_services(workdir)
+
+    import logging
+    logging.disable(logging.WARNING)  # the graph logs every node at INFO
+    from agents import tools, unified_agent
+    from agents.instrumentation import llm_metrics
+    tools.pdf_service.output_dir = workdir
+    tools.db_service.db_name = os.path.join(workdir, "nexus.db")
+    tools.db_service._init_db()
+
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def run_session(index):
+        pan = CUSTOMERS[index % len(CUSTOMERS)][0]
+        thread_id = f"bench-{index}"
+        for message in SCRIPT:
+            started = time.perf_counter()
+            unified_agent.run_agent(message.format(pan=pan), thread_id)
+            with latencies_lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    print(f"{args.sessions} sessions x {len(SCRIPT)} turns, concurrency {args.concurrency}, "
+          f"stub latency {args.latency_ms} ms, {args.tokens_per_sec} tokens/s\n")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(run_session, range(args.sessions)))
+    wall = time.perf_counter() - started
+
+    stats = llm_metrics.snapshot(max_sessions=0)
+    nodes = stats["nodes"]
+    llm_ms = sum(n["llm_ms"]["sum"] for n in nodes.values())
+    node_ms = sum(n["wall_ms"]["sum"] for n in nodes.values())
+    tool_ms = sum(t["wall_ms"]["sum"] for t in stats["tools"].values())
+    turns = len(latencies)
+    print(f"Turns:        {turns} in {wall:.1f} s ({turns / wall:.1f} turns/sec)")
+    print(f"Turn latency: p50 {percentile(latencies, 0.5):.0f} ms, p95 {percentile(latencies, 0.95):.0f} ms, "
+          f"max {max(latencies):.0f} ms")
+    print(f"LLM calls:    {sum(n['llm_calls'] for n in nodes.values())}, "
+          f"tool calls requested: {sum(n['tool_calls'] for n in nodes.values())}")
+    print("Per turn:     "
+          f"LLM {llm_ms / turns:.0f} ms, tools {tool_ms / turns:.0f} ms, "
+          f"graph overhead {(sum(latencies) - llm_ms - tool_ms) / turns:.1f} ms "
+          f"(node code outside LLM/tools {(node_ms - llm_ms - tool_ms) / turns:.1f} ms)")
+    print("\nTools:")
+    for name, tool in sorted(stats["tools"].items()):
+        print(f"  {name:<28} {tool['runs']:>5} runs  mean {tool['wall_ms']['mean']} ms  errors {tool['errors']}")
+
+
+if __name__ == "__main__":
+    main()
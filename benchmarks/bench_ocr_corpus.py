@@ -0,0 +1,189 @@
+"""
+End-to-end OCR benchmark over a synthetic payslip corpus.
+
+Runs extract_salary_from_file on every document of a corpus made by
+create_payslip.py and compares the result with the ground truth stored next
+to each file. Reports throughput (docs/sec), p50/p95/max latency, peak RSS
+of this process and of its children (tesseract/pdftoppm subprocesses, OCR
+workers) and accuracy, overall and per format, layout, DPI, noise level,
+font and page count.
+
+Usage:
+    python create_payslip.py --corpus benchmarks/corpus --count 1000 --seed 42
+    python benchmarks/bench_ocr_corpus.py benchmarks/corpus [--workers 4] [--json run.json]
+
+Use the same corpus (same --count and --seed) before and after an OCR
+change; --json saves the numbers for comparison.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend', 'orchestrator'))
+
+from services.ocr_service import extract_salary_from_file  # noqa: E402
+
+BREAKDOWNS = ("format", "layout", "dpi", "noise", "font", "pages")
+
+
+def load_manifest(corpus):
+    path = os.path.join(corpus, "manifest.jsonl")
+    if os.path.exists(path):
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    # No manifest: fall back to the per-file sidecars
+    entries = []
+    for name in sorted(os.listdir(corpus)):
+        if name.endswith(".json"):
+            with open(os.path.join(corpus, name)) as f:
+                entries.append(json.load(f))
+    return entries
+
+
+def run_document(path, verbose=False):
+    """Extract one document; returns (salary, latency seconds, error)"""
+    started = time.perf_counter()
+    try:
+        with contextlib.ExitStack() as stack:
+            if not verbose:
+                # The pipeline prints progress and tracebacks for every document
+                stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+                stack.enter_context(contextlib.redirect_stderr(io.StringIO()))
+            salary = extract_salary_from_file(path)
+        error = None
+    except Exception as e:
+        salary, error = None, str(e)
+    return salary, time.perf_counter() - started, error
+
+
+def peak_rss_mb():
+    """Peak resident set size of (this process, its finished children) in MB"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 2**20, None
+        except (ImportError, AttributeError):
+            return None, None
+    unit = 1 if sys.platform == "darwin" else 1024  # bytes on macOS, KB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 2**20
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit / 2**20
+    return own, children
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else None
+
+
+def summarize(entries, results, wall_seconds):
+    latencies = [r["latency_ms"] for r in results]
+    own_rss, children_rss = peak_rss_mb()
+    summary = {
+        "documents": len(results),
+        "docs_per_sec": round(len(results) / wall_seconds, 2) if wall_seconds else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "max": max(latencies, default=None),
+        },
+        "peak_rss_mb": {
+            "self": round(own_rss, 1) if own_rss is not None else None,
+            "children": round(children_rss, 1) if children_rss is not None else None,
+        },
+        "accuracy": round(sum(r["correct"] for r in results) / len(results), 4) if results else None,
+        "no_salary": sum(r["salary"] is None for r in results),
+        "errors": sum(r["error"] is not None for r in results),
+        "by": {},
+    }
+    by_file = {r["file"]: r for r in results}
+    for key in BREAKDOWNS:
+        groups = defaultdict(list)
+        for entry in entries:
+            if entry["file"] in by_file:
+                groups[str(entry.get(key))].append(by_file[entry["file"]])
+        summary["by"][key] = {
+            value: {
+                "documents": len(group),
+                "accuracy": round(sum(r["correct"] for r in group) / len(group), 4),
+                "p50_ms": percentile([r["latency_ms"] for r in group], 0.5),
+            }
+            for value, group in sorted(groups.items())
+        }
+    return summary
+
+
+def print_summary(summary):
+    latency = summary["latency_ms"]
+    rss = summary["peak_rss_mb"]
+    print(f"\nDocuments:   {summary['documents']}")
+    print(f"Throughput:  {summary['docs_per_sec']} docs/sec")
+    print(f"Latency:     p50 {latency['p50']} ms, p95 {latency['p95']} ms, max {latency['max']} ms")
+    print(f"Peak RSS:    {rss['self']} MB (self), {rss['children']} MB (largest child)")
+    print(f"Accuracy:    {summary['accuracy']:.1%} "
+          f"({summary['no_salary']} without a salary, {summary['errors']} errors)")
+    for key, groups in summary["by"].items():
+        print(f"\nBy {key}:")
+        for value, stats in groups.items():
+            print(f"  {value:<12} {stats['documents']:>6} docs  {stats['accuracy']:>7.1%}  p50 {stats['p50_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("corpus", help="directory written by create_payslip.py --corpus")
+    parser.add_argument("--limit", type=int, help="only the first N documents")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="documents processed in parallel (separate processes)")
+    parser.add_argument("--json", help="write the summary and per-document results here")
+    parser.add_argument("--verbose", action="store_true", help="show the OCR pipeline's output")
+    args = parser.parse_args()
+
+    entries = load_manifest(args.corpus)[:args.limit]
+    if not entries:
+        sys.exit(f"No documents found in {args.corpus}")
+    paths = [os.path.join(args.corpus, entry["file"]) for entry in entries]
+    print(f"Benchmarking {len(entries)} documents from {args.corpus} with {args.workers} worker(s)")
+
+    started = time.perf_counter()
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            outcomes = list(pool.map(run_document, paths, [args.verbose] * len(paths)))
+    else:
+        outcomes = []
+        for i, path in enumerate(paths, 1):
+            outcomes.append(run_document(path, args.verbose))
+            if i % 50 == 0:
+                print(f"  {i}/{len(paths)} documents")
+    wall_seconds = time.perf_counter() - started
+
+    results = [
+        {
+            "file": entry["file"],
+            "expected": entry["net_salary"],
+            "salary": salary,
+            "correct": salary == entry["net_salary"],
+            "latency_ms": round(latency * 1000, 1),
+            "error": error,
+        }
+        for entry, (salary, latency, error) in zip(entries, outcomes)
+    ]
+    summary = summarize(entries, results, wall_seconds)
+    print_summary(summary)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"corpus": os.path.abspath(args.corpus), "workers": args.workers,
+                       "summary": summary, "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compare the OCR engines (tesserocr persistent API vs pytesseract subprocess).
+
+Each installed engine OCRs the sample payslip, a small crop of its net pay
+line and a preprocessed 4x upscale, first one call at a time and then from
+a thread pool (as the scanned-PDF page pool does). Reports the first
+(cold) call, per-call median/p95 latency, throughput and whether the net
+salary was read.
+
+Usage:
+    python benchmarks/bench_ocr_engines.py [--runs 20] [--threads 4]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend', 'orchestrator'))
+
+from services.ocr_engines import ENGINES  # noqa: E402
+from services.ocr_preprocess import preprocess  # noqa: E402
+from services.ocr_service import find_confident_salary  # noqa: E402
+
+SAMPLE = os.path.join(ROOT, 'frontend', 'sample_payslip.png')
+
+
+def make_images(path):
+    gray = Image.open(path).convert('L')
+    width, height = gray.size
+    big = gray.resize((width * 4, height * 4), Image.BICUBIC)
+    return {
+        "sample": gray,
+        "bottom-crop": gray.crop((0, height // 2, width, height)),
+        "preprocessed-4x": preprocess(big),
+    }
+
+
+def run(engine, img, runs, threads):
+    """Return (cold ms, sequential latencies ms, threaded calls/sec, text)"""
+    started = time.perf_counter()
+    text, _ = engine.ocr(img)
+    cold_ms = (time.perf_counter() - started) * 1000
+
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        engine.ocr(img)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        # Warm each thread's engine handle before timing
+        list(pool.map(lambda _: engine.ocr(img), range(threads)))
+        started = time.perf_counter()
+        list(pool.map(lambda _: engine.ocr(img), range(runs)))
+        throughput = runs / (time.perf_counter() - started)
+    return cold_ms, latencies, throughput, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--image", default=SAMPLE)
+    parser.add_argument("--expected", type=int, default=65000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    engines = {}
+    for name, factory in ENGINES.items():
+        try:
+            engines[name] = factory()
+        except Exception as e:
+            print(f"⚠️ {name} unavailable: {e}")
+    if not engines:
+        sys.exit("No OCR engine available")
+
+    images = make_images(args.image)
+    print(f"\n{'engine':<12} {'image':<16} {'cold ms':>8} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'seq/s':>6} {'thr/s':>6}  salary")
+    for name, engine in engines.items():
+        for label, img in images.items():
+            try:
+                cold_ms, latencies, throughput, text = run(engine, img, args.runs, args.threads)
+            except Exception as e:
+                print(f"{name:<12} {label:<16} failed: {e}")
+                break
+            p50, p95 = np.percentile(latencies, [50, 95])
+            salary = find_confident_salary(text)
+            verdict = "✅" if salary == args.expected else "❌"
+            print(f"{name:<12} {label:<16} {cold_ms:>8.0f} {p50:>7.0f} {p95:>7.0f} "
+                  f"{1000 / p50:>6.1f} {throughput:>6.1f}  {verdict} {salary}")
+
+
+if __name__ == "__main__":
+    main()
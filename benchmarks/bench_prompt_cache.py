@@ -0,0 +1,193 @@
+"""
+Prompt caching: static-prefix layout versus state inlined in the prompt.
+
+Replays a loan conversation whose state changes every few turns (amount,
+salary, KYC, underwriting) through the unified agent's prompt in two
+layouts:
+
+    inline  - the state block in the middle of the system prompt, as before
+    prefix  - UNIFIED_PROMPT as a static prefix, the state message last
+
+Offline (default) it computes, for every call, how many prompt tokens a
+provider prefix cache could serve: the longest prefix shared with an
+earlier call, counted only from 1024 tokens and in 128-token steps as
+OpenAI does, with the tool schemas in front. With --live it sends each
+call to the model, streams the response and reports time-to-first-token,
+total latency, cached tokens from the usage metadata and cost.
+
+Usage:
+    python benchmarks/bench_prompt_cache.py [--turns 12]
+    OPENAI_API_KEY=... python benchmarks/bench_prompt_cache.py --live [--turns 6]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend', 'orchestrator'))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")  # the agent module builds its client at import
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage  # noqa: E402
+from langchain_core.utils.function_calling import convert_to_openai_tool  # noqa: E402
+
+from agents import unified_agent  # noqa: E402
+from agents.context import build_context, count_tokens  # noqa: E402
+from agents.prompt_cache import layout_prompt  # noqa: E402
+
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+# gpt-4o-mini, USD per million tokens
+PRICE_INPUT = 0.15
+PRICE_CACHED_INPUT = 0.075
+PRICE_OUTPUT = 0.60
+
+STATE_SENTENCE = unified_agent.UNIFIED_PROMPT.split("\n\n")[1]
+
+CONVERSATION = [
+    ("Hi, I'm looking for a personal loan", {}),
+    ("I need 5 lakhs for my sister's wedding", {"loan_amount": 500000}),
+    ("What interest rates do you offer for 24 months?", {}),
+    ("I have uploaded my payslip. My monthly salary is ₹85,000", {"monthly_salary": 85000}),
+    ("Am I eligible for the full amount?", {}),
+    ("My PAN is ABCPK1234F", {"customer_name": "Priya Kapoor", "kyc_verified": True}),
+    ("Great, please check my eligibility", {"underwriting_status": "APPROVED"}),
+    ("What would my EMI be over 36 months instead?", {}),
+    ("And if I prepay after a year, is there a charge?", {}),
+    ("Okay, please generate the sanction letter", {"sanction_letter_url": "/static/pdfs/letter.pdf"}),
+    ("Thanks! When will the money be disbursed?", {}),
+    ("Can I also add my spouse as a co-applicant later?", {}),
+]
+
+
+def state_text(state):
+    salary = state.get("monthly_salary")
+    amount = state.get("loan_amount")
+    return unified_agent.UNIFIED_STATE.format(
+        customer_name=state.get("customer_name") or "Not provided",
+        loan_amount=f"₹{amount:,}" if amount else "Not specified",
+        kyc_verified="Yes ✓" if state.get("kyc_verified") else "No ✗",
+        monthly_salary=f"₹{salary:,}" if salary else "Not provided",
+        underwriting_status=state.get("underwriting_status", "PENDING"),
+        sanction_letter="Generated ✓" if state.get("sanction_letter_url") else "Not generated",
+    )
+
+
+def inline_layout(context, text):
+    prompt = unified_agent.UNIFIED_PROMPT.replace(STATE_SENTENCE, text)
+    return [SystemMessage(content=prompt)] + list(context)
+
+
+def prefix_layout(context, text):
+    return layout_prompt(unified_agent.UNIFIED_PROMPT, context, text)
+
+
+def serialize(messages):
+    """Prompt as the provider sees it: tool schemas, then role-tagged messages"""
+    tools = json.dumps([convert_to_openai_tool(t) for t in unified_agent.all_tools], sort_keys=True)
+    return tools + "".join(f"<|{m.type}|>{m.content}<|end|>" for m in messages)
+
+
+def cacheable_tokens(prompt, previous_prompts):
+    shared = 0
+    for previous in previous_prompts:
+        length = len(os.path.commonprefix([prompt, previous]))
+        shared = max(shared, length)
+    tokens = count_tokens(prompt[:shared])
+    return 0 if tokens < CACHE_MIN_TOKENS else tokens // CACHE_STEP_TOKENS * CACHE_STEP_TOKENS
+
+
+def replay(layout, turns, call):
+    """Run the conversation through layout; call(messages) returns per-call stats"""
+    state = {"messages": [], "underwriting_status": "PENDING"}
+    results = []
+    for user_msg, changes in CONVERSATION[:turns]:
+        state["messages"] = state["messages"] + [HumanMessage(id=str(uuid.uuid4()), content=user_msg)]
+        state.update(changes)
+        text = state_text(state)
+        context, updates = build_context(state, count_tokens(unified_agent.UNIFIED_PROMPT + text))
+        state.update(updates)
+        stats, reply = call(layout(context, text))
+        results.append(stats)
+        state["messages"] = state["messages"] + [AIMessage(id=str(uuid.uuid4()), content=reply)]
+    return results
+
+
+def offline_call_factory():
+    seen = []
+
+    def call(messages):
+        prompt = serialize(messages)
+        stats = {"input_tokens": count_tokens(prompt), "cached_tokens": cacheable_tokens(prompt, seen)}
+        seen.append(prompt)
+        # Canned advisor reply so later prompts carry a realistic history
+        return stats, "Sure! Here are the details you asked for, based on your application so far. " * 4
+
+    return call
+
+
+def live_call(messages):
+    started = time.perf_counter()
+    first_token, response = None, None
+    for chunk in unified_agent.agent_llm.stream(messages):
+        if first_token is None and (chunk.content or chunk.tool_call_chunks):
+            first_token = time.perf_counter() - started
+        response = chunk if response is None else response + chunk
+    latency = time.perf_counter() - started
+    usage = response.usage_metadata or {}
+    stats = {
+        "input_tokens": usage.get("input_tokens", 0),
+        "cached_tokens": (usage.get("input_token_details") or {}).get("cache_read", 0) or 0,
+        "output_tokens": usage.get("output_tokens", 0),
+        "ttft_ms": round((first_token or latency) * 1000),
+        "latency_ms": round(latency * 1000),
+    }
+    return stats, str(response.content) or "Let me check that for you."
+
+
+def cost_usd(results):
+    total = 0.0
+    for r in results:
+        uncached = r["input_tokens"] - r["cached_tokens"]
+        total += (uncached * PRICE_INPUT + r["cached_tokens"] * PRICE_CACHED_INPUT
+                  + r.get("output_tokens", 0) * PRICE_OUTPUT) / 1e6
+    return total
+
+
+def report(name, results):
+    input_tokens = sum(r["input_tokens"] for r in results)
+    cached = sum(r["cached_tokens"] for r in results)
+    line = (f"{name:<7} {input_tokens:>9,} {cached:>9,} {cached / input_tokens:>7.0%} "
+            f"{cost_usd(results) * 1000:>10.4f}")
+    if "ttft_ms" in results[0]:
+        warm = results[1:] or results  # the first call can never hit the cache
+        line += (f" {statistics.median(r['ttft_ms'] for r in warm):>9.0f}"
+                 f" {statistics.median(r['latency_ms'] for r in warm):>10.0f}")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=len(CONVERSATION))
+    parser.add_argument("--live", action="store_true", help="call the model (needs OPENAI_API_KEY)")
+    args = parser.parse_args()
+
+    header = f"{'layout':<7} {'input':>9} {'cached':>9} {'cached%':>7} {'cost m$':>10}"
+    if args.live:
+        header += f" {'TTFT p50':>9} {'total p50':>10}"
+    print(f"{args.turns} calls, prompt prefix {count_tokens(unified_agent.UNIFIED_PROMPT)} tokens\n")
+    print(header)
+    for name, layout in (("inline", inline_layout), ("prefix", prefix_layout)):
+        call = live_call if args.live else offline_call_factory()
+        report(name, replay(layout, args.turns, call))
+    if not args.live:
+        print("\nOffline estimate of cacheable tokens; run with --live for measured TTFT and cost.")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.WARNING)
+    main()
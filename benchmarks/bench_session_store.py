@@ -0,0 +1,75 @@
+"""
+Memory held by graph checkpoints: MemorySaver vs BoundedMemorySaver.
+
+Simulates the production pattern behind the OOM kills: a stream of
+short conversations, each on a fresh session id (the frontend makes one
+per page load), none of which is ever deleted. Each session runs a few
+turns of a graph shaped like a loan conversation. Memory actually
+allocated (tracemalloc) is reported for MemorySaver and for the bounded
+store with a byte budget, with and without keep-latest pruning, together
+with the store's own live-session and bytes-held accounting.
+
+Usage:
+    python benchmarks/bench_session_store.py [--sessions 500] [--turns 4] [--budget-mb 5]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend', 'orchestrator'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from agents.checkpointers import BoundedMemorySaver
+from bench_checkpointer import build
+
+
+def measure(saver, sessions, turns):
+    gc.collect()
+    tracemalloc.start()
+    graph = build(saver)
+    started = time.perf_counter()
+    for session in range(sessions):
+        config = {"configurable": {"thread_id": f"page-load-{session}"}}
+        for turn in range(turns):
+            graph.invoke({"messages": [HumanMessage(content=f"turn {turn}: I need 3 lakhs")]}, config)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--budget-mb", type=float, default=5)
+    args = parser.parse_args()
+    budget = int(args.budget_mb * 1024 * 1024)
+
+    print(f"{args.sessions} sessions x {args.turns} turns, budget {args.budget_mb} MB\n")
+    print(f"{'store':<34} {'allocated MB':>12} {'run s':>6} {'live':>6} {'held MB':>8} {'evicted':>8}")
+    for name, saver in [
+        ("MemorySaver", MemorySaver()),
+        ("Bounded (budget)", BoundedMemorySaver(max_bytes=budget, keep_latest=False)),
+        ("Bounded (budget + keep latest)", BoundedMemorySaver(max_bytes=budget, keep_latest=True)),
+    ]:
+        allocated, elapsed = measure(saver, args.sessions, args.turns)
+        if isinstance(saver, BoundedMemorySaver):
+            stats = saver.stats()
+            extra = (f"{stats['live_sessions']:>6} {stats['bytes_held'] / 1e6:>8.2f} "
+                     f"{stats['evictions']['lru'] + stats['evictions']['ttl']:>8}")
+        else:
+            extra = f"{len(saver.storage):>6} {'-':>8} {'-':>8}"
+        print(f"{name:<34} {allocated / 1e6:>12.1f} {elapsed:>6.1f} {extra}")
+
+
+if __name__ == "__main__":
+    main()
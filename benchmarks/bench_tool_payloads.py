@@ -0,0 +1,95 @@
+"""
+Prompt tokens per turn with compact tool results vs the old encoding.
+
+Replays the recorded loan conversations from bench_graph_stub (one per
+underwriting outcome) plus a few follow-up questions through the unified
+agent with the offline stub LLM and the mock services, once with
+COMPACT_TOOL_RESULTS off (indented JSON, every field, kept verbatim) and
+once on (compact JSON of the fields the model needs, consumed results
+stubbed once their outcome is in the state). Prompt tokens per turn are
+taken from the LLM metrics of each session; the tokens spent on tool
+results alone are counted from the final history of each conversation as
+the next prompt would carry it.
+
+Usage:
+    python benchmarks/bench_tool_payloads.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend', 'orchestrator'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_graph_stub import CUSTOMERS, SCRIPT, start_mock_services  # noqa: E402
+
+FOLLOW_UPS = [
+    "What will my monthly EMI be?",
+    "Can I prepay the loan early?",
+    "Thanks, that is all for now",
+]
+
+
+def replay(unified_agent, llm_metrics, thread_id, pan):
+    """Prompt tokens of each turn of one conversation, and tool result tokens at its end"""
+    from langchain_core.messages import HumanMessage, ToolMessage
+    from agents.context import count_message_tokens
+    from agents.tool_payloads import stub_consumed_tool_results
+
+    per_turn = []
+    for message in SCRIPT + FOLLOW_UPS:
+        before = (llm_metrics.session_snapshot(thread_id) or {}).get("prompt_tokens", 0)
+        unified_agent.run_agent(message.format(pan=pan), thread_id)
+        per_turn.append(llm_metrics.session_snapshot(thread_id)["prompt_tokens"] - before)
+
+    state = unified_agent.graph.get_state({"configurable": {"thread_id": thread_id}}).values
+    history = stub_consumed_tool_results(state["messages"] + [HumanMessage(content="next")], state)
+    return per_turn, count_message_tokens([m for m in history if isinstance(m, ToolMessage)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.parse_args()
+
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["STUB_LLM_LATENCY_MS"] = "0"
+    os.environ["STUB_LLM_TOKENS_PER_SEC"] = "0"
+    workdir = tempfile.mkdtemp(prefix="bench_graph_")
+    start_mock_services(workdir)
+
+    import logging
+    logging.disable(logging.WARNING)
+    from agents import tool_payloads, tools, unified_agent
+    from agents.instrumentation import llm_metrics
+    tools.pdf_service.output_dir = workdir
+    tools.db_service.db_name = os.path.join(workdir, "nexus.db")
+    tools.db_service._init_db()
+
+    results = {}
+    for compact in (False, True):
+        tool_payloads.COMPACT_TOOL_RESULTS = compact
+        for pan, name, *_ in CUSTOMERS:
+            results[compact, name] = replay(unified_agent, llm_metrics, f"payloads-{compact}-{pan}", pan)
+
+    turns = SCRIPT + FOLLOW_UPS
+    total_before = total_after = 0
+    for _, name, *_ in CUSTOMERS:
+        (before, tool_before), (after, tool_after) = results[False, name], results[True, name]
+        total_before += sum(before)
+        total_after += sum(after)
+        print(f"\n{name}")
+        print(f"  {'turn':<52} {'before':>7} {'after':>7} {'saved':>6}")
+        for message, b, a in zip(turns, before, after):
+            saved = f"{(b - a) / b:.0%}" if b else "-"
+            print(f"  {message[:52]:<52} {b:>7} {a:>7} {saved:>6}")
+        print(f"  Tool results in the next prompt: {tool_before} -> {tool_after} tokens")
+
+    n = len(turns) * len(CUSTOMERS)
+    print(f"\nMean prompt tokens per turn: {total_before / n:.0f} -> {total_after / n:.0f} "
+          f"({(total_before - total_after) / total_before:.0%} fewer)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,540 @@
-from PIL import Image, ImageDraw, ImageFont
+"""
+Payslip generator for OCR testing.
+
+    python create_payslip.py
+        Draws the sample payslip used by the frontend (frontend/sample_payslip.png).
+
+    python create_payslip.py --corpus benchmarks/corpus --count 2000 --seed 42
+        Generates a seeded synthetic corpus for benchmarking OCR: payslips in
+        several layouts and fonts, rendered at different resolutions with
+        rotation and noise, saved as PNG, JPEG, text PDF or scanned PDF with
+        one or more pages. Next to every file, <name>.json holds the ground
+        truth (net/gross/basic salary) and how the document was generated;
+        manifest.jsonl lists all of them.
+
+The same --seed and --count always produce the same corpus, so OCR changes
+can be compared on a fixed dataset (see benchmarks/bench_ocr_corpus.py).
+"""
+import argparse
+import json
 import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+FORMATS = ("png", "jpeg", "text-pdf", "scanned-pdf")
+LAYOUTS = ("classic", "two-column", "inline", "table")
+DPIS = (100, 150, 200, 300)
+NOISE_LEVELS = {"none": 0, "low": 8, "high": 20}
+
+# Font family -> (regular, bold) TrueType files, tried in order. Pillow finds
+# these in the system font directories; reportlab uses the built-in fonts.
+FONT_FILES = {
+    "sans": [("DejaVuSans.ttf", "DejaVuSans-Bold.ttf"), ("arial.ttf", "arialbd.ttf"),
+             ("LiberationSans-Regular.ttf", "LiberationSans-Bold.ttf")],
+    "serif": [("DejaVuSerif.ttf", "DejaVuSerif-Bold.ttf"), ("times.ttf", "timesbd.ttf"),
+              ("LiberationSerif-Regular.ttf", "LiberationSerif-Bold.ttf")],
+    "mono": [("DejaVuSansMono.ttf", "DejaVuSansMono-Bold.ttf"), ("cour.ttf", "courbd.ttf"),
+             ("LiberationMono-Regular.ttf", "LiberationMono-Bold.ttf")],
+}
+PDF_FONTS = {
+    "sans": ("Helvetica", "Helvetica-Bold"),
+    "serif": ("Times-Roman", "Times-Bold"),
+    "mono": ("Courier", "Courier-Bold"),
+    "default": ("Helvetica", "Helvetica-Bold"),
+}
+
+CORPUS_DATE = time.strptime("2025-01-01", "%Y-%m-%d")
+
+# A4 in points; layouts are drawn in these units and scaled per DPI
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+
+NAMES = ["Aarav Shah", "Priya Nair", "Rohan Gupta", "Ananya Iyer", "Vikram Rao",
+         "Sneha Kulkarni", "Arjun Mehta", "Kavya Reddy", "Ishaan Verma", "Meera Pillai"]
+COMPANIES = ["Nexus Technologies Pvt Ltd", "Sunrise Infra Ltd", "BluePeak Analytics",
+             "Indus Retail Pvt Ltd", "Orbit Software Services"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December"]
+
+
+def create_sample_payslip(output_path=os.path.join(ROOT, "frontend", "sample_payslip.png")):
+    """Draw the simple 800x600 sample payslip shown in the frontend."""
+    width, height = 800, 600
+    img = Image.new('RGB', (width, height), color='white')
+    draw = ImageDraw.Draw(img)
+
+    # Try to use a default font
+    try:
+        font_title = ImageFont.truetype("arial.ttf", 36)
+        font_large = ImageFont.truetype("arial.ttf", 28)
+        font_normal = ImageFont.truetype("arial.ttf", 22)
+    except OSError:
+        font_title = ImageFont.load_default()
+        font_large = ImageFont.load_default()
+        font_normal = ImageFont.load_default()
+
+    # Draw payslip content
+    y_pos = 50
+    draw.text((width/2 - 150, y_pos), "PAYSLIP", fill='black', font=font_title)
+    y_pos += 80
+
+    draw.text((50, y_pos), "Employee Name: John Doe", fill='black', font=font_normal)
+    y_pos += 50
+
+    draw.text((50, y_pos), "Employee ID: EMP12345", fill='black', font=font_normal)
+    y_pos += 50
+
+    draw.text((50, y_pos), "Month: December 2025", fill='black', font=font_normal)
+    y_pos += 80
+
+    draw.rectangle([(50, y_pos), (750, y_pos + 2)], fill='black')
+    y_pos += 30
+
+    draw.text((50, y_pos), "Basic Salary:", fill='black', font=font_normal)
+    draw.text((400, y_pos), "Rs. 45,000", fill='black', font=font_normal)
+    y_pos += 40
+
+    draw.text((50, y_pos), "HRA:", fill='black', font=font_normal)
+    draw.text((400, y_pos), "Rs. 15,000", fill='black', font=font_normal)
+    y_pos += 40
+
+    draw.text((50, y_pos), "Allowances:", fill='black', font=font_normal)
+    draw.text((400, y_pos), "Rs. 10,000", fill='black', font=font_normal)
+    y_pos += 60
+
+    draw.rectangle([(50, y_pos), (750, y_pos + 2)], fill='black')
+    y_pos += 30
+
+    draw.text((50, y_pos), "GROSS SALARY:", fill='black', font=font_large)
+    draw.text((400, y_pos), "Rs. 70,000", fill='black', font=font_large)
+    y_pos += 60
+
+    draw.text((50, y_pos), "Deductions:", fill='black', font=font_normal)
+    draw.text((400, y_pos), "Rs. 5,000", fill='black', font=font_normal)
+    y_pos += 60
+
+    draw.rectangle([(50, y_pos), (750, y_pos + 3)], fill='black')
+    y_pos += 30
+
+    draw.text((50, y_pos), "NET SALARY:", fill='black', font=font_large)
+    draw.text((400, y_pos), "Rs. 65,000", fill='black', font=font_large)
+
+    img.save(output_path)
+    print(f"Sample payslip created at: {output_path}")
+    print("You can upload this file to test the OCR!")
+
+
+# ============= SYNTHETIC CORPUS =============
+
+def payslip_fields(rng):
+    """Random but internally consistent payslip figures and details"""
+    basic = rng.randrange(15000, 150000, 500)
+    hra = basic * rng.choice((40, 50)) // 100
+    special = rng.randrange(0, 40000, 500)
+    gross = basic + hra + special
+    pf = min(1800, basic * 12 // 100)
+    professional_tax = 200
+    income_tax = rng.randrange(0, gross // 8, 100)
+    deductions = pf + professional_tax + income_tax
+    return {
+        "name": rng.choice(NAMES),
+        "employee_id": f"EMP{rng.randrange(10000, 99999)}",
+        "company": rng.choice(COMPANIES),
+        "month": f"{rng.choice(MONTHS)} {rng.randrange(2023, 2027)}",
+        "pan": f"ABCDE{rng.randrange(1000, 9999)}F",
+        "earnings": [
+            (rng.choice(["Basic Salary", "Basic", "Basic Pay"]), basic),
+            (rng.choice(["HRA", "House Rent Allowance"]), hra),
+            (rng.choice(["Special Allowance", "Other Allowances"]), special),
+        ],
+        "deductions": [
+            ("Provident Fund", pf),
+            ("Professional Tax", professional_tax),
+            ("Income Tax (TDS)", income_tax),
+        ],
+        "gross_label": rng.choice(["Gross Salary", "GROSS EARNINGS", "Total Earnings", "Gross Pay"]),
+        "net_label": rng.choice(["Net Salary", "NET PAY", "Net Pay", "Take Home Pay", "Net Payable"]),
+        "basic": basic,
+        "gross": gross,
+        "total_deductions": deductions,
+        "net": gross - deductions,
+    }
+
+
+def format_amount(rng, amount, rupee_symbol=True):
+    """Rs./INR/₹ prefix, Western or Indian digit grouping, optional paise"""
+    digits = str(amount)
+    if rng.random() < 0.4 and len(digits) > 3:
+        head, tail = digits[:-3], digits[-3:]
+        groups = [head[max(0, i - 2):i] for i in range(len(head), 0, -2)][::-1]
+        formatted = ",".join(groups + [tail])
+    else:
+        formatted = f"{amount:,}"
+    prefixes = ["Rs. ", "Rs ", "INR ", ""] + (["₹", "₹ "] if rupee_symbol else [])
+    return rng.choice(prefixes) + formatted + rng.choice(["", ".00"])
+
+
+class Page:
+    """Layout-independent drawing ops in A4 points, y measured from the top."""
+
+    def __init__(self):
+        self.ops = []
+
+    def text(self, x, y, value, size=11, bold=False, align="left"):
+        self.ops.append(("text", x, y, value, size, bold, align))
+
+    def rule(self, x1, y, x2, width=1.0):
+        self.ops.append(("rule", x1, y, x2, width))
+
+    def box(self, x1, y1, x2, y2):
+        self.ops.append(("box", x1, y1, x2, y2))
+
+
+def _header(page, fields, y):
+    page.text(PAGE_WIDTH / 2, y, fields["company"], size=15, bold=True, align="center")
+    page.text(PAGE_WIDTH / 2, y + 22, f"Payslip for {fields['month']}", size=12, align="center")
+    y += 56
+    for label, value in (("Employee Name", fields["name"]), ("Employee ID", fields["employee_id"]),
+                         ("PAN", fields["pan"])):
+        page.text(50, y, f"{label}: {value}", size=10)
+        y += 16
+    return y + 10
+
+
+def layout_classic(page, fields, amounts):
+    """The sample payslip's layout: label column, amount column, net at the bottom"""
+    y = _header(page, fields, 50)
+    page.rule(50, y, 545)
+    y += 20
+    for label, _ in fields["earnings"]:
+        page.text(50, y, f"{label}:", size=11)
+        page.text(330, y, amounts[label], size=11)
+        y += 20
+    page.rule(50, y, 545)
+    y += 20
+    page.text(50, y, f"{fields['gross_label'].upper()}:", size=13, bold=True)
+    page.text(330, y, amounts["gross"], size=13, bold=True)
+    y += 28
+    page.text(50, y, "Deductions:", size=11)
+    page.text(330, y, amounts["deductions"], size=11)
+    y += 28
+    page.rule(50, y, 545, width=2)
+    y += 22
+    page.text(50, y, f"{fields['net_label'].upper()}:", size=14, bold=True)
+    page.text(330, y, amounts["net"], size=14, bold=True)
+
+
+def layout_two_column(page, fields, amounts):
+    """Earnings on the left, deductions on the right, totals underneath"""
+    y = _header(page, fields, 40)
+    page.text(50, y, "Earnings", size=11, bold=True)
+    page.text(310, y, "Deductions", size=11, bold=True)
+    y += 6
+    page.rule(50, y, 545)
+    y += 18
+    rows = max(len(fields["earnings"]), len(fields["deductions"]))
+    for i in range(rows):
+        if i < len(fields["earnings"]):
+            label, _ = fields["earnings"][i]
+            page.text(50, y, label, size=10)
+            page.text(290, y, amounts[label], size=10, align="right")
+        if i < len(fields["deductions"]):
+            label, _ = fields["deductions"][i]
+            page.text(310, y, label, size=10)
+            page.text(545, y, amounts[label], size=10, align="right")
+        y += 18
+    page.rule(50, y, 545)
+    y += 18
+    page.text(50, y, fields["gross_label"], size=10, bold=True)
+    page.text(290, y, amounts["gross"], size=10, bold=True, align="right")
+    page.text(310, y, "Total Deductions", size=10, bold=True)
+    page.text(545, y, amounts["deductions"], size=10, bold=True, align="right")
+    y += 36
+    page.text(50, y, f"{fields['net_label']}: {amounts['net']}", size=13, bold=True)
+
+
+def layout_inline(page, fields, amounts):
+    """Compact 'Label: amount' lines"""
+    y = _header(page, fields, 60)
+    lines = [f"{label}: {amounts[label]}" for label, _ in fields["earnings"]]
+    lines.append(f"{fields['gross_label']}: {amounts['gross']}")
+    lines += [f"{label}: {amounts[label]}" for label, _ in fields["deductions"]]
+    lines.append(f"Total Deductions: {amounts['deductions']}")
+    for line in lines:
+        page.text(60, y, line, size=11)
+        y += 18
+    y += 12
+    page.text(60, y, f"{fields['net_label']}: {amounts['net']}", size=12, bold=True)
+    y += 30
+    page.text(60, y, "This is a computer generated payslip and does not require a signature.", size=8)
+
+
+def layout_table(page, fields, amounts):
+    """Bordered grid with one row per component"""
+    y = _header(page, fields, 50)
+    rows = [(label, amounts[label]) for label, _ in fields["earnings"]]
+    rows.append((fields["gross_label"], amounts["gross"]))
+    rows += [(label, amounts[label]) for label, _ in fields["deductions"]]
+    rows.append(("Total Deductions", amounts["deductions"]))
+    rows.append((fields["net_label"], amounts["net"]))
+    row_height = 24
+    page.box(50, y, 545, y + row_height * len(rows))
+    for i, (label, amount) in enumerate(rows):
+        top = y + i * row_height
+        if i:
+            page.rule(50, top, 545, width=0.5)
+        bold = i == len(rows) - 1
+        page.text(58, top + 16, label, size=11, bold=bold)
+        page.text(537, top + 16, amount, size=11, bold=bold, align="right")
+
+
+LAYOUT_FUNCTIONS = {
+    "classic": layout_classic,
+    "two-column": layout_two_column,
+    "inline": layout_inline,
+    "table": layout_table,
+}
+
+
+def annexure_page(rng, fields, amounts, title):
+    """Filler page with salary-like numbers that must not be picked up"""
+    page = Page()
+    page.text(PAGE_WIDTH / 2, 60, title, size=14, bold=True, align="center")
+    page.text(PAGE_WIDTH / 2, 80, f"{fields['name']} ({fields['employee_id']})", size=10, align="center")
+    y = 120
+    if title.startswith("Tax"):
+        annual = fields["gross"] * 12
+        rows = [
+            ("Gross Salary (annual)", format_amount(rng, annual, rupee_symbol=False)),
+            ("Standard Deduction", format_amount(rng, 50000, rupee_symbol=False)),
+            ("Taxable Income", format_amount(rng, max(0, annual - 50000), rupee_symbol=False)),
+            ("Tax Deducted YTD", format_amount(rng, rng.randrange(0, 200000, 100), rupee_symbol=False)),
+        ]
+    else:
+        rows = [(leave, f"{rng.randrange(0, 20)} days") for leave in
+                ("Casual Leave", "Sick Leave", "Earned Leave", "Leave Without Pay")]
+    for label, value in rows:
+        page.text(60, y, label, size=11)
+        page.text(400, y, value, size=11)
+        y += 22
+    for _ in range(rng.randrange(3, 10)):
+        y += 16
+        page.text(60, y, "All figures are subject to verification by the payroll department.", size=9)
+    return page
+
+
+def build_pages(rng, fields, layout, page_count, rupee_symbol):
+    """Return (pages, index of the payslip page)"""
+    amounts = {label: format_amount(rng, amount, rupee_symbol)
+               for label, amount in fields["earnings"] + fields["deductions"]}
+    amounts.update(
+        gross=format_amount(rng, fields["gross"], rupee_symbol),
+        deductions=format_amount(rng, fields["total_deductions"], rupee_symbol),
+        net=format_amount(rng, fields["net"], rupee_symbol),
+    )
+    payslip = Page()
+    LAYOUT_FUNCTIONS[layout](payslip, fields, amounts)
+
+    pages = [annexure_page(rng, fields, amounts, rng.choice(["Tax Computation Statement", "Leave Summary"]))
+             for _ in range(page_count - 1)]
+    payslip_index = rng.randrange(page_count)
+    pages.insert(payslip_index, payslip)
+    return pages, payslip_index
+
+
+def _load_font(family, size, bold):
+    for regular, bold_file in FONT_FILES.get(family, []):
+        try:
+            return ImageFont.truetype(bold_file if bold else regular, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+def available_font_families():
+    families = []
+    for family, files in FONT_FILES.items():
+        for regular, _ in files:
+            try:
+                ImageFont.truetype(regular, 10)
+            except OSError:
+                continue
+            families.append(family)
+            break
+    return families or ["default"]
+
+
+def render_image(page, dpi, family):
+    """Rasterize a Page to a grayscale PIL image at dpi"""
+    scale = dpi / 72
+    img = Image.new('L', (round(PAGE_WIDTH * scale), round(PAGE_HEIGHT * scale)), 255)
+    draw = ImageDraw.Draw(img)
+    fonts = {}
+    for op in page.ops:
+        if op[0] == "text":
+            _, x, y, value, size, bold, align = op
+            key = (size, bold)
+            if key not in fonts:
+                fonts[key] = _load_font(family, max(6, round(size * scale)), bold)
+            anchor = {"left": "ls", "center": "ms", "right": "rs"}[align]
+            draw.text((x * scale, y * scale), value, fill=0, font=fonts[key], anchor=anchor)
+        elif op[0] == "rule":
+            _, x1, y, x2, width = op
+            draw.line([(x1 * scale, y * scale), (x2 * scale, y * scale)], fill=0,
+                      width=max(1, round(width * scale)))
+        elif op[0] == "box":
+            _, x1, y1, x2, y2 = op
+            draw.rectangle([x1 * scale, y1 * scale, x2 * scale, y2 * scale], outline=0,
+                           width=max(1, round(scale)))
+    return img
+
+
+def degrade(img, rng, nprng, rotation, noise):
+    """Rotate, shade, blur and add sensor noise like a phone photo or scan"""
+    if rotation:
+        img = img.rotate(rotation, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    sigma = NOISE_LEVELS[noise]
+    if sigma:
+        if rng.random() < 0.5:
+            img = img.filter(ImageFilter.GaussianBlur(radius=rng.uniform(0.3, 1.0)))
+        pixels = np.asarray(img, dtype=np.float32)
+        shade = np.linspace(rng.uniform(0.75, 1.0), 1.0, pixels.shape[1], dtype=np.float32)
+        pixels = pixels * shade[None, :] + nprng.normal(0, sigma, pixels.shape).astype(np.float32)
+        img = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), mode='L')
+    return img
+
+
+def write_text_pdf(path, pages, family):
+    from reportlab.pdfgen import canvas
+
+    regular, bold_font = PDF_FONTS[family]
+    pdf = canvas.Canvas(path, pagesize=(PAGE_WIDTH, PAGE_HEIGHT), invariant=1)  # no timestamps
+    for page in pages:
+        for op in page.ops:
+            if op[0] == "text":
+                _, x, y, value, size, bold, align = op
+                pdf.setFont(bold_font if bold else regular, size)
+                draw = {"left": pdf.drawString, "center": pdf.drawCentredString,
+                        "right": pdf.drawRightString}[align]
+                draw(x, PAGE_HEIGHT - y, value)
+            elif op[0] == "rule":
+                _, x1, y, x2, width = op
+                pdf.setLineWidth(width)
+                pdf.line(x1, PAGE_HEIGHT - y, x2, PAGE_HEIGHT - y)
+            elif op[0] == "box":
+                _, x1, y1, x2, y2 = op
+                pdf.rect(x1, PAGE_HEIGHT - y2, x2 - x1, y2 - y1)
+        pdf.showPage()
+    pdf.save()
 
-# Create a simple payslip image
-width, height = 800, 600
-img = Image.new('RGB', (width, height), color='white')
-draw = ImageDraw.Draw(img)
 
-# Try to use a default font
-try:
-    font_title = ImageFont.truetype("arial.ttf", 36)
-    font_large = ImageFont.truetype("arial.ttf", 28)
-    font_normal = ImageFont.truetype("arial.ttf", 22)
-except:
-    font_title = ImageFont.load_default()
-    font_large = ImageFont.load_default()
-    font_normal = ImageFont.load_default()
+def generate_document(output_dir, seed, index, formats=FORMATS, families=None):
+    """Generate payslip number index of the corpus; returns its manifest entry.
 
-# Draw payslip content
-y_pos = 50
-draw.text((width/2 - 150, y_pos), "PAYSLIP", fill='black', font=font_title)
-y_pos += 80
+    Each document has its own RNG derived from (seed, index), so documents
+    can be generated in any order or in parallel with identical results.
+    """
+    rng = random.Random(f"{seed}-{index}")
+    nprng = np.random.default_rng([seed, index])
+    families = families or available_font_families()
 
-draw.text((50, y_pos), "Employee Name: John Doe", fill='black', font=font_normal)
-y_pos += 50
+    fmt = rng.choice(formats)
+    layout = rng.choice(LAYOUTS)
+    family = rng.choice(families)
+    dpi = rng.choice(DPIS)
+    rotation = round(rng.uniform(-4, 4), 1) if rng.random() < 0.4 else 0.0
+    noise = rng.choice(list(NOISE_LEVELS))
+    page_count = rng.choice((1, 1, 1, 2, 3)) if fmt.endswith("pdf") else 1
 
-draw.text((50, y_pos), "Employee ID: EMP12345", fill='black', font=font_normal)
-y_pos += 50
+    fields = payslip_fields(rng)
+    # reportlab's built-in fonts have no ₹ glyph
+    rupee_symbol = fmt != "text-pdf" and family != "default"
+    pages, payslip_index = build_pages(rng, fields, layout, page_count, rupee_symbol)
 
-draw.text((50, y_pos), "Month: December 2025", fill='black', font=font_normal)
-y_pos += 80
+    name = f"payslip_{index:05d}"
+    extension = {"png": ".png", "jpeg": ".jpg", "text-pdf": ".pdf", "scanned-pdf": ".pdf"}[fmt]
+    path = os.path.join(output_dir, name + extension)
 
-draw.rectangle([(50, y_pos), (750, y_pos + 2)], fill='black')
-y_pos += 30
+    if fmt == "text-pdf":
+        # Generated by payroll software: no scan resolution, skew or noise
+        dpi, rotation, noise = None, 0.0, "none"
+        write_text_pdf(path, pages, family if family in PDF_FONTS else "default")
+    else:
+        images = [degrade(render_image(page, dpi, family), rng, nprng, rotation, noise) for page in pages]
+        if fmt == "png":
+            images[0].save(path, dpi=(dpi, dpi))
+        elif fmt == "jpeg":
+            images[0].save(path, quality=rng.randrange(55, 95), dpi=(dpi, dpi))
+        else:
+            # Fixed dates keep the file bytes identical between runs
+            images[0].save(path, "PDF", resolution=dpi, save_all=True, append_images=images[1:],
+                           creationDate=CORPUS_DATE, modDate=CORPUS_DATE)
 
-draw.text((50, y_pos), "Basic Salary:", fill='black', font=font_normal)
-draw.text((400, y_pos), "Rs. 45,000", fill='black', font=font_normal)
-y_pos += 40
+    truth = {
+        "file": os.path.basename(path),
+        "net_salary": fields["net"],
+        "gross_salary": fields["gross"],
+        "basic_salary": fields["basic"],
+        "format": fmt,
+        "layout": layout,
+        "font": family,
+        "dpi": dpi,
+        "rotation": rotation,
+        "noise": noise,
+        "pages": page_count,
+        "payslip_page": payslip_index + 1,
+        "seed": seed,
+        "index": index,
+    }
+    with open(os.path.join(output_dir, name + ".json"), "w") as f:
+        json.dump(truth, f, indent=2)
+    return truth
 
-draw.text((50, y_pos), "HRA:", fill='black', font=font_normal)
-draw.text((400, y_pos), "Rs. 15,000", fill='black', font=font_normal)
-y_pos += 40
 
-draw.text((50, y_pos), "Allowances:", fill='black', font=font_normal)
-draw.text((400, y_pos), "Rs. 10,000", fill='black', font=font_normal)
-y_pos += 60
+def generate_corpus(output_dir, count, seed=42, formats=FORMATS, workers=None):
+    """Generate count payslips into output_dir and write manifest.jsonl"""
+    os.makedirs(output_dir, exist_ok=True)
+    families = available_font_families()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(generate_document, output_dir, seed, i, formats, families)
+                   for i in range(count)]
+        entries = []
+        for i, future in enumerate(futures, 1):
+            entries.append(future.result())
+            if i % 100 == 0 or i == count:
+                print(f"Generated {i}/{count} payslips")
 
-draw.rectangle([(50, y_pos), (750, y_pos + 2)], fill='black')
-y_pos += 30
+    with open(os.path.join(output_dir, "manifest.jsonl"), "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    print(f"Corpus written to {output_dir} (seed {seed}, fonts: {', '.join(families)})")
+    return entries
 
-draw.text((50, y_pos), "GROSS SALARY:", fill='black', font=font_large)
-draw.text((400, y_pos), "Rs. 70,000", fill='black', font=font_large)
-y_pos += 60
 
-draw.text((50, y_pos), "Deductions:", fill='black', font=font_normal)
-draw.text((400, y_pos), "Rs. 5,000", fill='black', font=font_normal)
-y_pos += 60
+def main():
+    parser = argparse.ArgumentParser(description="Generate the sample payslip or a synthetic payslip corpus")
+    parser.add_argument("--corpus", help="output directory for a synthetic corpus")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--formats", default=",".join(FORMATS),
+                        help=f"comma-separated subset of {', '.join(FORMATS)}")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
 
-draw.rectangle([(50, y_pos), (750, y_pos + 3)], fill='black')
-y_pos += 30
+    if not args.corpus:
+        create_sample_payslip()
+        return
+    formats = tuple(fmt.strip() for fmt in args.formats.split(","))
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown formats: {', '.join(sorted(unknown))}")
+    generate_corpus(args.corpus, args.count, seed=args.seed, formats=formats, workers=args.workers)
 
-draw.text((50, y_pos), "NET SALARY:", fill='black', font=font_large)
-draw.text((400, y_pos), "Rs. 65,000", fill='black', font=font_large)
 
-# Save image
-output_path = r"C:\Ritika\AI-Conversational-Loan-Agent\frontend\sample_payslip.png"
-img.save(output_path)
-print(f"Sample payslip created at: {output_path}")
-print("You can upload this file to test the OCR!")
+if __name__ == "__main__":
+    main()
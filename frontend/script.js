@@ -1,6 +1,7 @@
 // Determine API URL dynamically based on environment
 const API_BASE = window.location.origin; // Auto-detects production or localhost
 const API_URL = `${API_BASE}/chat`;
+const UPLOAD_URL = `${API_BASE}/upload`;
 
 let attachedFile = null;
 
@@ -33,14 +34,24 @@ async function sendMessage(event) {
     try {
         let res;
         if (attachedFile) {
+            // OCR runs in the background: queue the upload, wait for the job, then chat
             const formData = new FormData();
-            formData.append("message", msg || "I'm uploading my payslip for salary verification");
             formData.append("session_id", "demo_user");
             formData.append("file", attachedFile);
-            res = await fetch(API_URL, { method: "POST", body: formData });
             attachedFile = null;
             document.getElementById("file-input").value = "";
             document.getElementById("attach-btn").style.backgroundColor = "";
+
+            const jobId = await waitForOcrJob(formData);
+            res = await fetch(API_URL, {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({
+                    message: msg || "I'm uploading my payslip for salary verification",
+                    session_id: "demo_user",
+                    ocr_job_id: jobId
+                })
+            });
         } else {
             res = await fetch(API_URL, {
                 method: "POST",
@@ -64,6 +75,20 @@ async function sendMessage(event) {
     }
 }
 
+async function waitForOcrJob(formData) {
+    const upload = await fetch(UPLOAD_URL, { method: "POST", body: formData });
+    if (!upload.ok) throw new Error(`Upload failed: HTTP ${upload.status}`);
+    let job = await upload.json();
+
+    // Long-poll until the OCR worker has finished with the payslip
+    while (job.status === "pending") {
+        const poll = await fetch(`${UPLOAD_URL}/${job.job_id}?wait=20&session_id=${encodeURIComponent(job.session_id)}`);
+        if (!poll.ok) throw new Error(`OCR status failed: HTTP ${poll.status}`);
+        job = await poll.json();
+    }
+    return job.job_id;
+}
+
 function addMessage(text, type, id = null) {
     const box = document.getElementById("chat");
     const messageWrapper = document.createElement("div");
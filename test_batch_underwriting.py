@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Test script for the vectorized batch underwriting engine"""
+
+import io
+import sys
+import os
+import csv
+import json
+import itertools
+
+# Add the orchestrator directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend', 'orchestrator'))
+
+import numpy as np
+
+from agents.tools import evaluate_underwriting
+from agents.batch_underwriting import evaluate_batch, read_applications, to_csv, to_jsonl, underwrite_stream
+
+# Values on and around every threshold of the rules
+SCORES = [300, 699, 700, 701, 850]
+LIMITS = [0, 100000, 150000, 500000]
+AMOUNTS = [10000, 99999, 100000, 100001, 150000, 200000, 200001, 300000, 1000000, 10000000]
+SALARIES = [0, 1, 4166, 8333, 8334, 9166, 9167, 12500, 20000, 45833, 45834, 100000]
+
+BUREAU = ({"ABCDE1000F": 850, "ABCDE3000F": 750}, {"ABCDE1000F": 500000, "ABCDE3000F": 200000})
+
+
+def test_matches_per_call_rules():
+    """Every grid combination gives exactly the per-call tool's result"""
+    print("Test 1: Batch results match evaluate_underwriting...")
+    grid = list(itertools.product(SCORES, LIMITS, AMOUNTS, SALARIES))
+    score, limit, amount, salary = (np.array(column) for column in zip(*grid))
+    pans = np.array([f"ABCDE{i % 10000:04d}F" for i in range(len(grid))], dtype=object)
+    results = evaluate_batch(pans, amount.astype(np.int64), salary.astype(np.int64),
+                             score.astype(float), limit.astype(float))
+    records = [json.loads(line) for line in to_jsonl(results).splitlines()]
+    assert len(records) == len(grid)
+    for (s, lim, a, sal), record in zip(grid, records):
+        record.pop("pan")
+        expected = evaluate_underwriting(a, sal, s, lim)
+        assert record == expected, (record, expected)
+        assert list(record) == list(expected)
+    print(f"✅ {len(grid)} combinations identical")
+
+
+def test_csv_matches_jsonl():
+    """CSV rows carry the same values as the JSON Lines records"""
+    print("\nTest 2: CSV and JSON Lines agree...")
+    text = "pan,amount,monthly_salary\nABCDE1000F,300000,\nABCDE3000F,350000,20000\nABCDE3000F,350000,0\n"
+    chunks = lambda: read_applications(io.StringIO(text), "csv")
+    records = [json.loads(line) for line in "".join(underwrite_stream(chunks(), bureau=lambda pans: BUREAU)).splitlines()]
+    rows = list(csv.DictReader(io.StringIO("".join(underwrite_stream(chunks(), "csv", bureau=lambda pans: BUREAU)))))
+    for row, record in zip(rows, records):
+        assert {k: v for k, v in row.items() if v != ""} == {k: str(v) for k, v in record.items()}, (row, record)
+    assert [r["status"] for r in records] == ["APPROVED", "REJECTED", "NEED_SALARY"]
+    print("✅ Same fields and values in both formats")
+
+
+def test_error_rows():
+    """Unknown PANs get the tool's errors; invalid rows fail alone"""
+    print("\nTest 3: Error rows...")
+    text = "pan,amount,monthly_salary\nZZZZZ9999Z,300000,0\nABC,300000,0\nABCDE1000F,5000,0\nABCDE1000F,abc,0\nABCDE1000F,300000,-5\n"
+    output = "".join(underwrite_stream(read_applications(io.StringIO(text), "csv"), bureau=lambda pans: BUREAU))
+    errors = [json.loads(line)["error"] for line in output.splitlines()]
+    assert errors == [
+        "Unable to fetch credit score. Please try again later.",
+        "Invalid input: PAN must be exactly 10 characters",
+        "Invalid input: Minimum loan amount is ₹10,000",
+        "Invalid input: amount must be a whole number of rupees",
+        "Invalid input: monthly_salary must be a whole number, 0 if unknown",
+    ], errors
+    print("✅ Errors reported per row")
+
+
+if __name__ == "__main__":
+    test_matches_per_call_rules()
+    test_csv_matches_jsonl()
+    test_error_rows()